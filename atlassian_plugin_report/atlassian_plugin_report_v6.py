@@ -1,9 +1,11 @@
-import requests
 import json
-import warnings
 import csv
 import datetime
 import sys
+import argparse
+from license_collector import collect, MAX_WORKERS, SNAPSHOT_DIR
+import license_history
+from license_history import parse_date
 
 # --- Configuration ---
 
@@ -31,38 +33,18 @@ CSV_HEADERS = [
     "App Key"
 ]
 
-# Suppress only the InsecureRequestWarning from unverified HTTPS requests
-warnings.filterwarnings('ignore', message='Unverified HTTPS request')
-
-# UPM API endpoint to find marketplace apps
-API_ENDPOINT = "/rest/plugins/1.0/installed-marketplace"
-
 # --- Helper Functions ---
 
 def parse_expiry_date(date_str):
     """
     Parses multiple different date formats from the Atlassian API.
     Formats seen: "May 31, 2026", "31/May/26", "19 Dec 2024", "Aug 08, 2024"
+    (the list lives in license_history.EXPIRY_FORMATS)
     """
-    if not date_str or date_str == 'N/A':
-        return None
-    
-    # List of possible formats
-    formats_to_try = [
-        '%B %d, %Y',  # "May 31, 2026"
-        '%d/%b/%y',   # "31/May/26"
-        '%d %b %Y',   # "19 Dec 2024"
-        '%b %d, %Y',   # "Aug 08, 2024"
-        '%Y-%m-%d',   # "2025-11-07"
-    ]
+    parsed = parse_date(date_str)
+    if parsed or not date_str or date_str == 'N/A':
+        return parsed
     
-    for fmt in formats_to_try:
-        try:
-            # strptime returns a datetime object, we convert to date
-            return datetime.datetime.strptime(date_str, fmt).date()
-        except ValueError:
-            continue # Try the next format
-            
     # If all formats fail
     print(f"  [WARN] Could not parse unknown date format: {date_str}")
     return None
@@ -106,108 +88,96 @@ def load_config(filename):
 
 # --- Main Work Function ---
 
-def get_paid_apps(base_url, token, server_name):
+def parse_paid_apps(data, server_name, report_date=TODAY_STRING):
     """
-    Connects to an instance and returns a list of dictionaries
+    Turns one instance's UPM installed-marketplace response into a list of dictionaries
     containing paid app license details.
     """
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "*/*"
-    }
-    
     paid_apps_list = []
+
+    # Get the parent application's (Host) license details
+    host_status = data.get('hostStatus', {})
+    host_license = host_status.get('hostLicense', {})
+    host_sen = host_license.get('supportEntitlementNumber', 'N/A')
+    host_user_tier = host_license.get('maximumNumberOfUsers', 'N/A')
     
-    try:
-        response = requests.get(
-            base_url + API_ENDPOINT, 
-            headers=headers, 
-            timeout=10, 
-            verify=False 
-        )
-        response.raise_for_status()
-        
-        try:
-            data = response.json()
-        except json.JSONDecodeError:
-            print(f"  [ERROR] Response for {server_name} ({base_url}) was not valid JSON.")
-            return []
-
-        # Get the parent application's (Host) license details
-        host_status = data.get('hostStatus', {})
-        host_license = host_status.get('hostLicense', {})
-        host_sen = host_license.get('supportEntitlementNumber', 'N/A')
-        host_user_tier = host_license.get('maximumNumberOfUsers', 'N/A')
-        
-        # --- ★ BUG FIX ★ ---
-        # Try 'maintenanceExpiryDateString' first, then fall back to 'expiryDateString'
-        host_expiry_str = host_license.get('maintenanceExpiryDateString')
-        if not host_expiry_str or host_expiry_str == 'N/A':
-            host_expiry_str = host_license.get('expiryDateString', 'N/A')
-        
-        # --- ★ NEW FEATURE ★ ---
-        host_expiry_date = parse_expiry_date(host_expiry_str)
-        host_days_left = calculate_days_to_expiry(host_expiry_date)
-        # --- End New Feature ---
+    # --- ★ BUG FIX ★ ---
+    # Try 'maintenanceExpiryDateString' first, then fall back to 'expiryDateString'
+    host_expiry_str = host_license.get('maintenanceExpiryDateString')
+    if not host_expiry_str or host_expiry_str == 'N/A':
+        host_expiry_str = host_license.get('expiryDateString', 'N/A')
+    
+    # --- ★ NEW FEATURE ★ ---
+    host_expiry_date = parse_expiry_date(host_expiry_str)
+    host_days_left = calculate_days_to_expiry(host_expiry_date)
+    # --- End New Feature ---
 
-        for plugin in data.get('plugins', []):
-            license_details = plugin.get('licenseDetails')
+    for plugin in data.get('plugins', []):
+        license_details = plugin.get('licenseDetails')
+        
+        if license_details:
+            is_valid = license_details.get('valid')
+            status = "VALID"
+            if not is_valid:
+                status = license_details.get('error', 'INVALID') 
             
-            if license_details:
-                is_valid = license_details.get('valid')
-                status = "VALID"
-                if not is_valid:
-                    status = license_details.get('error', 'INVALID') 
-                
-                app_key = plugin.get('key')
-                
-                # --- ★ NEW FEATURE ★ ---
-                app_expiry_str = license_details.get('maintenanceExpiryDateString', 'N/A')
-                app_expiry_date = parse_expiry_date(app_expiry_str)
-                app_days_left = calculate_days_to_expiry(app_expiry_date)
-                # --- End New Feature ---
-                
-                app_data = {
-                    "Report Date": TODAY_STRING,
-                    "Server Name": server_name,
-                    "Host SEN": host_sen,
-                    "Host User Tier": host_user_tier,
-                    "Host Expiry Date": host_expiry_str,
-                    "Host Days to Expiry": host_days_left,
-                    "App Name": plugin.get('name'),
-                    "App Key": app_key,
-                    "License Tier": license_details.get('maximumNumberOfUsers', 'Unknown Tier'),
-                    "License Status": status,
-                    "Maintenance Expiry": app_expiry_str,
-                    "App Days to Expiry": app_days_left,
-                    "SEN": license_details.get('supportEntitlementNumber', 'N/A'),
-                    "Marketplace URL": f"https://marketplace.atlassian.com/plugins/{app_key}"
-                }
-                paid_apps_list.append(app_data)
-                
-    except requests.exceptions.HTTPError as e:
-        print(f"  [ERROR] HTTP Error for {server_name}: {e.response.status_code}")
-        if e.response.status_code == 401:
-            print("  [HINT] Received 401 Unauthorized. Check your Personal Access Token (PAT).")
-    except requests.exceptions.ConnectionError as e:
-        print(f"  [ERROR] Connection Error for {server_name}: Could not connect.")
-    except Exception as e:
-        print(f"  [ERROR] An unknown error occurred for {server_name}: {e}")
+            app_key = plugin.get('key')
+            
+            # --- ★ NEW FEATURE ★ ---
+            app_expiry_str = license_details.get('maintenanceExpiryDateString', 'N/A')
+            app_expiry_date = parse_expiry_date(app_expiry_str)
+            app_days_left = calculate_days_to_expiry(app_expiry_date)
+            # --- End New Feature ---
+            
+            app_data = {
+                "Report Date": report_date,
+                "Server Name": server_name,
+                "Host SEN": host_sen,
+                "Host User Tier": host_user_tier,
+                "Host Expiry Date": host_expiry_str,
+                "Host Days to Expiry": host_days_left,
+                "App Name": plugin.get('name'),
+                "App Key": app_key,
+                "License Tier": license_details.get('maximumNumberOfUsers', 'Unknown Tier'),
+                "License Status": status,
+                "Maintenance Expiry": app_expiry_str,
+                "App Days to Expiry": app_days_left,
+                "SEN": license_details.get('supportEntitlementNumber', 'N/A'),
+                "Marketplace URL": f"https://marketplace.atlassian.com/plugins/{app_key}"
+            }
+            paid_apps_list.append(app_data)
         
     return paid_apps_list
 
 # --- Run The Script ---
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paid app license report for every server in servers_config.json.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help=f"Servers queried at once (default: {MAX_WORKERS})")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help=f"Last good response per server (default: {SNAPSHOT_DIR})")
+    parser.add_argument("--no-snapshots", action="store_true", help="Neither write snapshots nor fall back to them")
+    parser.add_argument("--history-db", default=license_history.DB_FILE, help=f"Also append rows to this license history store (default: {license_history.DB_FILE})")
+    parser.add_argument("--no-history", action="store_true", help="Do not append to the license history store")
+    args = parser.parse_args()
+
     print(f"Starting plugin budget report... (Will save to {CSV_FILENAME})\n")
     
     servers_to_check = load_config(CONFIG_FILENAME)
     all_paid_apps = []
+    failed_servers, stale_servers = [], []
 
-    for server in servers_to_check:
+    for server, data, snapshot_time, error in collect(servers_to_check, args.workers, None if args.no_snapshots else args.snapshot_dir):
         print(f"--- Checking Server: {server['name']} ({server['url']}) ---")
+        if error:
+            print(f"  [ERROR] {error}")
+            if snapshot_time:
+                print(f"  [WARN] Using last good snapshot from {snapshot_time}")
+                stale_servers.append(server['name'])
+            else:
+                failed_servers.append(server['name'])
         
-        apps = get_paid_apps(server['url'], server['token'], server['name'])
+        # Snapshot rows keep the date their data was collected
+        apps = parse_paid_apps(data, server['name'], snapshot_time[:10] if snapshot_time else TODAY_STRING) if data else []
         
         if apps:
             print(f"  Found {len(apps)} paid apps.")
@@ -215,6 +185,11 @@ if __name__ == "__main__":
         else:
             print("  No paid apps found (or an error occurred).\n")
     
+    if stale_servers:
+        print(f"\n[WARN] Reused snapshots for: {', '.join(sorted(stale_servers))}")
+    if failed_servers:
+        print(f"[WARN] No data for: {', '.join(sorted(failed_servers))}")
+    
     # --- Write to CSV ---
     if all_paid_apps:
         all_paid_apps.sort(key=lambda x: (x['Server Name'], x['App Name']))
@@ -231,6 +206,15 @@ if __name__ == "__main__":
 
         except IOError as e:
             print(f"\n[FATAL ERROR] Could not write to file '{CSV_FILENAME}'. Error: {e}")
+        
+        if not args.no_history:
+            try:
+                conn = license_history.connect(args.history_db)
+                count = license_history.record_rows(conn, all_paid_apps)
+                conn.close()
+                print(f"History: {count} rows recorded in '{args.history_db}' (query with license_history.py)")
+            except Exception as e:
+                print(f"[ERROR] Could not update license history '{args.history_db}': {e}")
             
     else:
         print("\n--- Report Complete ---")
@@ -14,13 +14,21 @@ import pandas as pd
 import re
 from datetime import datetime
 import os
+import csv
 import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from marketplace_pricing import lookup_price
 
 # ===== CONFIGURATION =====
 INPUT_CSV = "/export/scripts/ram/plugin_price_scrapping.csv"
 OUTPUT_CSV = "/export/scripts/ram/plugin_price_scrapping_with_pricing.csv"
 HEADLESS = True
 DEBUG = False  # Set to True to see what's happening in modal
+WORKERS = 4  # Parallel lookups, each with its own Chrome driver
+CHECKPOINT_EVERY = 10  # Rewrite OUTPUT_CSV after this many lookups
+CHECKPOINT_FIELDS = ['plugin_id', 'tier', 'status', 'price', 'source', 'error', 'checked_at']
 # =========================
 
 def extract_plugin_id_from_url(url: str) -> str:
@@ -393,100 +401,171 @@ def scrape_plugin_selenium(plugin_id: str, driver, target_tier: str) -> dict:
     
     return result
 
+def chrome_options() -> Options:
+    options = Options()
+    if HEADLESS:
+        options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36')
+    return options
+
+class DriverPool:
+    """One Chrome driver per worker thread, started on its first browser lookup."""
+
+    def __init__(self):
+        self.local = threading.local()
+        self.drivers = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        driver = getattr(self.local, 'driver', None)
+        if driver is None:
+            driver = self.local.driver = webdriver.Chrome(options=chrome_options())
+            with self.lock:
+                self.drivers.append(driver)
+        return driver
+
+    def quit(self):
+        for driver in self.drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+def price_lookup(plugin_id: str, tier: str, drivers: DriverPool) -> dict:
+    """Marketplace pricing API first, this worker's Chrome driver as the fallback."""
+    api = lookup_price(plugin_id, tier)
+    if api:
+        result = {'price': api['price'], 'status': 'success', 'error': None, 'source': 'api'}
+    else:
+        result = scrape_plugin_selenium(plugin_id, drivers.get(), tier)
+        result['source'] = 'browser'
+        time.sleep(1)
+    result['checked_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return result
+
+def load_checkpoint(path: str) -> dict:
+    """{(plugin_id, tier): result} of successful lookups in a checkpoint file (failures are retried)."""
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            if row['status'] == 'success':
+                done[(row['plugin_id'], row['tier'])] = row
+    return done
+
+def row_key(df: pd.DataFrame, row) -> tuple:
+    """(plugin_id, tier) for one input row, or (None, reason) when it has to be skipped."""
+    plugin_id = None
+    if 'App Key' in df.columns and pd.notna(row.get('App Key')):
+        plugin_id = str(row['App Key']).strip()
+    elif 'Marketplace URL' in df.columns and pd.notna(row.get('Marketplace URL')):
+        plugin_id = extract_plugin_id_from_url(row['Marketplace URL'])
+    if not plugin_id:
+        return None, "No plugin ID found"
+    tier = None
+    if 'License Tier' in df.columns and pd.notna(row.get('License Tier')):
+        tier = normalize_tier(row['License Tier'])
+    if not tier:
+        return None, f"{plugin_id} - No valid tier"
+    return (plugin_id, tier), None
+
+def write_output(df: pd.DataFrame, keys: list, results: dict, output_csv: str, current_timestamp: str):
+    """Input rows plus price columns for every lookup finished so far; written atomically."""
+    out = df.copy()
+    out['Listing Price (USD)'] = [extract_usd_number(results[k]['price']) if k in results and results[k]['status'] == 'success' else "" for k in keys]
+    out['Price Check Date/Time'] = [results[k]['checked_at'] if k in results else current_timestamp for k in keys]
+    tmp = output_csv + ".tmp"
+    out.to_csv(tmp, index=False)
+    os.replace(tmp, output_csv)
+
 def main():
+    parser = argparse.ArgumentParser(description="Atlassian Marketplace pricing for every row of a CSV (Selenium fallback).")
+    parser.add_argument("--input", default=INPUT_CSV, help=f"Input CSV (default: {INPUT_CSV})")
+    parser.add_argument("--output", default=OUTPUT_CSV, help=f"Output CSV (default: {OUTPUT_CSV})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help=f"Parallel lookups, one Chrome each (default: {WORKERS})")
+    parser.add_argument("--resume", action="store_true", help="Reuse successful lookups from the checkpoint of an interrupted run")
+    args = parser.parse_args()
+    checkpoint_csv = args.output + ".checkpoint.csv"
+
     print("=" * 70)
     print("Atlassian Marketplace Pricing Scraper - CSV Batch Processor (Selenium)")
     print("=" * 70)
     
-    if not os.path.exists(INPUT_CSV):
-        print(f"ERROR: Input file not found: {INPUT_CSV}")
+    if not os.path.exists(args.input):
+        print(f"ERROR: Input file not found: {args.input}")
         return
     
-    print(f"Reading: {INPUT_CSV}")
-    df = pd.read_csv(INPUT_CSV)
+    print(f"Reading: {args.input}")
+    df = pd.read_csv(args.input)
     print(f"Found {len(df)} rows to process")
     print(f"Running in HEADLESS mode: {HEADLESS}")
     print(f"Debug mode: {DEBUG}")
     print()
     
-    df['Listing Price (USD)'] = ""
-    df['Price Check Date/Time'] = ""
     current_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    keys, skipped_count = [], 0
+    for idx, row in df.iterrows():
+        key, reason = row_key(df, row)
+        if not key:
+            print(f"[{idx+1}/{len(df)}] SKIP: {reason}")
+            skipped_count += 1
+        keys.append(key)
+
+    # Each (plugin, tier) is priced once, however many rows/instances list it
+    results = load_checkpoint(checkpoint_csv) if args.resume else {}
+    if not args.resume and os.path.exists(checkpoint_csv):
+        os.remove(checkpoint_csv)
+    todo = [k for k in dict.fromkeys(keys) if k and k not in results]
+    print(f"Unique lookups: {len(todo) + len(results)} ({len(results)} from checkpoint, {len(todo)} to price, {args.workers} workers)")
     
-    chrome_options = Options()
-    if HEADLESS:
-        chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.add_argument('user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36')
-    
-    try:
-        driver = webdriver.Chrome(options=chrome_options)
-        
-        success_count = 0
-        failed_count = 0
-        skipped_count = 0
-        
-        for idx, row in df.iterrows():
-            plugin_id = None
-            if 'App Key' in df.columns and pd.notna(row.get('App Key')):
-                plugin_id = str(row['App Key']).strip()
-            elif 'Marketplace URL' in df.columns and pd.notna(row.get('Marketplace URL')):
-                plugin_id = extract_plugin_id_from_url(row['Marketplace URL'])
-            
-            if not plugin_id:
-                print(f"[{idx+1}/{len(df)}] SKIP: No plugin ID found")
-                df.at[idx, 'Price Check Date/Time'] = current_timestamp
-                skipped_count += 1
-                continue
-            
-            tier = None
-            if 'License Tier' in df.columns and pd.notna(row.get('License Tier')):
-                tier = normalize_tier(row['License Tier'])
-            
-            if not tier:
-                print(f"[{idx+1}/{len(df)}] SKIP: {plugin_id} - No valid tier")
-                df.at[idx, 'Price Check Date/Time'] = current_timestamp
-                skipped_count += 1
-                continue
-            
-            app_name = row.get('App Name', 'Unknown')
-            print(f"[{idx+1}/{len(df)}] Processing: {app_name} (Tier: {tier})")
-            
-            result = scrape_plugin_selenium(plugin_id, driver, tier)
-            
-            if result['status'] == 'success':
-                price_str = result['price']
-                price_number = extract_usd_number(price_str)
-                df.at[idx, 'Listing Price (USD)'] = price_number
-                df.at[idx, 'Price Check Date/Time'] = current_timestamp
-                print(f"  ✓ Price: {price_str} (USD: {price_number})")
-                success_count += 1
-            else:
-                df.at[idx, 'Listing Price (USD)'] = ""
-                df.at[idx, 'Price Check Date/Time'] = current_timestamp
-                print(f"  ✗ Failed: {result['error']}")
-                failed_count += 1
-            
-            time.sleep(1)
-        
-        driver.quit()
-    
-    except Exception as e:
-        print(f"ERROR setting up Chrome driver: {e}")
-        import traceback
-        traceback.print_exc()
-        return
+    drivers = DriverPool()
+    new_file = not os.path.exists(checkpoint_csv)
+    with open(checkpoint_csv, 'a', newline='') as checkpoint:
+        writer = csv.DictWriter(checkpoint, fieldnames=CHECKPOINT_FIELDS, extrasaction='ignore')
+        if new_file:
+            writer.writeheader()
+        pool = ThreadPoolExecutor(max_workers=max(1, args.workers))
+        futures = {pool.submit(price_lookup, plugin_id, tier, drivers): (plugin_id, tier) for plugin_id, tier in todo}
+        try:
+            for n, future in enumerate(as_completed(futures), 1):
+                plugin_id, tier = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'price': None, 'status': 'failed', 'error': str(e)[:100], 'source': None,
+                              'checked_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+                results[(plugin_id, tier)] = result
+                writer.writerow(dict(result, plugin_id=plugin_id, tier=tier))
+                checkpoint.flush()
+                if result['status'] == 'success':
+                    print(f"[{n}/{len(todo)}] {plugin_id} (Tier: {tier}) ✓ Price: {result['price']} (USD: {extract_usd_number(result['price'])}){' [api]' if result['source'] == 'api' else ''}")
+                else:
+                    print(f"[{n}/{len(todo)}] {plugin_id} (Tier: {tier}) ✗ Failed: {result['error']}")
+                if n % CHECKPOINT_EVERY == 0:
+                    write_output(df, keys, results, args.output, current_timestamp)
+        except KeyboardInterrupt:
+            print("\nInterrupted - saving partial results (rerun with --resume to continue)")
+        finally:
+            for future in futures:
+                future.cancel()  # Queued lookups only; running ones finish before the drivers quit
+            pool.shutdown(wait=True)
+            drivers.quit()
     
     print()
     print("=" * 70)
     print("Saving results...")
-    df.to_csv(OUTPUT_CSV, index=False)
-    print(f"Saved to: {OUTPUT_CSV}")
+    write_output(df, keys, results, args.output, current_timestamp)
+    print(f"Saved to: {args.output}")
+    print(f"Checkpoint: {checkpoint_csv}")
     print()
     
+    success_count = sum(1 for k in keys if k in results and results[k]['status'] == 'success')
+    failed_count = len(df) - skipped_count - success_count
     print("=" * 70)
     print("SUMMARY")
     print("=" * 70)
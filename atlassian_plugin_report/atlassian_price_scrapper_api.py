@@ -2,20 +2,207 @@
 """
 Atlassian Marketplace Pricing API
 REST API endpoint for on-demand pricing lookups
-Thread-safe version - creates new browser per request
+Marketplace pricing API first; browser pool fallback - long-lived Chromium per worker thread,
+fresh context per request
 """
 
 from flask import Flask, request, jsonify
 from playwright.sync_api import sync_playwright
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
 import re
 from datetime import datetime
 import os
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import atexit
 import threading
+import marketplace_pricing
 
 app = Flask(__name__)
 
-# Lock for serializing browser creation (alternative approach)
-_browser_lock = threading.Lock()
+# --- Browser pool configuration ---
+POOL_SIZE = 3                # Worker threads, each owning one Chromium process
+QUEUE_SIZE = 20              # Pending lookups before new requests are rejected with 503
+MAX_PAGES_PER_BROWSER = 50   # Recycle a browser after this many lookups
+MAX_POOL_RSS_MB = 2048       # Recycle after a lookup if all browsers together use more than this
+REQUEST_TIMEOUT = 180        # Seconds a request waits for its lookup (queue wait included)
+BROWSER_ARGS = ['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu', '--js-flags=--max-old-space-size=512']
+# --- Price cache and batch configuration ---
+PRICE_CACHE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'price_cache.db')
+PRICE_TTL = 7 * 86400        # Cached prices younger than this are served as-is
+PRICE_STALE_TTL = 30 * 86400 # Older ones up to this age are served while being refreshed in the background
+API_WORKERS = 8              # Concurrent pricing API lookups (browser fallbacks still share POOL_SIZE)
+BATCH_WORKERS = 4            # Concurrent lookups of /price/batch requests, on their own threads so single
+                             # /price calls never queue behind a batch; kept below QUEUE_SIZE for the same reason
+SYNC_BATCH_LIMIT = 10        # Larger /price/batch requests run as background jobs
+JOB_RETENTION = 3600         # Seconds finished jobs stay available for polling
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+class PoolBusy(Exception):
+    pass
+
+def _descendant_rss_mb(root_pid=None):
+    """RSS (MB) of every process below this one (playwright drivers and their browsers), from /proc."""
+    root_pid = root_pid or os.getpid()
+    children, rss = {}, {}
+    for pid in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(pid))
+            rss[int(pid)] = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, IndexError, ValueError):
+            continue
+    total, stack = 0, list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total / (1024 * 1024)
+
+class BrowserPool:
+    """
+    Fixed set of worker threads, each running its own Playwright driver and Chromium (the sync API
+    is bound to the thread that started it). Lookups wait in a bounded queue; every lookup gets a
+    fresh browser context, so cookies and storage never leak between requests. A browser is relaunched
+    after MAX_PAGES_PER_BROWSER lookups, when it crashed, or when the pool exceeds MAX_POOL_RSS_MB.
+    A worker whose Playwright driver fails to start is marked dead; once none is left, queued and
+    new lookups fail right away instead of waiting out REQUEST_TIMEOUT.
+    """
+
+    def __init__(self, size=POOL_SIZE, queue_size=QUEUE_SIZE, max_pages=MAX_PAGES_PER_BROWSER, max_rss_mb=MAX_POOL_RSS_MB):
+        self.size, self.max_pages, self.max_rss_mb = size, max_pages, max_rss_mb
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.threads = []
+        self.stats = {'lookups': 0, 'errors': 0, 'launches': 0, 'recycled': 0, 'rejected': 0, 'dead_workers': 0}
+        self.alive, self.closed, self.startup_error = 0, False, None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.threads:
+                return
+            self.alive = self.size
+            for i in range(self.size):
+                t = threading.Thread(target=self._worker, name=f'browser-{i}', daemon=True)
+                t.start()
+                self.threads.append(t)
+
+    def submit(self, fn, *args, block=False):
+        """
+        Queue fn(page, *args) for a worker; returns a Future. Raises PoolBusy when the queue is full
+        (with block=True, only once it stayed full for REQUEST_TIMEOUT seconds).
+        """
+        self.start()
+        if self.closed or not self.alive:
+            self._count('rejected')
+            raise PoolBusy('Browser pool is shut down' if self.closed else f'No browser worker running: {self.startup_error}')
+        future = Future()
+        try:
+            self.jobs.put((future, fn, args), block=block, timeout=REQUEST_TIMEOUT if block else None)
+        except queue.Full:
+            self._count('rejected')
+            raise PoolBusy(f'All {self.size} browsers busy and {self.jobs.maxsize} lookups queued')
+        return future
+
+    def shutdown(self, timeout=10):
+        """Fails queued lookups, then stops the workers; never blocks on a full queue."""
+        self.closed = True
+        self._fail_pending(PoolBusy('Browser pool is shut down'))
+        for _ in self.threads:
+            try:
+                self.jobs.put_nowait(None)
+            except queue.Full:
+                break
+        for t in self.threads:
+            t.join(timeout)
+
+    def status(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update({'workers': self.size, 'queued': self.jobs.qsize(), 'queue_size': self.jobs.maxsize})
+        return stats
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _fail_pending(self, error):
+        """Drains the queue, failing every lookup still waiting in it."""
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None and job[0].set_running_or_notify_cancel():
+                job[0].set_exception(error)
+
+    def _launch(self, playwright):
+        self._count('launches')
+        return playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+
+    def _worker(self):
+        try:
+            playwright = sync_playwright().start()
+        except Exception as e:
+            print(f"[-] {threading.current_thread().name}: Playwright failed to start: {e}")
+            with self._lock:
+                self.alive -= 1
+                self.stats['dead_workers'] += 1
+                self.startup_error = e
+                last = self.alive == 0
+            if last:
+                self._fail_pending(PoolBusy(f'No browser worker running: {e}'))
+            return
+        browser, pages = None, 0
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+                future, fn, args = job
+                if not future.set_running_or_notify_cancel():
+                    continue
+                context = None
+                try:
+                    if browser is None or not browser.is_connected():
+                        browser, pages = self._launch(playwright), 0
+                    context = browser.new_context(viewport={'width': 1920, 'height': 1080}, user_agent=USER_AGENT)
+                    future.set_result(fn(context.new_page(), *args))
+                except Exception as e:
+                    self._count('errors')
+                    future.set_exception(e)
+                finally:
+                    try:
+                        if context:
+                            context.close()
+                    except Exception:
+                        pass
+                pages += 1
+                self._count('lookups')
+                if browser is not None and (pages >= self.max_pages or not browser.is_connected()
+                                            or _descendant_rss_mb() > self.max_rss_mb):
+                    self._count('recycled')
+                    try:
+                        browser.close()
+                    except Exception:
+                        pass
+                    browser = None
+        finally:
+            try:
+                if browser:
+                    browser.close()
+            finally:
+                playwright.stop()
+
+pool = BrowserPool()
+atexit.register(pool.shutdown)
 
 def extract_usd_number(price_str: str) -> str:
     """Extract just the USD number from price string."""
@@ -37,9 +224,8 @@ def normalize_tier(tier_str: str) -> str:
         return match.group(1)
     return None
 
-def scrape_plugin_price(plugin_id: str, target_tier: str) -> dict:
-    """Scrape pricing for a single plugin - creates new browser per request (thread-safe)."""
-    result = {
+def _new_result(plugin_id, target_tier):
+    return {
         'plugin_id': plugin_id,
         'user_tier': target_tier,
         'price_usd': None,
@@ -48,351 +234,431 @@ def scrape_plugin_price(plugin_id: str, target_tier: str) -> dict:
         'error': None,
         'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     }
-    
-    playwright = None
-    browser = None
-    context = None
-    
+
+def _scrape_page(page, plugin_id: str, target_tier: str) -> dict:
+    """Scrape pricing for a single plugin on a fresh page from the pool."""
+    result = _new_result(plugin_id, target_tier)
+    url = f"https://marketplace.atlassian.com/plugins/{plugin_id}"
+    page.goto(url, wait_until='networkidle', timeout=60000)
+    page.wait_for_timeout(2000)
+
+    # Step 1: Click View dropdown
     try:
-        # Create a NEW browser instance for each request (thread-safe)
-        playwright = sync_playwright().start()
-        browser = playwright.chromium.launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-dev-shm-usage']
-        )
-        context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        page = context.new_page()
-        
-        url = f"https://marketplace.atlassian.com/plugins/{plugin_id}"
-        page.goto(url, wait_until='networkidle', timeout=60000)
-        page.wait_for_timeout(2000)
-        
-        # Step 1: Click View dropdown
-        try:
-            view_button = page.locator("button:has-text('View for')").first
-            view_button.wait_for(state='visible', timeout=10000)
-            view_button.click()
-            page.wait_for_timeout(1500)
-        except Exception as e:
-            result['error'] = f'View dropdown: {str(e)[:50]}'
-            if context:
-                context.close()
-            if browser:
-                browser.close()
-            if playwright:
-                playwright.stop()
-            return result
-        
-        # Step 2: Click Data Center
-        try:
-            page.wait_for_selector("//*[contains(text(), 'Hosting Types')]", timeout=5000)
-            page.wait_for_timeout(500)
-            
-            dc_selectors = [
-                "//*[contains(text(), 'Hosting Types')]/following-sibling::*//*[contains(text(), 'Data Center')]",
-                "//*[contains(text(), 'Hosting Types')]/..//*[contains(text(), 'Data Center')]",
-                "//ul//*[contains(text(), 'Data Center')]",
-                "button:has-text('Data Center')",
-                "a:has-text('Data Center')",
-                "//*[contains(text(), 'Data Center')]",
-            ]
-            
-            dc_clicked = False
-            for selector in dc_selectors:
-                try:
-                    if selector.startswith("//"):
-                        element = page.locator(f"xpath={selector}").first
-                    else:
-                        element = page.locator(selector).first
-                    
-                    element.wait_for(state='visible', timeout=3000)
-                    element.click(timeout=5000)
-                    page.wait_for_load_state('networkidle', timeout=30000)
-                    page.wait_for_timeout(2000)
-                    dc_clicked = True
-                    break
-                except:
-                    continue
-            
-            if not dc_clicked:
-                result['error'] = 'Could not find Data Center option'
-                if context:
-                    context.close()
-                if browser:
-                    browser.close()
-                if playwright:
-                    playwright.stop()
-                return result
-        except Exception as e:
-            result['error'] = f'Data Center: {str(e)[:50]}'
-            if context:
-                context.close()
-            if browser:
-                browser.close()
-            if playwright:
-                playwright.stop()
-            return result
-        
-        # Step 3: Navigate to Pricing tab
-        try:
-            current_url = page.url
-            if '?tab=' in current_url or '&tab=' in current_url:
-                if '?tab=' in current_url:
-                    new_url = current_url.replace('?tab=overview', '?tab=pricing').replace('?tab=reviews', '?tab=pricing')
-                else:
-                    new_url = current_url.replace('&tab=overview', '&tab=pricing').replace('&tab=reviews', '&tab=pricing')
-                
-                if 'hosting=datacenter' not in new_url:
-                    if '?' in new_url:
-                        new_url += '&hosting=datacenter'
-                    else:
-                        new_url += '?hosting=datacenter'
-                
-                page.goto(new_url, wait_until='networkidle', timeout=30000)
-                page.wait_for_timeout(2000)
-            else:
-                result['error'] = 'Could not determine URL structure'
-                if context:
-                    context.close()
-                if browser:
-                    browser.close()
-                if playwright:
-                    playwright.stop()
-                return result
-        except Exception as e:
-            result['error'] = f'Pricing tab: {str(e)[:50]}'
-            if context:
-                context.close()
-            if browser:
-                browser.close()
-            if playwright:
-                playwright.stop()
-            return result
-        
-        # Step 4: Check main table first
-        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-        page.wait_for_timeout(1000)
-        
-        try:
-            row = page.locator(f"tr:has-text('Up to {target_tier} users')").first
-            if row.count() > 0:
-                cells = row.locator("td")
-                if cells.count() >= 2:
-                    price = cells.nth(1).text_content().strip()
-                    result['price_raw'] = price
-                    result['price_usd'] = extract_usd_number(price)
-                    result['status'] = 'success'
-                    if context:
-                        context.close()
-                    if browser:
-                        browser.close()
-                    if playwright:
-                        playwright.stop()
-                    return result
-        except:
-            pass
-        
-        # Step 5: Click Explore pricing link - ENHANCED
-        page.evaluate("window.scrollTo(0, 0)")
-        page.wait_for_timeout(1000)
-        
-        explore_selectors = [
-            "a:has-text('Explore pricing for different user tiers')",
-            "//a[contains(text(), 'Explore pricing for different user tiers')]",
-            "//a[contains(., 'Explore pricing for different user tiers')]",
-            "a:has-text('Explore pricing')",
-            "//a[contains(text(), 'Explore pricing')]",
-            "//a[contains(., 'different user tiers')]",
-            "//*[contains(text(), 'Explore pricing for different user tiers')]",
-            "//*[contains(., 'Explore pricing for different user tiers')]",
+        view_button = page.locator("button:has-text('View for')").first
+        view_button.wait_for(state='visible', timeout=10000)
+        view_button.click()
+        page.wait_for_timeout(1500)
+    except Exception as e:
+        result['error'] = f'View dropdown: {str(e)[:50]}'
+        return result
+
+    # Step 2: Click Data Center
+    try:
+        page.wait_for_selector("//*[contains(text(), 'Hosting Types')]", timeout=5000)
+        page.wait_for_timeout(500)
+
+        dc_selectors = [
+            "//*[contains(text(), 'Hosting Types')]/following-sibling::*//*[contains(text(), 'Data Center')]",
+            "//*[contains(text(), 'Hosting Types')]/..//*[contains(text(), 'Data Center')]",
+            "//ul//*[contains(text(), 'Data Center')]",
+            "button:has-text('Data Center')",
+            "a:has-text('Data Center')",
+            "//*[contains(text(), 'Data Center')]",
         ]
-        
-        explore_clicked = False
-        for selector in explore_selectors:
+
+        dc_clicked = False
+        for selector in dc_selectors:
             try:
                 if selector.startswith("//"):
                     element = page.locator(f"xpath={selector}").first
                 else:
                     element = page.locator(selector).first
-                
-                element.wait_for(state='visible', timeout=8000)
-                element.scroll_into_view_if_needed()
-                page.wait_for_timeout(500)
-                element.click(timeout=10000)
+
+                element.wait_for(state='visible', timeout=3000)
+                element.click(timeout=5000)
+                page.wait_for_load_state('networkidle', timeout=30000)
                 page.wait_for_timeout(2000)
-                
-                # Wait for modal with multiple strategies
+                dc_clicked = True
+                break
+            except:
+                continue
+
+        if not dc_clicked:
+            result['error'] = 'Could not find Data Center option'
+            return result
+    except Exception as e:
+        result['error'] = f'Data Center: {str(e)[:50]}'
+        return result
+
+    # Step 3: Navigate to Pricing tab
+    try:
+        current_url = page.url
+        if '?tab=' in current_url or '&tab=' in current_url:
+            if '?tab=' in current_url:
+                new_url = current_url.replace('?tab=overview', '?tab=pricing').replace('?tab=reviews', '?tab=pricing')
+            else:
+                new_url = current_url.replace('&tab=overview', '&tab=pricing').replace('&tab=reviews', '&tab=pricing')
+
+            if 'hosting=datacenter' not in new_url:
+                if '?' in new_url:
+                    new_url += '&hosting=datacenter'
+                else:
+                    new_url += '?hosting=datacenter'
+
+            page.goto(new_url, wait_until='networkidle', timeout=30000)
+            page.wait_for_timeout(2000)
+        else:
+            result['error'] = 'Could not determine URL structure'
+            return result
+    except Exception as e:
+        result['error'] = f'Pricing tab: {str(e)[:50]}'
+        return result
+
+    # Step 4: Check main table first
+    page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    page.wait_for_timeout(1000)
+
+    try:
+        row = page.locator(f"tr:has-text('Up to {target_tier} users')").first
+        if row.count() > 0:
+            cells = row.locator("td")
+            if cells.count() >= 2:
+                price = cells.nth(1).text_content().strip()
+                result['price_raw'] = price
+                result['price_usd'] = extract_usd_number(price)
+                result['status'] = 'success'
+                return result
+    except:
+        pass
+
+    # Step 5: Click Explore pricing link - ENHANCED
+    page.evaluate("window.scrollTo(0, 0)")
+    page.wait_for_timeout(1000)
+
+    explore_selectors = [
+        "a:has-text('Explore pricing for different user tiers')",
+        "//a[contains(text(), 'Explore pricing for different user tiers')]",
+        "//a[contains(., 'Explore pricing for different user tiers')]",
+        "a:has-text('Explore pricing')",
+        "//a[contains(text(), 'Explore pricing')]",
+        "//a[contains(., 'different user tiers')]",
+        "//*[contains(text(), 'Explore pricing for different user tiers')]",
+        "//*[contains(., 'Explore pricing for different user tiers')]",
+    ]
+
+    explore_clicked = False
+    for selector in explore_selectors:
+        try:
+            if selector.startswith("//"):
+                element = page.locator(f"xpath={selector}").first
+            else:
+                element = page.locator(selector).first
+
+            element.wait_for(state='visible', timeout=8000)
+            element.scroll_into_view_if_needed()
+            page.wait_for_timeout(500)
+            element.click(timeout=10000)
+            page.wait_for_timeout(2000)
+
+            # Wait for modal with multiple strategies
+            try:
+                page.wait_for_selector("//h2[contains(text(), 'Data Center Pricing')]", timeout=15000)
+                explore_clicked = True
+                break
+            except:
                 try:
-                    page.wait_for_selector("//h2[contains(text(), 'Data Center Pricing')]", timeout=15000)
+                    page.wait_for_selector("//h2[contains(., 'Data Center Pricing')]", timeout=5000)
                     explore_clicked = True
                     break
                 except:
                     try:
-                        page.wait_for_selector("//h2[contains(., 'Data Center Pricing')]", timeout=5000)
+                        page.wait_for_selector("div[role='dialog'], div[class*='modal']", timeout=5000)
                         explore_clicked = True
                         break
                     except:
+                        continue
+        except:
+            continue
+
+    if not explore_clicked:
+        # Last resort: try to find any link with "pricing" and "tier" keywords
+        try:
+            all_links = page.locator("a").all()
+            for link in all_links:
+                try:
+                    link_text = link.text_content()
+                    if link_text and ('pricing' in link_text.lower() and ('tier' in link_text.lower() or 'user' in link_text.lower())):
+                        link.scroll_into_view_if_needed()
+                        page.wait_for_timeout(500)
+                        link.click()
+                        page.wait_for_timeout(2000)
                         try:
                             page.wait_for_selector("div[role='dialog'], div[class*='modal']", timeout=5000)
                             explore_clicked = True
                             break
                         except:
                             continue
-            except:
-                continue
-        
-        if not explore_clicked:
-            # Last resort: try to find any link with "pricing" and "tier" keywords
-            try:
-                all_links = page.locator("a").all()
-                for link in all_links:
-                    try:
-                        link_text = link.text_content()
-                        if link_text and ('pricing' in link_text.lower() and ('tier' in link_text.lower() or 'user' in link_text.lower())):
-                            link.scroll_into_view_if_needed()
-                            page.wait_for_timeout(500)
-                            link.click()
-                            page.wait_for_timeout(2000)
-                            try:
-                                page.wait_for_selector("div[role='dialog'], div[class*='modal']", timeout=5000)
-                                explore_clicked = True
-                                break
-                            except:
-                                continue
-                    except:
-                        continue
-            except:
-                pass
-        
-        if not explore_clicked:
-            result['error'] = 'Could not find Explore pricing link'
-            if context:
-                context.close()
-            if browser:
-                browser.close()
-            if playwright:
-                playwright.stop()
-            return result
-        
-        # Step 6: Find target tier in modal - ENHANCED
-        try:
-            page.wait_for_timeout(1500)
-            
-            # Scroll modal to top
-            try:
-                modal = page.locator("//div[contains(@class, 'modal')], //div[@role='dialog']").first
-                modal.evaluate("element => element.scrollTop = 0")
-                page.wait_for_timeout(1000)
-            except:
-                pass
-            
-            # Search for target tier with multiple patterns
-            patterns = [
-                f"Up to {target_tier} users",
-                f"Up to {int(target_tier):,} users",  # With comma: "1,000"
-                f"{target_tier} users",
-                f"{int(target_tier):,} users",
-            ]
-            
-            for pattern in patterns:
-                row_selectors = [
-                    f"//div[contains(@class, 'modal')]//tr[contains(., '{pattern}')]",
-                    f"//div[@role='dialog']//tr[contains(., '{pattern}')]",
-                    f"//tr[contains(., '{pattern}')]",
-                ]
-                
-                for selector in row_selectors:
-                    try:
-                        row = page.locator(f"xpath={selector}").first
-                        count = row.count()
-                        if count > 0:
-                            row.scroll_into_view_if_needed()
-                            page.wait_for_timeout(300)
-                            cells = row.locator("td")
-                            if cells.count() >= 2:
-                                price = cells.nth(1).text_content().strip()
-                                result['price_raw'] = price
-                                result['price_usd'] = extract_usd_number(price)
-                                result['status'] = 'success'
-                                if context:
-                                    context.close()
-                                if browser:
-                                    browser.close()
-                                if playwright:
-                                    playwright.stop()
-                                return result
-                    except:
-                        continue
-            
-            # Fallback: search all rows
-            try:
-                all_rows = page.locator("//div[contains(@class, 'modal')]//tr, //div[@role='dialog']//tr").all()
-                for r in all_rows:
-                    try:
-                        text = r.text_content()
-                        if target_tier in text and 'users' in text:
-                            r.scroll_into_view_if_needed()
-                            page.wait_for_timeout(300)
-                            cells = r.locator("td")
-                            if cells.count() >= 2:
-                                price = cells.nth(1).text_content().strip()
-                                result['price_raw'] = price
-                                result['price_usd'] = extract_usd_number(price)
-                                result['status'] = 'success'
-                                if context:
-                                    context.close()
-                                if browser:
-                                    browser.close()
-                                if playwright:
-                                    playwright.stop()
-                                return result
-                    except:
-                        continue
-            except Exception as e:
-                pass
-            
-            result['error'] = f'Could not find "Up to {target_tier} users" in modal'
-        except Exception as e:
-            result['error'] = f'Modal extraction: {str(e)[:80]}'
-        
-        # Cleanup
-        if context:
-            context.close()
-        if browser:
-            browser.close()
-        if playwright:
-            playwright.stop()
-        
-    except Exception as e:
-        result['error'] = str(e)[:100]
-        # Ensure cleanup on error
-        try:
-            if context:
-                context.close()
+                except:
+                    continue
         except:
             pass
+
+    if not explore_clicked:
+        result['error'] = 'Could not find Explore pricing link'
+        return result
+
+    # Step 6: Find target tier in modal - ENHANCED
+    try:
+        page.wait_for_timeout(1500)
+
+        # Scroll modal to top
         try:
-            if browser:
-                browser.close()
+            modal = page.locator("//div[contains(@class, 'modal')], //div[@role='dialog']").first
+            modal.evaluate("element => element.scrollTop = 0")
+            page.wait_for_timeout(1000)
         except:
             pass
+
+        # Search for target tier with multiple patterns
+        patterns = [
+            f"Up to {target_tier} users",
+            f"Up to {int(target_tier):,} users",  # With comma: "1,000"
+            f"{target_tier} users",
+            f"{int(target_tier):,} users",
+        ]
+
+        for pattern in patterns:
+            row_selectors = [
+                f"//div[contains(@class, 'modal')]//tr[contains(., '{pattern}')]",
+                f"//div[@role='dialog']//tr[contains(., '{pattern}')]",
+                f"//tr[contains(., '{pattern}')]",
+            ]
+
+            for selector in row_selectors:
+                try:
+                    row = page.locator(f"xpath={selector}").first
+                    count = row.count()
+                    if count > 0:
+                        row.scroll_into_view_if_needed()
+                        page.wait_for_timeout(300)
+                        cells = row.locator("td")
+                        if cells.count() >= 2:
+                            price = cells.nth(1).text_content().strip()
+                            result['price_raw'] = price
+                            result['price_usd'] = extract_usd_number(price)
+                            result['status'] = 'success'
+                            return result
+                except:
+                    continue
+
+        # Fallback: search all rows
         try:
-            if playwright:
-                playwright.stop()
-        except:
+            all_rows = page.locator("//div[contains(@class, 'modal')]//tr, //div[@role='dialog']//tr").all()
+            for r in all_rows:
+                try:
+                    text = r.text_content()
+                    if target_tier in text and 'users' in text:
+                        r.scroll_into_view_if_needed()
+                        page.wait_for_timeout(300)
+                        cells = r.locator("td")
+                        if cells.count() >= 2:
+                            price = cells.nth(1).text_content().strip()
+                            result['price_raw'] = price
+                            result['price_usd'] = extract_usd_number(price)
+                            result['status'] = 'success'
+                            return result
+                except:
+                    continue
+        except Exception as e:
             pass
-    
+
+        result['error'] = f'Could not find "Up to {target_tier} users" in modal'
+    except Exception as e:
+        result['error'] = f'Modal extraction: {str(e)[:80]}'
+
     return result
 
+class PriceCache:
+    """
+    Successful lookups in SQLite, keyed by (plugin_id, tier). Entries younger than PRICE_TTL are
+    fresh; older ones up to PRICE_STALE_TTL are served while a refresh runs in the background.
+    """
+
+    def __init__(self, path=PRICE_CACHE_DB):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS prices (plugin_id TEXT, tier TEXT, result TEXT, fetched_at REAL, PRIMARY KEY (plugin_id, tier))")
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    def get(self, plugin_id, tier):
+        """(result, age in seconds) or (None, None)."""
+        with self.lock:
+            row = self.conn.execute("SELECT result, fetched_at FROM prices WHERE plugin_id=? AND tier=?", (plugin_id, tier)).fetchone()
+        if not row:
+            return None, None
+        return json.loads(row[0]), time.time() - row[1]
+
+    def put(self, result):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)",
+                              (result['plugin_id'], result['user_tier'], json.dumps(result), time.time()))
+
+    def stats(self):
+        with self.lock:
+            total, fresh = self.conn.execute("SELECT COUNT(*), SUM(fetched_at > ?) FROM prices", (time.time() - PRICE_TTL,)).fetchone()
+        return {'entries': total, 'fresh': fresh or 0}
+
+price_cache = PriceCache()
+_resolver = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix='price')
+_batch_resolver = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _resolve(plugin_id, tier, block):
+    """Marketplace pricing API first; only apps it cannot answer are rendered on the browser pool."""
+    api = marketplace_pricing.lookup_price(plugin_id, tier)
+    if api:
+        result = _new_result(plugin_id, tier)
+        result.update(price_raw=api['price'], price_usd=api['price_usd'], status='success', source='api')
+    else:
+        result = dict(pool.submit(_scrape_page, plugin_id, tier, block=block).result(timeout=REQUEST_TIMEOUT), source='browser')
+    result['cache'] = 'miss'
+    if result['status'] == 'success':
+        price_cache.put(result)
+    return result
+
+def _fetch(plugin_id, tier, block, batch=False):
+    """
+    Future for a live lookup; callers asking for the same (plugin_id, tier) meanwhile share it.
+    Batch lookups run on _batch_resolver and are only shared with other batch lookups, so a single
+    request never waits behind a batch's queue.
+    """
+    key = (plugin_id, tier, batch)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future:
+            return future
+        future = _inflight[key] = (_batch_resolver if batch else _resolver).submit(_resolve, plugin_id, tier, block)
+
+    def done(f):
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+    future.add_done_callback(done)
+    return future
+
+def lookup_price(plugin_id: str, tier: str, refresh=False, block=False, batch=False) -> Future:
+    """Cached, coalesced lookup. A stale entry is returned at once and refreshed in the background."""
+    if not refresh:
+        cached, age = price_cache.get(plugin_id, tier)
+        if cached and age < PRICE_STALE_TTL:
+            if age >= PRICE_TTL:
+                _fetch(plugin_id, tier, block=False, batch=batch)
+            future = Future()
+            future.set_result(dict(cached, cache='hit' if age < PRICE_TTL else 'stale'))
+            return future
+    return _fetch(plugin_id, tier, block, batch)
+
+def _wait(future, plugin_id, tier):
+    try:
+        return future.result(timeout=REQUEST_TIMEOUT)
+    except FutureTimeout:
+        result = _new_result(plugin_id, tier)
+        result['error'] = f'Timed out after {REQUEST_TIMEOUT}s'
+    except PoolBusy as e:
+        result = _new_result(plugin_id, tier)
+        result['status'], result['error'] = 'busy', str(e)
+    except Exception as e:
+        result = _new_result(plugin_id, tier)
+        result['error'] = str(e)[:100]
+    return result
+
+def scrape_plugin_price(plugin_id: str, target_tier: str, refresh=False) -> dict:
+    """Pricing for a single plugin from the cache, the pricing API or a pooled browser (thread-safe)."""
+    return _wait(lookup_price(plugin_id, target_tier, refresh), plugin_id, target_tier)
+
+# --- Batch lookups ---
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def _batch_result(plugin_req, result=None, error=None):
+    if error:
+        return {'plugin_id': plugin_req.get('plugin_id') or 'unknown', 'status': 'error', 'error': error}
+    return {
+        'plugin_id': result['plugin_id'],
+        'user_tier': result['user_tier'],
+        'price_usd': result['price_usd'],
+        'price_raw': result['price_raw'],
+        'status': result['status'],
+        'error': result.get('error'),
+        'cache': result.get('cache'),
+        'source': result.get('source'),
+        'timestamp': result['timestamp']
+    }
+
+def run_batch(plugins, refresh=False, on_result=None):
+    """
+    All lookups are queued up front on the batch executor: BATCH_WORKERS at a time, with browser
+    fallbacks waiting for a free pool slot, so single /price calls keep the API_WORKERS threads and
+    most of the pool queue. Results keep the request order; on_result(index, row) is called as each
+    one finishes.
+    """
+    results = [None] * len(plugins)
+    pending = []
+    for i, plugin_req in enumerate(plugins):
+        plugin_id, tier = plugin_req.get('plugin_id'), plugin_req.get('tier')
+        if not plugin_id or not tier:
+            results[i] = _batch_result(plugin_req, error='plugin_id and tier are required')
+        elif not normalize_tier(tier):
+            results[i] = _batch_result(plugin_req, error=f'Invalid tier format: {tier}')
+        else:
+            tier = normalize_tier(tier)
+            pending.append((i, plugin_id, tier, lookup_price(plugin_id, tier, refresh, block=True, batch=True)))
+        if results[i] and on_result:
+            on_result(i, results[i])
+    for i, plugin_id, tier, future in pending:
+        results[i] = _batch_result(None, _wait(future, plugin_id, tier))
+        if on_result:
+            on_result(i, results[i])
+    return results
+
+def start_batch_job(plugins, refresh=False):
+    """Runs run_batch in a background thread; progress is polled via GET /price/jobs/<job_id>."""
+    now = time.time()
+    job_id = uuid.uuid4().hex[:12]
+    job = {'job_id': job_id, 'status': 'running', 'total': len(plugins), 'done': 0,
+           'results': [None] * len(plugins), 'created': now, 'finished': None}
+
+    def record(i, row):
+        with _jobs_lock:
+            job['results'][i] = row
+            job['done'] += 1
+
+    def run():
+        try:
+            run_batch(plugins, refresh, record)
+            status = 'completed'
+        except Exception as e:
+            job['error'] = str(e)[:100]
+            status = 'failed'
+        with _jobs_lock:
+            job['status'], job['finished'] = status, time.time()
+
+    with _jobs_lock:
+        for old_id in [j for j, old in _jobs.items() if old['finished'] and now - old['finished'] > JOB_RETENTION]:
+            del _jobs[old_id]
+        _jobs[job_id] = job
+    threading.Thread(target=run, name=f'batch-{job_id}', daemon=True).start()
+    return job_id
+
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint."""
     return jsonify({
         'status': 'healthy',
         'service': 'Atlassian Marketplace Pricing API',
+        'browser_pool': pool.status(),
+        'price_cache': price_cache.stats(),
         'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     })
 
@@ -407,16 +673,19 @@ def get_price():
         "plugin_id": "com.onresolve.jira.groovy.groovyrunner",
         "tier": "10000"
     }
+    Add refresh=1 (or "refresh": true) to bypass the price cache.
     """
     try:
         # Support both GET and POST
         if request.method == 'GET':
             plugin_id = request.args.get('plugin_id')
             tier = request.args.get('tier')
+            refresh = request.args.get('refresh', '').lower() in ('1', 'true', 'yes')
         else:
             data = request.get_json() or {}
             plugin_id = data.get('plugin_id')
             tier = data.get('tier')
+            refresh = bool(data.get('refresh'))
         
         # Validate inputs
         if not plugin_id:
@@ -442,8 +711,8 @@ def get_price():
                 'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }), 400
         
-        # Scrape price (creates new browser per request - thread-safe)
-        result = scrape_plugin_price(plugin_id, normalized_tier)
+        # Cached price, or a lookup on a pooled browser
+        result = scrape_plugin_price(plugin_id, normalized_tier, refresh)
         
         # Format response
         response = {
@@ -452,11 +721,15 @@ def get_price():
             'price_usd': result['price_usd'],
             'price_raw': result['price_raw'],
             'status': result['status'],
+            'cache': result.get('cache'),
+            'source': result.get('source'),
             'timestamp': result['timestamp']
         }
         
         if result['error']:
             response['error'] = result['error']
+            if result['status'] == 'busy':
+                return jsonify(response), 503
             return jsonify(response), 500 if result['status'] == 'failed' else 200
         
         return jsonify(response), 200
@@ -471,15 +744,19 @@ def get_price():
 @app.route('/price/batch', methods=['POST'])
 def get_price_batch():
     """
-    Get pricing for multiple plugins.
+    Get pricing for multiple plugins, POOL_SIZE lookups at a time.
     
     POST /price/batch
     {
         "plugins": [
             {"plugin_id": "com.onresolve.jira.groovy.groovyrunner", "tier": "10000"},
             {"plugin_id": "com.valiantys.jira.plugins.SQLFeed", "tier": "5000"}
-        ]
+        ],
+        "refresh": false,
+        "async": false
     }
+    Batches over SYNC_BATCH_LIMIT plugins (or "async": true) return 202 with a job_id to poll
+    at GET /price/jobs/<job_id>.
     """
     try:
         data = request.get_json() or {}
@@ -492,39 +769,18 @@ def get_price_batch():
                 'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }), 400
         
-        results = []
-        for plugin_req in plugins:
-            plugin_id = plugin_req.get('plugin_id')
-            tier = plugin_req.get('tier')
-            
-            if not plugin_id or not tier:
-                results.append({
-                    'plugin_id': plugin_id or 'unknown',
-                    'status': 'error',
-                    'error': 'plugin_id and tier are required'
-                })
-                continue
-            
-            normalized_tier = normalize_tier(tier)
-            if not normalized_tier:
-                results.append({
-                    'plugin_id': plugin_id,
-                    'status': 'error',
-                    'error': f'Invalid tier format: {tier}'
-                })
-                continue
-            
-            result = scrape_plugin_price(plugin_id, normalized_tier)
-            results.append({
-                'plugin_id': result['plugin_id'],
-                'user_tier': result['user_tier'],
-                'price_usd': result['price_usd'],
-                'price_raw': result['price_raw'],
-                'status': result['status'],
-                'error': result.get('error'),
-                'timestamp': result['timestamp']
-            })
+        refresh = bool(data.get('refresh'))
+        if data.get('async') or len(plugins) > SYNC_BATCH_LIMIT:
+            job_id = start_batch_job(plugins, refresh)
+            return jsonify({
+                'status': 'running',
+                'job_id': job_id,
+                'total': len(plugins),
+                'poll': f'/price/jobs/{job_id}',
+                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }), 202
         
+        results = run_batch(plugins, refresh)
         return jsonify({
             'status': 'completed',
             'results': results,
@@ -539,7 +795,25 @@ def get_price_batch():
             'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }), 500
 
+@app.route('/price/jobs/<job_id>', methods=['GET'])
+def get_batch_job(job_id):
+    """Progress of a background batch; results holds null for lookups still running."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if not job:
+            return jsonify({
+                'status': 'error',
+                'error': f'Unknown or expired job: {job_id}',
+                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }), 404
+        response = dict(job, results=list(job['results']))
+    for key in ('created', 'finished'):
+        if response[key]:
+            response[key] = datetime.fromtimestamp(response[key]).strftime("%Y-%m-%d %H:%M:%S")
+    return jsonify(response), 200
+
 if __name__ == '__main__':
     # Run on all interfaces, port 5000
-    # threaded=True allows concurrent requests, each gets its own browser instance
+    # threaded=True allows concurrent requests; lookups share the POOL_SIZE warm browsers
+    pool.start()
     app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
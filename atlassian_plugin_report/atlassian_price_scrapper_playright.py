@@ -10,6 +10,7 @@ import re
 from datetime import datetime
 from urllib.parse import urlparse
 import os
+from marketplace_pricing import lookup_price
 
 # ===== CONFIGURATION =====
 # Update these paths for your Linux VM
@@ -315,14 +316,9 @@ def main():
     # Get current timestamp
     current_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
-    # Launch browser once
+    # Launch browser once, on the first plugin the pricing API cannot answer
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=HEADLESS, slow_mo=SLOW_MO)
-        context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-        )
-        page = context.new_page()
+        browser = page = None
         
         success_count = 0
         failed_count = 0
@@ -357,14 +353,25 @@ def main():
             app_name = row.get('App Name', 'Unknown')
             print(f"[{idx+1}/{len(df)}] Processing: {app_name} (Tier: {tier})")
             
-            result = scrape_plugin_playwright(plugin_id, page, tier)
+            api = lookup_price(plugin_id, tier)
+            if api:
+                result = {'price': api['price'], 'status': 'success', 'error': None}
+            else:
+                if page is None:
+                    browser = p.chromium.launch(headless=HEADLESS, slow_mo=SLOW_MO)
+                    context = browser.new_context(
+                        viewport={'width': 1920, 'height': 1080},
+                        user_agent='Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+                    )
+                    page = context.new_page()
+                result = scrape_plugin_playwright(plugin_id, page, tier)
             
             if result['status'] == 'success':
                 price_str = result['price']
                 price_number = extract_usd_number(price_str)
                 df.at[idx, 'Listing Price (USD)'] = price_number
                 df.at[idx, 'Price Check Date/Time'] = current_timestamp
-                print(f"  ✓ Price: {price_str} (USD: {price_number})")
+                print(f"  ✓ Price: {price_str} (USD: {price_number}){' [api]' if api else ''}")
                 success_count += 1
             else:
                 df.at[idx, 'Listing Price (USD)'] = ""
@@ -372,10 +379,12 @@ def main():
                 print(f"  ✗ Failed: {result['error']}")
                 failed_count += 1
             
-            # Small delay between requests
-            page.wait_for_timeout(1000)
+            # Small delay between browser requests
+            if not api:
+                page.wait_for_timeout(1000)
         
-        browser.close()
+        if browser:
+            browser.close()
     
     # Save results
     print()
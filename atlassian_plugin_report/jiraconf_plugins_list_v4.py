@@ -1,8 +1,7 @@
-import requests
-import json
-import warnings
 import csv
 import datetime
+import argparse
+from license_collector import collect, MAX_WORKERS, SNAPSHOT_DIR
 
 # --- Configuration ---
 
@@ -24,9 +23,6 @@ CSV_HEADERS = [
     "App Key"
 ]
 
-# Suppress only the InsecureRequestWarning from unverified HTTPS requests
-warnings.filterwarnings('ignore', message='Unverified HTTPS request')
-
 # Define your Jira/Confluence instances. 
 # Use Personal Access Tokens (PATs) for security.
 SERVERS = [
@@ -43,99 +39,75 @@ SERVERS = [
     # Add more servers here
 ]
 
-# UPM API endpoint to find marketplace apps
-API_ENDPOINT = "/rest/plugins/1.0/installed-marketplace"
-
 # --- Main Function ---
 
-def get_paid_apps(base_url, token, server_name):
+def parse_paid_apps(data, server_name):
     """
-    Connects to an instance and returns a list of dictionaries
+    Turns one instance's UPM installed-marketplace response into a list of dictionaries
     containing paid app license details.
     """
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "*/*"  # Avoid 406 Not Acceptable errors
-    }
-    
     paid_apps_list = []
-    
-    try:
-        # Set verify=False to ignore SSL certificate errors
-        response = requests.get(
-            base_url + API_ENDPOINT, 
-            headers=headers, 
-            timeout=10, 
-            verify=False 
-        )
-        
-        # Check for successful response
-        response.raise_for_status()
-        
-        try:
-            data = response.json()
-        except json.JSONDecodeError:
-            print(f"  [ERROR] Response for {server_name} ({base_url}) was not valid JSON.")
-            return []
 
-        # --- ★ NEW ★ ---
-        # Get the parent application's (Host) SEN
-        host_status = data.get('hostStatus', {})
-        host_license = host_status.get('hostLicense', {})
-        host_sen = host_license.get('supportEntitlementNumber', 'N/A')
-        # --- End New ---
+    # --- ★ NEW ★ ---
+    # Get the parent application's (Host) SEN
+    host_status = data.get('hostStatus', {})
+    host_license = host_status.get('hostLicense', {})
+    host_sen = host_license.get('supportEntitlementNumber', 'N/A')
+    # --- End New ---
 
-        for plugin in data.get('plugins', []):
-            # A plugin is considered "paid" if it has the licenseDetails object
-            license_details = plugin.get('licenseDetails')
+    for plugin in data.get('plugins', []):
+        # A plugin is considered "paid" if it has the licenseDetails object
+        license_details = plugin.get('licenseDetails')
+        
+        if license_details:
             
-            if license_details:
-                
-                # Get license status
-                is_valid = license_details.get('valid')
-                status = "VALID"
-                if not is_valid:
-                    # Will grab "EXPIRED" or "INVALID"
-                    status = license_details.get('error', 'INVALID') 
-                
-                app_key = plugin.get('key')
-                
-                # Create a dictionary. Keys MUST match CSV_HEADERS.
-                app_data = {
-                    "Server Name": server_name,
-                    "Host SEN": host_sen,  # <-- ★ NEW ★
-                    "App Name": plugin.get('name'),
-                    "App Key": app_key,
-                    "License Tier": license_details.get('maximumNumberOfUsers', 'Unknown Tier'),
-                    "License Status": status,
-                    "Maintenance Expiry": license_details.get('maintenanceExpiryDateString', 'N/A'),
-                    "SEN": license_details.get('supportEntitlementNumber', 'N/A'), # App SEN
-                    "Marketplace URL": f"https://marketplace.atlassian.com/plugins/{app_key}"
-                }
-                paid_apps_list.append(app_data)
-                
-    except requests.exceptions.HTTPError as e:
-        print(f"  [ERROR] HTTP Error for {server_name}: {e.response.status_code}")
-        if e.response.status_code == 401:
-            print("  [HINT] Received 401 Unauthorized. Check your Personal Access Token (PAT).")
-    except requests.exceptions.ConnectionError as e:
-        print(f"  [ERROR] Connection Error for {server_name}: Could not connect.")
-    except Exception as e:
-        print(f"  [ERROR] An unknown error occurred for {server_name}: {e}")
+            # Get license status
+            is_valid = license_details.get('valid')
+            status = "VALID"
+            if not is_valid:
+                # Will grab "EXPIRED" or "INVALID"
+                status = license_details.get('error', 'INVALID') 
+            
+            app_key = plugin.get('key')
+            
+            # Create a dictionary. Keys MUST match CSV_HEADERS.
+            app_data = {
+                "Server Name": server_name,
+                "Host SEN": host_sen,  # <-- ★ NEW ★
+                "App Name": plugin.get('name'),
+                "App Key": app_key,
+                "License Tier": license_details.get('maximumNumberOfUsers', 'Unknown Tier'),
+                "License Status": status,
+                "Maintenance Expiry": license_details.get('maintenanceExpiryDateString', 'N/A'),
+                "SEN": license_details.get('supportEntitlementNumber', 'N/A'), # App SEN
+                "Marketplace URL": f"https://marketplace.atlassian.com/plugins/{app_key}"
+            }
+            paid_apps_list.append(app_data)
         
     return paid_apps_list
 
 # --- Run The Script ---
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paid app license list for the SERVERS defined in this script.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help=f"Servers queried at once (default: {MAX_WORKERS})")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR, help=f"Last good response per server (default: {SNAPSHOT_DIR})")
+    parser.add_argument("--no-snapshots", action="store_true", help="Neither write snapshots nor fall back to them")
+    args = parser.parse_args()
+
     print(f"Starting plugin budget report... (Will save to {CSV_FILENAME})\n")
     
     all_paid_apps = []
 
-    for server in SERVERS:
+    # All servers are queried at once; each prints when it finishes
+    for server, data, snapshot_time, error in collect(SERVERS, args.workers, None if args.no_snapshots else args.snapshot_dir):
         print(f"--- Checking Server: {server['name']} ({server['url']}) ---")
+        if error:
+            print(f"  [ERROR] {error}")
+        if snapshot_time:
+            print(f"  [WARN] Using last good snapshot from {snapshot_time}")
         
-        apps = get_paid_apps(server['url'], server['token'], server['name'])
+        apps = parse_paid_apps(data, server['name']) if data else []
         
         if apps:
             print(f"  Found {len(apps)} paid apps.")
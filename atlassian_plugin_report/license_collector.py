@@ -0,0 +1,105 @@
+"""
+Concurrent UPM license collection for the plugin report scripts.
+Every server is queried in parallel on one pooled session with retries; the raw response of each
+successful fetch is kept as a per-server snapshot that a failed server can fall back to.
+"""
+
+import os
+import re
+import json
+import datetime
+import warnings
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# --- Configuration ---
+API_ENDPOINT = "/rest/plugins/1.0/installed-marketplace"  # UPM API endpoint to find marketplace apps
+TIMEOUT = 10           # Seconds per request; a server entry can override it with "timeout"
+RETRIES = 2            # Retries on connection errors and 429/502/503/504, with backoff
+MAX_WORKERS = 8        # Servers queried at once
+SNAPSHOT_DIR = "license_snapshots"
+
+# Suppress only the InsecureRequestWarning from unverified HTTPS requests
+warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+
+def make_session(pool_size=MAX_WORKERS, retries=RETRIES):
+    """One keep-alive session for all servers, retrying idempotent GETs with exponential backoff."""
+    retry = Retry(total=retries, connect=retries, read=retries, backoff_factor=1,
+                  status_forcelist=[429, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.verify = False
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def fetch_installed(session, server):
+    """Raw UPM installed-marketplace JSON for one server entry ({name, url, token[, timeout]})."""
+    response = session.get(
+        server['url'].rstrip('/') + API_ENDPOINT,
+        headers={"Authorization": f"Bearer {server['token']}", "Accept": "*/*"},
+        timeout=server.get('timeout', TIMEOUT)
+    )
+    response.raise_for_status()
+    return response.json()
+
+def describe_error(e, server):
+    if isinstance(e, requests.exceptions.HTTPError):
+        hint = " - Received 401 Unauthorized. Check your Personal Access Token (PAT)." if e.response.status_code == 401 else ""
+        return f"HTTP Error for {server['name']}: {e.response.status_code}{hint}"
+    # Timeouts that used up the retries surface as ConnectionError(MaxRetryError(ReadTimeoutError))
+    if isinstance(e, requests.exceptions.Timeout) or (isinstance(e, requests.exceptions.ConnectionError) and "timed out" in str(e)):
+        return f"Timeout for {server['name']}: no answer within {server.get('timeout', TIMEOUT)}s"
+    if isinstance(e, requests.exceptions.RetryError):
+        return f"HTTP Error for {server['name']}: still failing after {RETRIES} retries"
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return f"Connection Error for {server['name']}: Could not connect."
+    if isinstance(e, ValueError):
+        return f"Response for {server['name']} ({server['url']}) was not valid JSON."
+    return f"An unknown error occurred for {server['name']}: {e}"
+
+def _snapshot_path(snapshot_dir, server):
+    return os.path.join(snapshot_dir, re.sub(r'[^A-Za-z0-9._-]', '_', server['name']) + ".json")
+
+def save_snapshot(snapshot_dir, server, data):
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = _snapshot_path(snapshot_dir, server)
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({"server": server['name'], "url": server['url'],
+                   "fetched_at": datetime.datetime.now().isoformat(timespec='seconds'), "data": data}, f)
+    os.replace(path + ".tmp", path)
+
+def load_snapshot(snapshot_dir, server):
+    """(data, fetched_at) of the server's last good fetch, or (None, None)."""
+    path = _snapshot_path(snapshot_dir, server)
+    try:
+        with open(path, encoding='utf-8') as f:
+            snap = json.load(f)
+        return snap['data'], snap['fetched_at']
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+def collect(servers, workers=MAX_WORKERS, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Queries all servers concurrently and yields (server, data, snapshot_time, error) as each one
+    finishes. snapshot_time is None for live data, or the fetch time of the snapshot a failed server
+    fell back to; data is None when there is neither. snapshot_dir=None disables snapshots.
+    """
+    session = make_session(max(1, workers))
+
+    def fetch(server):
+        try:
+            data = fetch_installed(session, server)
+        except Exception as e:
+            error = describe_error(e, server)
+            data, snapshot_time = load_snapshot(snapshot_dir, server) if snapshot_dir else (None, None)
+            return server, data, snapshot_time, error
+        if snapshot_dir:
+            save_snapshot(snapshot_dir, server, data)
+        return server, data, None, None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for future in as_completed([pool.submit(fetch, server) for server in servers]):
+            yield future.result()
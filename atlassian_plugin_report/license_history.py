@@ -0,0 +1,166 @@
+"""
+Historical plugin license store.
+Every plugin report run appends its rows, normalized, to a local SQLite database keyed by
+(server, app, report date), so expiry, tier and footprint questions are answered with one query
+instead of by opening dated CSVs.
+"""
+
+import os
+import re
+import csv
+import sys
+import sqlite3
+import argparse
+import datetime
+
+# --- Configuration ---
+DB_FILE = "license_history.db"
+
+# Date formats seen in UPM responses: "May 31, 2026", "31/May/26", "19 Dec 2024", "Aug 08, 2024", "2025-11-07"
+EXPIRY_FORMATS = ['%B %d, %Y', '%d/%b/%y', '%d %b %Y', '%b %d, %Y', '%Y-%m-%d']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS licenses (
+    report_date TEXT, server TEXT, app_key TEXT, app_name TEXT,
+    license_tier TEXT, license_status TEXT, expiry TEXT, sen TEXT,
+    host_sen TEXT, host_tier TEXT, host_expiry TEXT,
+    PRIMARY KEY (server, app_key, report_date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS licenses_date ON licenses (report_date, server);
+CREATE INDEX IF NOT EXISTS licenses_app ON licenses (app_key, report_date);
+CREATE INDEX IF NOT EXISTS licenses_expiry ON licenses (expiry);
+"""
+
+# Rows of each server's most recent report
+LATEST = """
+WITH latest AS (SELECT server, MAX(report_date) AS report_date FROM licenses GROUP BY server)
+SELECT l.* FROM licenses l JOIN latest USING (server, report_date)
+"""
+
+def parse_date(date_str):
+    """UPM date string -> datetime.date, or None if empty or in no known format."""
+    if not date_str or date_str == 'N/A':
+        return None
+    for fmt in EXPIRY_FORMATS:
+        try:
+            return datetime.datetime.strptime(date_str, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+def _iso(date_str):
+    d = parse_date(date_str)
+    return d.isoformat() if d else None
+
+def connect(path=DB_FILE):
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def record_rows(conn, rows, report_date=None):
+    """
+    Upserts plugin report rows (CSV_HEADERS dicts of atlassian_plugin_report_v6.py or the shorter
+    jiraconf_plugins_list_v4.py ones). Rows without "Report Date" get report_date; ValueError if
+    neither gives a date. Returns the count.
+    """
+    values = []
+    for row in rows:
+        values.append((
+            row.get("Report Date") or report_date, row["Server Name"], row["App Key"], row.get("App Name"),
+            str(row.get("License Tier", "")), row.get("License Status"), _iso(row.get("Maintenance Expiry")), row.get("SEN"),
+            row.get("Host SEN"), str(row.get("Host User Tier") or "") or None, _iso(row.get("Host Expiry Date"))
+        ))
+        if not values[-1][0]:
+            raise ValueError(f"no report date for {row['Server Name']} / {row['App Key']}")
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO licenses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+    return len(values)
+
+def import_csv(conn, path, report_date=None):
+    """
+    Backfills one plugin_report_<date>.csv. Rows without a Report Date column get report_date, else
+    the date in the file name; ValueError if there is neither.
+    """
+    match = re.search(r'(\d{4}-\d{2}-\d{2})', os.path.basename(path))
+    with open(path, newline='', encoding='utf-8') as f:
+        return record_rows(conn, list(csv.DictReader(f)), report_date or (match.group(1) if match else None))
+
+# --- QUERIES ---
+def expiring(conn, days, include_expired=False, today=None):
+    """Apps whose maintenance expires within `days` days, from each server's latest report."""
+    today = today or datetime.date.today()
+    start = "0000-01-01" if include_expired else today.isoformat()
+    return conn.execute(f"""SELECT expiry, server, app_name, app_key, license_tier, license_status FROM ({LATEST})
+                            WHERE expiry BETWEEN ? AND ? ORDER BY expiry, server""",
+                        (start, (today + datetime.timedelta(days=days)).isoformat())).fetchall()
+
+def tier_changes(conn, app_key=None, since=None):
+    """Every report where an app's license tier differs from the previous report on the same server."""
+    return conn.execute("""SELECT report_date, server, app_name, app_key, prev_tier, license_tier FROM (
+                               SELECT *, LAG(license_tier) OVER (PARTITION BY server, app_key ORDER BY report_date) AS prev_tier
+                               FROM licenses WHERE (? IS NULL OR app_key = ?))
+                           WHERE prev_tier IS NOT NULL AND prev_tier != license_tier AND (? IS NULL OR report_date >= ?)
+                           ORDER BY report_date, server, app_name""", (app_key, app_key, since, since)).fetchall()
+
+def single_instance(conn):
+    """Apps that only one server has installed, by each server's latest report."""
+    return conn.execute(f"""SELECT server, app_name, app_key, license_tier, expiry FROM ({LATEST})
+                            WHERE app_key IN (SELECT app_key FROM ({LATEST}) GROUP BY app_key HAVING COUNT(DISTINCT server) = 1)
+                            ORDER BY server, app_name""").fetchall()
+
+def app_history(conn, app_key):
+    return conn.execute("""SELECT report_date, server, license_tier, license_status, expiry FROM licenses
+                           WHERE app_key = ? ORDER BY server, report_date""", (app_key,)).fetchall()
+
+def print_table(headers, rows):
+    widths = [max([len(str(h))] + [len(str(r[i] if r[i] is not None else "N/A")) for r in rows]) for i, h in enumerate(headers)]
+    print(" | ".join(f"{h:<{w}}" for h, w in zip(headers, widths)))
+    print("-" * (sum(widths) + 3 * (len(widths) - 1)))
+    for r in rows:
+        print(" | ".join(f"{str(v if v is not None else 'N/A'):<{w}}" for v, w in zip(r, widths)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the plugin license history collected by the plugin report.")
+    parser.add_argument("--db", default=DB_FILE, help=f"SQLite history store (default: {DB_FILE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("import", help="Backfill from existing plugin_report_<date>.csv files")
+    p.add_argument("csv_files", nargs="+")
+    p.add_argument("--date", help="YYYY-MM-DD for CSVs with neither a Report Date column nor a date in the file name")
+
+    p = sub.add_parser("expiring", help="Apps expiring within N days across the fleet")
+    p.add_argument("--days", type=int, default=60)
+    p.add_argument("--include-expired", action="store_true", help="Also list apps already past expiry")
+
+    p = sub.add_parser("tier-changes", help="License tier changes over time")
+    p.add_argument("--app", help="Only this app key")
+    p.add_argument("--since", help="YYYY-MM-DD")
+
+    sub.add_parser("single-instance", help="Apps installed on only one server")
+
+    p = sub.add_parser("history", help="Every recorded report for one app")
+    p.add_argument("app_key")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "import":
+        for path in args.csv_files:
+            try:
+                print(f"[*] {path}: {import_csv(conn, path, args.date)} rows")
+            except ValueError as e:
+                print(f"[-] {path}: skipped, {e} (no Report Date column or date in the file name; use --date)", file=sys.stderr)
+            except (OSError, KeyError, sqlite3.Error) as e:
+                print(f"[-] {path}: {e}", file=sys.stderr)
+    elif args.command == "expiring":
+        rows = expiring(conn, args.days, args.include_expired)
+        print(f"[*] {len(rows)} apps expiring within {args.days} days\n")
+        print_table(["Expiry", "Server", "App Name", "App Key", "Tier", "Status"], rows)
+    elif args.command == "tier-changes":
+        print_table(["Report Date", "Server", "App Name", "App Key", "From", "To"], tier_changes(conn, args.app, args.since))
+    elif args.command == "single-instance":
+        print_table(["Server", "App Name", "App Key", "Tier", "Expiry"], single_instance(conn))
+    else:
+        print_table(["Report Date", "Server", "Tier", "Status", "Expiry"], app_history(conn, args.app_key))
+
+if __name__ == "__main__":
+    main()
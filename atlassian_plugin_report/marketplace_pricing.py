@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Atlassian Marketplace Pricing - REST backend
+Reads the tier table from the marketplace pricing API over plain pooled HTTP. The browser
+scrapers only render the marketplace page when this returns nothing.
+
+Offline runs: set MARKETPLACE_FIXTURES to a directory. With MARKETPLACE_FIXTURE_MODE=record
+every API response (404s included) is saved there; the default mode, replay, serves them back
+without touching the network.
+
+    MARKETPLACE_FIXTURES=./fixtures MARKETPLACE_FIXTURE_MODE=record python3 marketplace_pricing.py com.onresolve.jira.groovy.groovyrunner 500
+    MARKETPLACE_FIXTURES=./fixtures python3 marketplace_pricing.py com.onresolve.jira.groovy.groovyrunner 500
+"""
+
+import os
+import sys
+import json
+import threading
+import requests
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+
+# ===== CONFIGURATION =====
+MARKETPLACE_API = "https://marketplace.atlassian.com/rest/2"
+HOSTING = "datacenter"
+HTTP_TIMEOUT = 15
+POOL_CONNECTIONS = 16
+FIXTURE_DIR = os.environ.get("MARKETPLACE_FIXTURES")
+FIXTURE_MODE = os.environ.get("MARKETPLACE_FIXTURE_MODE", "replay")
+# =========================
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """One keep-alive session for every lookup (thread-safe for GETs)."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update({'Accept': 'application/json'})
+            _session.mount('https://', HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_CONNECTIONS))
+    return _session
+
+def _fixture_path(path):
+    return os.path.join(FIXTURE_DIR, quote(path.strip('/'), safe='') + '.json')
+
+def get_json(path):
+    """GET MARKETPLACE_API + path -> parsed JSON, or None on 404. Goes through the fixture directory when set."""
+    if FIXTURE_DIR and FIXTURE_MODE == "replay":
+        fixture = _fixture_path(path)
+        if not os.path.exists(fixture):
+            return None
+        with open(fixture) as f:
+            return json.load(f)['body']
+
+    response = get_session().get(MARKETPLACE_API + path, timeout=HTTP_TIMEOUT)
+    if response.status_code == 404:
+        body = None
+    else:
+        response.raise_for_status()
+        body = response.json()
+    if FIXTURE_DIR and FIXTURE_MODE == "record":
+        os.makedirs(FIXTURE_DIR, exist_ok=True)
+        with open(_fixture_path(path), 'w') as f:
+            json.dump({'url': MARKETPLACE_API + path, 'status': response.status_code, 'body': body}, f, indent=2)
+    return body
+
+def fetch_tiers(plugin_id: str, hosting: str = HOSTING) -> dict:
+    """{users: annual commercial price} from the live pricing of one app, or None if it has none."""
+    data = get_json(f"/addons/{quote(plugin_id, safe='')}/pricing/{hosting}/live")
+    if not data:
+        return None
+    tiers = {}
+    for item in data.get('items', []):
+        if item.get('licenseType', 'commercial') != 'commercial':
+            continue
+        users, amount = item.get('unitCount'), item.get('amount')
+        if users is None or amount is None or int(users) <= 0:
+            continue
+        tiers[int(users)] = float(amount)
+    return tiers or None
+
+def format_price(amount: float) -> str:
+    return f"${amount:,.0f}" if float(amount).is_integer() else f"${amount:,.2f}"
+
+def lookup_price(plugin_id: str, target_tier: str, hosting: str = HOSTING) -> dict:
+    """
+    {'price': '$1,234', 'price_usd': '1234', 'source': 'api'} for the "Up to <target_tier> users"
+    tier, or None when the API is unreachable or has no such tier (callers fall back to the browser).
+    """
+    try:
+        tiers = fetch_tiers(plugin_id, hosting)
+    except (requests.RequestException, ValueError):
+        return None
+    if not tiers or int(target_tier) not in tiers:
+        return None
+    amount = tiers[int(target_tier)]
+    return {'price': format_price(amount), 'price_usd': str(int(amount)), 'source': 'api'}
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit(f"Usage: {sys.argv[0]} <plugin_id> <tier>")
+    try:
+        tiers = fetch_tiers(sys.argv[1])
+    except requests.RequestException as e:
+        sys.exit(f"[-] Marketplace API request failed: {e}")
+    if not tiers:
+        sys.exit(f"[-] No {HOSTING} pricing for {sys.argv[1]}")
+    for users, amount in sorted(tiers.items()):
+        print(f"{'*' if users == int(sys.argv[2]) else ' '} Up to {users} users: {format_price(amount)}")
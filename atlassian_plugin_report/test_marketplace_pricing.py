@@ -0,0 +1,26 @@
+import os
+import pytest
+import marketplace_pricing as mp
+
+@pytest.fixture(autouse=True)
+def replay(monkeypatch):
+    """Serves the recorded responses in fixtures/ and fails any request that would hit the network."""
+    monkeypatch.setattr(mp, "FIXTURE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"))
+    monkeypatch.setattr(mp, "FIXTURE_MODE", "replay")
+    monkeypatch.setattr(mp, "get_session", lambda: pytest.fail("replay mode must not use the network"))
+
+def test_fetch_tiers_keeps_commercial_user_tiers():
+    tiers = mp.fetch_tiers("com.onresolve.jira.groovy.groovyrunner")
+    assert tiers == {500: 6750.0, 1000: 12000.0, 2000: 19800.0, 3000: 26400.0, 10000: 39600.5}
+
+def test_lookup_price_matching_tier():
+    assert mp.lookup_price("com.onresolve.jira.groovy.groovyrunner", "2000") == \
+        {"price": "$19,800", "price_usd": "19800", "source": "api"}
+    assert mp.lookup_price("com.onresolve.jira.groovy.groovyrunner", "10000")["price"] == "$39,600.50"
+
+def test_lookup_price_missing_tier():
+    assert mp.lookup_price("com.onresolve.jira.groovy.groovyrunner", "750") is None
+
+def test_unknown_addon_404():
+    assert mp.fetch_tiers("com.example.retired.app") is None
+    assert mp.lookup_price("com.example.retired.app", "500") is None
@@ -8,13 +8,21 @@ Original file is located at
 """
 
 import os
-import subprocess
 import sys
-import glob
+import json
+import time
+import uuid
+import hashlib
+import datetime
+import argparse
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 
 # =================CONFIGURATION=================
 
-# 1. Your Authentication Token
+# 1. Your Authentication Token ("user:token", sent as HTTP basic auth like curl -u)
 AUTH_TOKEN = "TOKEN"
 
 # 2. The Jira/Premier Support Ticket Number
@@ -30,124 +38,255 @@ FILES_TO_PROCESS = [
         "/projects/vmw-atlassian-jira/sharehome_a3/export/Confluence_conf1-prd-a3_3f0eb2ed_-10-74-203-29-5801_support_2025-12-19-22-03-04.zip"
 ]
 
-# 5. Delete chunks after successful upload to save disk space? (True/False)
-DELETE_CHUNKS_AFTER_UPLOAD = True
+# 5. Or a fixed chunk size in MB instead of CHUNK_COUNT (None = use CHUNK_COUNT)
+CHUNK_SIZE_MB = None
 
-# 6. Directory to store chunks ('.' for current dir, or None to use same dir as source file)
-# Using current directory is safer if /export/ is read-only.
-TEMP_CHUNK_DIR = "."
-
-# ===============================================
+# 6. Chunks uploaded at once, across all files
+PARALLEL_UPLOADS = 4
 
-def check_requirements():
-    """Checks if curl and split are installed."""
-    if subprocess.call("which curl > /dev/null", shell=True) != 0:
-        print("Error: 'curl' is not installed or not in PATH.")
-        sys.exit(1)
-    if subprocess.call("which split > /dev/null", shell=True) != 0:
-        print("Error: 'split' is not installed or not in PATH.")
-        sys.exit(1)
+# 7. Attempts per chunk on connection errors, 429 and 5xx (with backoff)
+RETRIES = 3
 
-def split_file(filepath, chunks, output_dir):
-    """Splits the file into N chunks using the native linux split command."""
-    if not os.path.exists(filepath):
-        print(f"Error: File not found: {filepath}")
-        return []
-
-    print(f"--- Splitting {os.path.basename(filepath)} into {chunks} chunks ---")
-
-    # Determine where to put chunks
-    if output_dir == '.':
-        output_dir = os.getcwd()
-    elif output_dir is None:
-        output_dir = os.path.dirname(filepath)
+# 8. Directory for the per-file manifests ('.' for current dir)
+# Using current directory is safer if /export/ is read-only.
+STATE_DIR = "."
 
-    base_name = os.path.basename(filepath)
-    prefix = os.path.join(output_dir, f"{base_name}.part_")
+# 9. Upload endpoint; point it at a local stub server to test
+UPLOAD_URL = "https://transfer.atlassian.com/api/upload/{ticket}"
 
-    # Construct split command: split -n <chunks> -d <file> <prefix>
-    cmd = ["split", "-n", str(chunks), "-d", filepath, prefix]
+# 10. (connect, read) timeout in seconds per chunk request; a stalled connection fails and is retried
+UPLOAD_TIMEOUT = (30, 300)
 
-    try:
-        subprocess.check_call(cmd)
-        print(f"Splitting complete. Chunks saved to {output_dir}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error splitting file: {e}")
-        return []
-
-    # Find the generated files
-    chunk_files = sorted(glob.glob(f"{prefix}*"))
-    return chunk_files
-
-def upload_chunk(chunk_path, ticket_id, auth_token):
-    """Uploads a single chunk using curl."""
-    url = f"https://transfer.atlassian.com/api/upload/{ticket_id}"
-    filename = os.path.basename(chunk_path)
-
-    print(f"Uploading chunk: {filename} ...")
-
-    # Construct curl command
-    cmd = [
-        "curl",
-        "-u", auth_token,
-        "-X", "POST",
-        "--header", "Transfer-Encoding: chunked",
-        "-F", f"files[]=@{chunk_path}",
-        url,
-        "--progress-bar",
-        "|", "tee", "/dev/null"
-    ]
-
-    full_cmd = " ".join(cmd)
+# ===============================================
 
+READ_BLOCK = 1024 * 1024
+
+class ChunkBody:
+    """
+    multipart/form-data body for one byte range of the source file, read straight from disk as
+    requests sends it: no chunk copies on disk and one reused block buffer in memory. The bytes
+    sent are hashed on the way, so the upload itself verifies the chunk against the manifest.
+    """
+
+    def __init__(self, path, offset, size, filename):
+        self.boundary = uuid.uuid4().hex
+        self.head = (f'--{self.boundary}\r\nContent-Disposition: form-data; name="files[]"; filename="{filename}"\r\n'
+                     'Content-Type: application/octet-stream\r\n\r\n').encode()
+        self.tail = f'\r\n--{self.boundary}--\r\n'.encode()
+        self.path, self.offset, self.size = path, offset, size
+        self.f, self.remaining, self.stage = None, size, 0
+        self.buf = memoryview(bytearray(READ_BLOCK))
+        self.sha256 = hashlib.sha256()
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self.head) + self.size + len(self.tail)
+
+    def read(self, n=-1):
+        if self.stage == 0:
+            self.stage = 1
+            self.f = open(self.path, 'rb', buffering=0)
+            self.f.seek(self.offset)
+            return self.head
+        if self.stage == 1:
+            if self.remaining > 0:
+                got = self.f.readinto(self.buf[:min(self.remaining, READ_BLOCK)])
+                if not got:
+                    raise IOError(f"{self.path} shrank while uploading")
+                self.remaining -= got
+                self.sha256.update(self.buf[:got])
+                return self.buf[:got]
+            self.stage = 2
+            self.f.close()
+            return self.tail
+        return b""
+
+    def close(self):
+        if self.f:
+            self.f.close()
+
+def plan_chunks(size, chunk_count=CHUNK_COUNT, chunk_size_mb=CHUNK_SIZE_MB):
+    """[(offset, size)] like `split -n N` (equal parts, remainder in the last) or fixed-size parts."""
+    if chunk_size_mb:
+        step = int(chunk_size_mb * 1024 * 1024)
+        return [(off, min(step, size - off)) for off in range(0, size, step)] or [(0, 0)]
+    n = max(1, min(chunk_count, size or 1))
+    step = size // n
+    return [(i * step, step if i < n - 1 else size - i * step) for i in range(n)]
+
+def chunk_name(filepath, index, count):
+    """Same names split -d produced (<file>.part_00, ...) so the parts reassemble with cat."""
+    return f"{os.path.basename(filepath)}.part_{index:0{max(2, len(str(count - 1)))}d}"
+
+# --- Manifest: chunk layout, checksums and upload state per source file ---
+def manifest_path(filepath, state_dir=STATE_DIR):
+    return os.path.join(os.getcwd() if state_dir == '.' else state_dir, os.path.basename(filepath) + ".manifest.json")
+
+def build_manifest(filepath, chunks):
+    """
+    Hashes the file in one sequential pass (readinto a reused buffer): SHA-256 of every chunk and
+    of the whole file. All chunks start out not uploaded.
+    """
+    st = os.stat(filepath)
+    view = memoryview(bytearray(READ_BLOCK))
+    whole, entries = hashlib.sha256(), []
+    with open(filepath, 'rb', buffering=0) as f:
+        for index, (offset, size) in enumerate(chunks):
+            h, left = hashlib.sha256(), size
+            while left:
+                got = f.readinto(view[:min(left, READ_BLOCK)])
+                if not got:
+                    raise IOError(f"{filepath} shrank while hashing")
+                h.update(view[:got])
+                whole.update(view[:got])
+                left -= got
+            entries.append({"name": chunk_name(filepath, index, len(chunks)), "offset": offset, "size": size,
+                            "sha256": h.hexdigest(), "uploaded": None})
+    return {"source": filepath, "size": st.st_size, "mtime": st.st_mtime, "sha256": whole.hexdigest(), "chunks": entries}
+
+def load_manifest(filepath, chunks, state_dir=STATE_DIR):
+    """
+    The manifest of a previous run if the file (size, mtime) and the chunk layout are unchanged, so
+    its checksums and confirmed chunks can be trusted without re-reading the file; None otherwise.
+    """
+    st = os.stat(filepath)
     try:
-        ret_code = subprocess.call(full_cmd, shell=True)
-        if ret_code == 0:
-            print(f"Successfully uploaded: {filename}")
-            return True
-        else:
-            print(f"Failed to upload: {filename} (Exit code {ret_code})")
-            return False
-    except Exception as e:
-        print(f"Exception during upload: {e}")
-        return False
+        with open(manifest_path(filepath, state_dir)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("size") != st.st_size or manifest.get("mtime") != st.st_mtime:
+        print(f"  [!] {os.path.basename(filepath)} changed since the last run, starting over")
+        return None
+    if [(c["offset"], c["size"]) for c in manifest.get("chunks", [])] != list(chunks):
+        print(f"  [!] Chunk layout of {os.path.basename(filepath)} changed since the last run, starting over")
+        return None
+    return manifest
+
+def save_manifest(manifest, state_dir=STATE_DIR):
+    path = manifest_path(manifest["source"], state_dir)
+    with open(path + ".tmp", 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+def make_session(pool_size, auth_token):
+    session = requests.Session()
+    user, _, password = auth_token.partition(':')
+    session.auth = (user, password)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def upload_chunk(session, url, filepath, chunk, retries=RETRIES, timeout=UPLOAD_TIMEOUT):
+    """
+    POSTs one manifest chunk as files[]=<name>. Retries transient failures; a chunk whose bytes no
+    longer match its manifest checksum fails at once. Returns (ok, message).
+    """
+    filename = chunk["name"]
+    for attempt in range(1, retries + 1):
+        body = ChunkBody(filepath, chunk["offset"], chunk["size"], filename)
+        try:
+            response = session.post(url, data=body, headers={"Content-Type": body.content_type}, timeout=timeout)
+            if body.stage == 2 and body.sha256.hexdigest() != chunk["sha256"]:
+                return False, "SHA-256 mismatch, the file changed since the manifest was built; re-run to rebuild it"
+            if response.ok:
+                return True, f"HTTP {response.status_code}"
+            message = f"HTTP {response.status_code}: {response.text[:100]}"
+            if response.status_code != 429 and response.status_code < 500:
+                return False, message  # Auth or ticket errors will not fix themselves
+        except requests.exceptions.RequestException as e:
+            message = str(e)[:100]
+        finally:
+            body.close()
+        if attempt < retries:
+            print(f"  [!] {filename}: attempt {attempt}/{retries} failed ({message}), retrying in {2 ** attempt}s")
+            time.sleep(2 ** attempt)
+    return False, message
 
 def main():
-    check_requirements()
-
-    print(f"Starting processing of {len(FILES_TO_PROCESS)} files.")
-    print(f"Ticket: {TICKET_ID}")
+    parser = argparse.ArgumentParser(description="Upload support zips to an Atlassian support ticket in parallel, resumable chunks.")
+    parser.add_argument("files", nargs="*", default=FILES_TO_PROCESS, help="Files to upload (default: FILES_TO_PROCESS)")
+    parser.add_argument("--ticket", default=TICKET_ID)
+    parser.add_argument("--url", default=UPLOAD_URL, help="Upload URL, {ticket} is replaced (default: transfer.atlassian.com)")
+    parser.add_argument("--chunk-count", type=int, default=CHUNK_COUNT)
+    parser.add_argument("--chunk-size-mb", type=float, default=CHUNK_SIZE_MB, help="Fixed chunk size instead of --chunk-count")
+    parser.add_argument("--workers", type=int, default=PARALLEL_UPLOADS, help="Chunks uploaded at once across all files")
+    parser.add_argument("--state-dir", default=STATE_DIR, help="Where <file>.manifest.json is kept")
+    parser.add_argument("--rehash", action="store_true", help="Rebuild the manifests (re-read the files) and upload everything again")
+    args = parser.parse_args()
+
+    url = args.url.format(ticket=args.ticket)
+    auth_token = os.environ.get("ATLASSIAN_UPLOAD_TOKEN", AUTH_TOKEN)
+    session = make_session(args.workers, auth_token)
+
+    print(f"Starting processing of {len(args.files)} files.")
+    print(f"Ticket: {args.ticket}")
     print("="*60)
 
-    for file_path in FILES_TO_PROCESS:
-        print(f"\nProcessing File: {file_path}")
-
-        chunks = split_file(file_path, CHUNK_COUNT, TEMP_CHUNK_DIR)
-
-        if not chunks:
-            print(f"Skipping {file_path} due to split errors.")
+    plans = {}
+    for file_path in args.files:
+        if not os.path.exists(file_path):
+            print(f"Error: File not found: {file_path}")
             continue
+        plans[file_path] = plan_chunks(os.path.getsize(file_path), args.chunk_count, args.chunk_size_mb)
+
+    # Files without a usable manifest are hashed first, in parallel (hashlib releases the GIL)
+    files = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(plans) or 1))) as pool:
+        pending = {}
+        for file_path, chunks in plans.items():
+            manifest = None if args.rehash else load_manifest(file_path, chunks, args.state_dir)
+            if manifest:
+                files[file_path] = manifest
+            else:
+                print(f"[*] Hashing {os.path.basename(file_path)} ({os.path.getsize(file_path) / 1048576:.1f} MB)...")
+                pending[pool.submit(build_manifest, file_path, chunks)] = file_path
+        for future in as_completed(pending):
+            try:
+                files[pending[future]] = future.result()
+                save_manifest(files[pending[future]], args.state_dir)
+            except OSError as e:
+                print(f"[-] Could not hash {pending[future]}: {e}")
+
+    jobs, failed, locks = [], {}, {}
+    for file_path, manifest in files.items():
+        todo = [c for c in manifest["chunks"] if not c["uploaded"]]
+        failed[file_path], locks[file_path] = [], threading.Lock()
+        print(f"{os.path.basename(file_path)}: {len(manifest['chunks'])} chunks, "
+              f"{len(manifest['chunks']) - len(todo)} already uploaded, {len(todo)} to upload")
+        jobs += [(file_path, c) for c in todo]
+
+    def run(file_path, chunk):
+        t0 = time.time()
+        ok, message = upload_chunk(session, url, file_path, chunk)
+        return file_path, chunk, time.time() - t0, ok, message
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        for future in as_completed([pool.submit(run, *job) for job in jobs]):
+            file_path, chunk, elapsed, ok, message = future.result()
+            name, size = chunk["name"], chunk["size"]
+            if ok:
+                with locks[file_path]:
+                    chunk["uploaded"] = datetime.datetime.now().isoformat(timespec='seconds')
+                    save_manifest(files[file_path], args.state_dir)
+                print(f"✔ {name} ({size / 1048576:.1f} MB in {elapsed:.1f}s, {size / 1048576 / max(elapsed, 0.001):.1f} MB/s)")
+            else:
+                failed[file_path].append(name)
+                print(f"[-] Failed to upload: {name} ({message})")
 
-        print(f"Created {len(chunks)} chunks. Starting sequential upload...")
-
-        all_success = True
-        for chunk in chunks:
-            success = upload_chunk(chunk, TICKET_ID, AUTH_TOKEN)
-            if not success:
-                all_success = False
-                print(f"CRITICAL: Stopping uploads for {os.path.basename(file_path)} due to failure.")
-                break
-
-        if DELETE_CHUNKS_AFTER_UPLOAD and all_success:
-            print("Uploads successful. Cleaning up chunks...")
-            for chunk in chunks:
-                if os.path.exists(chunk):
-                    os.remove(chunk)
-            print("Cleanup complete.")
-        elif not all_success:
-            print("Clean up SKIPPED because some uploads failed.")
-
+    print("="*60)
+    for file_path, manifest in files.items():
+        if failed[file_path]:
+            print(f"[-] {os.path.basename(file_path)}: {len(failed[file_path])} chunks failed; re-run to upload only the missing ones")
+        else:
+            print(f"✔ {os.path.basename(file_path)}: all {len(manifest['chunks'])} chunks uploaded, SHA-256 {manifest['sha256']}")
     print("\nAll operations completed.")
+    if len(files) < len(args.files) or any(failed.values()):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,76 @@
+import os
+import re
+import sys
+import json
+import threading
+import pytest
+import requests
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import atlassian_uploader as uploader
+
+class StubUploadHandler(BaseHTTPRequestHandler):
+    """Accepts multipart files[] POSTs like the transfer endpoint and stores each part by file name."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests += 1
+        if self.server.stall_first and self.server.requests == 1:
+            self.server.release.wait(10)  # Never answers in time: the client must time out
+            return
+        boundary = re.search(r"boundary=(\S+)", self.headers["Content-Type"]).group(1).encode()
+        head, _, rest = body.partition(b"\r\n\r\n")
+        name = re.search(rb'filename="([^"]+)"', head).group(1).decode()
+        self.server.parts[name] = rest[:-len(b"\r\n--" + boundary + b"--\r\n")]
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b'{"ok": true}')
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubUploadHandler)
+    server.daemon_threads = True
+    server.parts, server.requests, server.stall_first, server.release = {}, 0, False, threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.release.set()
+    server.shutdown()
+
+def run_uploader(monkeypatch, server, tmp_path, *files):
+    argv = ["atlassian_uploader.py", *map(str, files), "--url", f"http://127.0.0.1:{server.server_port}/api/upload/{{ticket}}",
+            "--chunk-size-mb", "0.25", "--workers", "3", "--state-dir", str(tmp_path)]
+    monkeypatch.setattr(sys, "argv", argv)
+    uploader.main()
+
+def test_parallel_upload_reassembles_and_resumes(monkeypatch, stub_server, tmp_path):
+    sources = []
+    for name, size in (("a.zip", 1_000_003), ("b.zip", 300_000)):
+        path = tmp_path / name
+        path.write_bytes(os.urandom(size))
+        sources.append(path)
+
+    run_uploader(monkeypatch, stub_server, tmp_path, *sources)
+    for path in sources:
+        parts = sorted(n for n in stub_server.parts if n.startswith(path.name + ".part_"))
+        assert b"".join(stub_server.parts[n] for n in parts) == path.read_bytes()
+        manifest = json.loads((tmp_path / (path.name + ".manifest.json")).read_text())
+        assert all(c["uploaded"] for c in manifest["chunks"])
+
+    sent = stub_server.requests
+    run_uploader(monkeypatch, stub_server, tmp_path, *sources)
+    assert stub_server.requests == sent  # Confirmed chunks are not uploaded again
+
+def test_stalled_chunk_times_out_and_is_retried(monkeypatch, stub_server, tmp_path):
+    monkeypatch.setattr(uploader.time, "sleep", lambda seconds: None)
+    path = tmp_path / "c.zip"
+    path.write_bytes(os.urandom(50_000))
+    chunk = uploader.build_manifest(str(path), uploader.plan_chunks(50_000, 1))["chunks"][0]
+    stub_server.stall_first = True
+
+    ok, message = uploader.upload_chunk(requests.Session(), f"http://127.0.0.1:{stub_server.server_port}/upload",
+                                        str(path), chunk, retries=2, timeout=(2, 0.5))
+    assert ok, message
+    assert stub_server.requests == 2
+    assert stub_server.parts["c.zip.part_00"] == path.read_bytes()
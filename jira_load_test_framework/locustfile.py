@@ -6,10 +6,12 @@ import logging
 import uuid
 import time
 from locust import HttpUser, task, between, LoadTestShape, events
+from locust.stats import calculate_response_time_percentile
 
 RUN_ID = os.environ.get("RUN_ID", "default")
 TARGET_ENV = os.environ.get("TARGET_ENV", "dev")
 TEST_PROFILE = os.environ.get("TEST_PROFILE", "resiliency")
+LOAD_SHAPE = os.environ.get("LOAD_SHAPE", "")
 
 logger = logging.getLogger("locust_logger")
 logger.setLevel(logging.INFO)
@@ -35,7 +37,13 @@ TOKENS = ENV_CONFIG["tokens"]
 BASE_URL = ENV_CONFIG["base_url"]
 TARGET_USERS = ENV_CONFIG["limits"][TEST_PROFILE]
 
+# Shape selection: LOAD_SHAPE env var > config "load_shape.mode" > linear ramp
+SHAPE_CONFIG = FULL_CONFIG.get("load_shape", {})
+SHAPE_MODE = LOAD_SHAPE or SHAPE_CONFIG.get("mode", "linear")
+SLO = SHAPE_CONFIG.get("slo", {})
+
 SHARED_CREATED_ISSUES = []
+CAPACITY_REPORT = {"run_id": RUN_ID, "mode": SHAPE_MODE, "knee_users": None, "windows": []}
 
 @events.test_start.add_listener
 def log_metadata(**kwargs):
@@ -44,8 +52,20 @@ def log_metadata(**kwargs):
     logger.info("=" * 60)
     logger.info(f"🆔 Run ID:        {RUN_ID}")
     logger.info(f"⚖️  Ratios:        Read {RATIOS['read_weight']}% / Write {RATIOS['write_weight']}%")
+    logger.info(f"📈 Load Shape:    {SHAPE_MODE}")
     logger.info("-" * 60)
 
+@events.test_stop.add_listener
+def write_capacity_report(**kwargs):
+    if SHAPE_MODE == "linear": return
+    report_file = f"capacity_{RUN_ID}.json"
+    with open(report_file, "w") as f:
+        json.dump(CAPACITY_REPORT, f, indent=2)
+    logger.info("=" * 60)
+    logger.info(f"🏁 MAX SUSTAINABLE USERS (knee): {CAPACITY_REPORT['knee_users']}")
+    logger.info(f"📄 Capacity report: {report_file}")
+    logger.info("=" * 60)
+
 class JiraBaseUser(HttpUser):
     abstract = True  # <--- FIX APPLIED
     host = BASE_URL
@@ -182,7 +202,62 @@ if FULL_CONFIG.get("test_mode") == "mixed":
 else:
     JiraReadUser.weight = 100; JiraWriteUser.weight = 0
 
+def latest_node_load():
+    """Highest 1-min load average across nodes from the tail of the monitor CSV (None if unavailable)."""
+    csv_file = f"metrics_{RUN_ID}.csv"
+    try:
+        with open(csv_file, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            f.seek(max(0, f.tell() - 8192))
+            lines = f.read().decode("utf-8", "ignore").splitlines()[1:]
+        with open(csv_file, "r") as f:
+            header = f.readline().strip().split(",")
+    except OSError:
+        return None
+    if "load_1min" not in header: return None
+    node_idx, load_idx = header.index("node"), header.index("load_1min")
+    latest = {}
+    for line in lines:
+        parts = line.split(",")
+        if len(parts) != len(header) or parts[0] == header[0]: continue
+        try: latest[parts[node_idx]] = float(parts[load_idx])
+        except ValueError: continue
+    return max(latest.values()) if latest else None
+
+class StatsWindow:
+    """Snapshot of locust's cumulative totals, so p95/error rate can be measured over one window only."""
+    def __init__(self, total):
+        self.num_requests = total.num_requests
+        self.num_failures = total.num_failures
+        self.response_times = dict(total.response_times)
+
+    def measure(self, total):
+        requests = total.num_requests - self.num_requests
+        failures = total.num_failures - self.num_failures
+        window_times = {}
+        for rt, count in total.response_times.items():
+            delta = count - self.response_times.get(rt, 0)
+            if delta > 0: window_times[rt] = delta
+        p95 = calculate_response_time_percentile(window_times, requests, 0.95) if requests else 0
+        return {
+            "requests": requests,
+            "p95_ms": p95,
+            "error_rate": round(failures / requests, 4) if requests else 0.0,
+            "node_load": latest_node_load(),
+        }
+
+def slo_breaches(window):
+    """Names of the SLO limits a measured window violates (empty list means healthy)."""
+    breaches = []
+    if window["p95_ms"] > SLO.get("p95_ms", 3000): breaches.append("p95_ms")
+    if window["error_rate"] > SLO.get("max_error_rate", 0.02): breaches.append("error_rate")
+    max_load = SLO.get("max_node_load")
+    if max_load is not None and window["node_load"] is not None and window["node_load"] > max_load:
+        breaches.append("node_load")
+    return breaches
+
 class DynamicLoadShape(LoadTestShape):
+    mode = "linear"
     target_users = TARGET_USERS
     duration_sec = PROFILE_CONFIG["total_duration_minutes"] * 60
     ramp_up_sec = PROFILE_CONFIG["ramp_up_minutes"] * 60
@@ -201,3 +276,105 @@ class DynamicLoadShape(LoadTestShape):
         remaining_time = self.duration_sec - run_time
         current_target = int((remaining_time / self.ramp_down_sec) * self.target_users)
         return (max(1, current_target), self.spawn_rate)
+
+class StepStressLoadShape(LoadTestShape):
+    """Adds step_users every step_minutes until the SLO breaks; the last healthy step is the knee."""
+    abstract = True
+    mode = "step"
+    start_users = SHAPE_CONFIG.get("start_users", SHAPE_CONFIG.get("step_users", 10))
+    step_users = SHAPE_CONFIG.get("step_users", 10)
+    step_sec = SHAPE_CONFIG.get("step_minutes", 5) * 60
+    hold_sec = SHAPE_CONFIG.get("hold_minutes", 10) * 60
+    max_users = SHAPE_CONFIG.get("max_users", TARGET_USERS * 2)
+    duration_sec = PROFILE_CONFIG["total_duration_minutes"] * 60
+    spawn_rate = SHAPE_CONFIG.get("spawn_rate", 2)
+
+    def __init__(self):
+        super().__init__()
+        self.users = self.start_users
+        self.step_started = 0
+        self.window = None
+        self.knee_found_at = None
+
+    def tick(self):
+        run_time = self.get_run_time()
+        if run_time > self.duration_sec: return None
+        if self.knee_found_at is not None:
+            # Hold at the knee to confirm it is sustainable, then finish
+            if run_time - self.knee_found_at > self.hold_sec: return None
+            return (max(1, self.users), self.spawn_rate)
+        if self.window is None:
+            self.window = StatsWindow(self.runner.stats.total)
+        elif run_time - self.step_started >= self.step_sec:
+            self.evaluate_step(run_time)
+        return (self.users, self.spawn_rate)
+
+    def evaluate_step(self, run_time):
+        result = self.window.measure(self.runner.stats.total)
+        breaches = slo_breaches(result)
+        result.update({"users": self.users, "run_time_sec": int(run_time), "breaches": breaches})
+        CAPACITY_REPORT["windows"].append(result)
+        logger.info(f"STEP | users={self.users} p95={result['p95_ms']}ms err={result['error_rate']} load={result['node_load']} breaches={breaches}")
+
+        if breaches or self.users >= self.max_users:
+            if not breaches: CAPACITY_REPORT["knee_users"] = self.users
+            else: self.users = max(1, self.users - self.step_users)
+            logger.info(f"KNEE | {CAPACITY_REPORT['knee_users']} users sustainable, holding {self.users}")
+            self.knee_found_at = run_time
+            return
+        CAPACITY_REPORT["knee_users"] = self.users
+        self.users = min(self.max_users, self.users + self.step_users)
+        self.step_started = run_time
+        self.window = StatsWindow(self.runner.stats.total)
+
+class AdaptiveLoadShape(LoadTestShape):
+    """Closed-loop shape: grows while the SLO holds and backs off on breach, tracking the max sustained user count."""
+    abstract = True
+    mode = "adaptive"
+    start_users = SHAPE_CONFIG.get("start_users", SHAPE_CONFIG.get("step_users", 10))
+    step_users = SHAPE_CONFIG.get("step_users", 10)
+    backoff = SHAPE_CONFIG.get("backoff_factor", 0.8)
+    interval_sec = SHAPE_CONFIG.get("adjust_interval_seconds", 60)
+    max_users = SHAPE_CONFIG.get("max_users", TARGET_USERS * 2)
+    duration_sec = PROFILE_CONFIG["total_duration_minutes"] * 60
+    spawn_rate = SHAPE_CONFIG.get("spawn_rate", 2)
+
+    def __init__(self):
+        super().__init__()
+        self.users = self.start_users
+        self.window_started = 0
+        self.window = None
+
+    def tick(self):
+        run_time = self.get_run_time()
+        if run_time > self.duration_sec: return None
+        if self.window is None:
+            self.window = StatsWindow(self.runner.stats.total)
+        elif run_time - self.window_started >= self.interval_sec:
+            self.adjust(run_time)
+        return (self.users, self.spawn_rate)
+
+    def adjust(self, run_time):
+        result = self.window.measure(self.runner.stats.total)
+        breaches = slo_breaches(result)
+        # Only count a window as sustained once locust has actually reached the target
+        settled = self.runner.user_count >= self.users
+        result.update({"users": self.users, "run_time_sec": int(run_time), "breaches": breaches, "settled": settled})
+        CAPACITY_REPORT["windows"].append(result)
+
+        if breaches:
+            self.users = max(1, int(self.users * self.backoff))
+        elif settled:
+            CAPACITY_REPORT["knee_users"] = max(CAPACITY_REPORT["knee_users"] or 0, self.users)
+            self.users = min(self.max_users, self.users + self.step_users)
+        logger.info(f"ADAPT | p95={result['p95_ms']}ms err={result['error_rate']} load={result['node_load']} breaches={breaches} -> {self.users} users")
+        self.window_started = run_time
+        self.window = StatsWindow(self.runner.stats.total)
+
+# Exactly one shape class may be concrete for locust to pick it up
+SHAPE_CLASSES = {"linear": DynamicLoadShape, "step": StepStressLoadShape, "adaptive": AdaptiveLoadShape}
+if SHAPE_MODE not in SHAPE_CLASSES:
+    logger.error(f"CRITICAL: Unknown load shape '{SHAPE_MODE}' (expected one of {list(SHAPE_CLASSES)}).")
+    sys.exit(1)
+for _mode, _shape in SHAPE_CLASSES.items():
+    _shape.abstract = _mode != SHAPE_MODE
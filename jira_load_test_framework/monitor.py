@@ -3,89 +3,274 @@ import subprocess
 import csv
 import threading
 import signal
-import sys
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import pandas as pd
 import datetime
 import os
 import argparse
+import json
+import queue
+import base64
+import shlex
 
-# --- INFRASTRUCTURE MAP ---
+# --- INFRASTRUCTURE MAP (fallback when config.json has no "monitor" section) ---
+# The sampled PID comes from "pid_file" if set, else the oldest process whose full command line
+# matches the "process_pattern" regex, else the oldest process named exactly "process_name".
+JIRA_PATTERN = r"^[^ ]*java .*org[.]apache[.]catalina[.]startup[.]Bootstrap( |$)"
 NODES = {
-    "app1": { "host": "jira-lvnv-it-001.lvn.broadcom.net", "process_name": "java" },
-    "app2": { "host": "jira-lvnv-it-002.lvn.broadcom.net", "process_name": "java" },
+    "app1": { "host": "jira-lvnv-it-001.lvn.broadcom.net", "process_name": "java", "process_pattern": JIRA_PATTERN, "jstat": True },
+    "app2": { "host": "jira-lvnv-it-002.lvn.broadcom.net", "process_name": "java", "process_pattern": JIRA_PATTERN, "jstat": True },
     "db":   { "host": "db-lvnv-it-001.lvn.broadcom.net",   "process_name": "mysqld" }
 }
 
-HEADERS = ["timestamp", "node", "load_1min", "mem_used_gb", "cpu_process_percent"]
-
-def get_metrics(node_key, config):
-    host = config["host"]
-    proc = config["process_name"]
-    
-    # Robust SSH Command: 
-    # 1. '-o StrictHostKeyChecking=no' avoids prompt hangs.
-    # 2. 'top -b -n 1 -c' ensures full process names are visible for grep.
-    cmd = f"""ssh -o StrictHostKeyChecking=no {host} '
-    echo $(uptime | awk -F"load average: " "{{print \$2}}" | awk -F"," "{{print \$1}}")__$(free -g | grep Mem: | awk "{{print \$3}}")__$(top -b -n 1 -c | grep {proc} | head -1 | awk "{{print \$9}}")
-    '"""
-    
+HEADERS = ["timestamp", "node", "load_1min", "mem_used_gb", "cpu_process_percent", "threads",
+           "gc_young", "gc_full", "gc_time_ms", "disk_read_mbps", "disk_write_mbps", "net_rx_mbps", "net_tx_mbps"]
+
+# Remote sampler: runs for the whole test inside ONE ssh session per node and prints one
+# line of raw counters per interval. Rates/deltas are computed locally from consecutive lines.
+# jstat runs in streaming mode (not once per sample) so no JVM is forked per tick; it is restarted
+# whenever the sampled PID changes (JVM restart), otherwise it would stay attached to the dead one.
+REMOTE_SAMPLER = r"""
+PROC=%(proc)s; PATTERN=%(pattern)s; PIDFILE=%(pidfile)s; INTERVAL=%(interval)s; JSTAT=%(jstat)s
+# Exact matches only: a plain -f substring match also hits wrappers (mysqld_safe, catalina.sh) and tails of logs
+find_pid() {
+    if [ -n "$PIDFILE" ]; then head -1 "$PIDFILE" 2>/dev/null
+    elif [ -n "$PATTERN" ]; then pgrep -o -f "$PATTERN"
+    else pgrep -o -x "$PROC"; fi
+}
+JS_FILE=/tmp/.ltmon_jstat.$$
+JS_FOR=
+cleanup() { [ -n "$JS_PID" ] && kill $JS_PID 2>/dev/null; rm -f $JS_FILE; exit 0; }
+trap cleanup EXIT HUP PIPE TERM INT
+follow_jstat() {
+    [ "$JSTAT" = 1 ] && [ "$PID" != "$JS_FOR" ] && command -v jstat >/dev/null || return 0
+    [ -n "$JS_PID" ] && kill $JS_PID 2>/dev/null
+    : > $JS_FILE; JS_PID=; JS_FOR=$PID
+    [ -n "$PID" ] && { jstat -gcutil $PID $(( INTERVAL * 1000 )) > $JS_FILE 2>/dev/null & JS_PID=$!; }
+}
+echo "#HZ|$(getconf CLK_TCK)"
+while true; do
+    { [ -n "$PID" ] && [ -d /proc/$PID ]; } || PID=$(find_pid)
+    follow_jstat
+    LOAD=$(cut -d' ' -f1 /proc/loadavg)
+    MEM=$(awk '/^MemTotal:/{t=$2} /^MemAvailable:/{a=$2} END{print (t-a)/1024}' /proc/meminfo)
+    TICKS=$(awk '{print $14+$15}' /proc/$PID/stat 2>/dev/null)
+    THREADS=$(awk '/^Threads:/{print $2}' /proc/$PID/status 2>/dev/null)
+    DISK=$(awk '$3 ~ /^(sd[a-z]+|vd[a-z]+|xvd[a-z]+|nvme[0-9]+n[0-9]+)$/ {r+=$6; w+=$10} END{print r*512"|"w*512}' /proc/diskstats)
+    NET=$(awk -F'[: ]+' 'NR>2 && $2!="lo" {rx+=$3; tx+=$11} END{print rx"|"tx}' /proc/net/dev)
+    GC="||"
+    [ -s $JS_FILE ] && GC=$({ head -1 $JS_FILE; tail -1 $JS_FILE; } | awk 'NR==1{for(i=1;i<=NF;i++)h[$i]=i} NR==2{print $h["YGC"]"|"$h["FGC"]"|"$h["GCT"]}')
+    echo "$(date +%%s.%%N)|$LOAD|$MEM|$TICKS|$THREADS|$DISK|$NET|$GC"
+    sleep $INTERVAL
+done
+"""
+
+stop_event = threading.Event()
+
+def load_monitor_config(env=None):
+    """Monitor settings from config.json; environments[env].monitor_nodes overrides the shared node list."""
     try:
-        result = subprocess.check_output(cmd, shell=True, stderr=subprocess.DEVNULL).decode("utf-8").strip()
-        parts = result.split("__")
-        
-        # Safe Parsing: Handle empty or partial returns without crashing
-        load = float(parts[0]) if parts[0] else 0.0
-        mem = float(parts[1]) if len(parts) > 1 and parts[1] else 0.0
-        
-        # CPU Fix: Handle empty string if grep returns nothing
-        cpu_str = parts[2] if len(parts) > 2 else "0.0"
-        if not cpu_str.strip(): cpu_str = "0.0"
-        cpu = float(cpu_str)
+        with open("config.json", "r") as f:
+            full_config = json.load(f)
+    except (OSError, ValueError):
+        full_config = {}
+    mon = full_config.get("monitor", {})
+    nodes = mon.get("nodes") or NODES
+    if env: nodes = full_config.get("environments", {}).get(env, {}).get("monitor_nodes", nodes)
+    return {
+        "nodes": nodes,
+        "interval": max(1, min(5, int(mon.get("interval_seconds", 2)))),
+        "flush_seconds": mon.get("flush_seconds", 10),
+        "ssh_options": mon.get("ssh_options", ["-o", "StrictHostKeyChecking=no", "-o", "ServerAliveInterval=15", "-o", "BatchMode=yes"]),
+    }
+
+def _num(value, default=0.0):
+    try: return float(value)
+    except (TypeError, ValueError): return default
+
+class NodeSampler(threading.Thread):
+    """Keeps one persistent ssh session open to a node and turns its counter stream into metric rows."""
+    def __init__(self, node_key, config, settings, out_queue):
+        super().__init__(name=f"sampler-{node_key}", daemon=True)
+        self.node_key = node_key
+        self.config = config
+        self.settings = settings
+        self.out_queue = out_queue
+        self.proc = None
+        self.hz = 100.0
+        self.prev = None
+
+    def run(self):
+        script = REMOTE_SAMPLER % {
+            "proc": shlex.quote(self.config.get("process_name", "")),
+            "pattern": shlex.quote(self.config.get("process_pattern", "")),
+            "pidfile": shlex.quote(self.config.get("pid_file", "")),
+            "interval": self.settings["interval"],
+            "jstat": 1 if self.config.get("jstat") else 0,
+        }
+        cmd = ["ssh"] + self.settings["ssh_options"] + [self.config["host"], "bash -s"]
+        while not stop_event.is_set():
+            self.prev = None
+            try:
+                self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                             stderr=subprocess.DEVNULL, text=True, bufsize=1)
+                self.proc.stdin.write(script); self.proc.stdin.close()
+                for line in self.proc.stdout:
+                    if stop_event.is_set(): break
+                    row = self.parse(line.strip())
+                    if row: self.out_queue.put(row)
+            except Exception as e:
+                print(f"⚠️  {self.node_key}: sampler error {e}")
+            finally:
+                self.close()
+            # Session dropped (network blip, node restart): reconnect after a short pause
+            stop_event.wait(5)
+
+    def close(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try: self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired: self.proc.kill()
+
+    def parse(self, line):
+        if line.startswith("#HZ|"):
+            self.hz = _num(line[4:], 100.0) or 100.0
+            return None
+        parts = line.split("|")
+        if len(parts) != 12: return None
+        cur = [_num(p, None) for p in parts]
+        prev, self.prev = self.prev, cur
+        if prev is None or cur[0] is None or prev[0] is None: return None
+        dt = cur[0] - prev[0]
+        if dt <= 0: return None
+
+        def rate(i, scale=1.0):
+            if cur[i] is None or prev[i] is None or cur[i] < prev[i]: return 0.0
+            return round((cur[i] - prev[i]) / dt * scale, 2)
 
+        def delta(i, scale=1.0):
+            if cur[i] is None or prev[i] is None or cur[i] < prev[i]: return 0
+            return round((cur[i] - prev[i]) * scale, 1)
+
+        mb = 1.0 / (1024 * 1024)
         return {
-            "timestamp": datetime.datetime.now(),
-            "node": node_key,
-            "load_1min": load,
-            "mem_used_gb": mem,
-            "cpu_process_percent": cpu
+            "timestamp": datetime.datetime.now().isoformat(sep=" ", timespec="milliseconds"),
+            "node": self.node_key,
+            "load_1min": cur[1] or 0.0,
+            "mem_used_gb": round((cur[2] or 0.0) / 1024, 2),
+            "cpu_process_percent": rate(3, 100.0 / self.hz),
+            "threads": int(cur[4] or 0),
+            "gc_young": delta(9),
+            "gc_full": delta(10),
+            "gc_time_ms": delta(11, 1000.0),
+            "disk_read_mbps": rate(5, mb),
+            "disk_write_mbps": rate(6, mb),
+            "net_rx_mbps": rate(7, mb),
+            "net_tx_mbps": rate(8, mb),
         }
-    except Exception:
-        return None 
 
-def monitor_loop(run_id, interval):
+def monitor_loop(run_id, settings):
     csv_file = f"metrics_{run_id}.csv"
-    file_exists = os.path.isfile(csv_file)
-    with open(csv_file, "a", newline="") as f:
+    file_exists = os.path.isfile(csv_file) and os.path.getsize(csv_file) > 0
+    rows = queue.Queue()
+    samplers = [NodeSampler(node, cfg, settings, rows) for node, cfg in settings["nodes"].items()]
+    for sampler in samplers: sampler.start()
+
+    # Large write buffer + periodic flush: 1s samples for 6h must not mean one syscall per row
+    with open(csv_file, "a", newline="", buffering=1024 * 1024) as f:
         writer = csv.DictWriter(f, fieldnames=HEADERS)
         if not file_exists: writer.writeheader()
-        
-        print(f"📡 Telemetry active. Logging to {csv_file}...")
+
+        print(f"📡 Telemetry active ({len(samplers)} nodes every {settings['interval']}s). Logging to {csv_file}...")
+        last_flush = time.time()
         while not stop_event.is_set():
-            for node, cfg in NODES.items():
-                data = get_metrics(node, cfg)
-                if data:
-                    writer.writerow(data)
-                    f.flush()
-            time.sleep(interval)
-
-def generate_plots(run_id):
+            try:
+                writer.writerow(rows.get(timeout=1))
+            except queue.Empty:
+                pass
+            if time.time() - last_flush >= settings["flush_seconds"]:
+                f.flush(); last_flush = time.time()
+        while not rows.empty(): writer.writerow(rows.get_nowait())
+
+    for sampler in samplers: sampler.close()
+    print(f"🛑 Telemetry stopped. Flushed {csv_file}")
+
+PLOT_METRICS = [
+    ("load_1min", "Load Avg"), ("mem_used_gb", "Mem GB"), ("cpu_process_percent", "CPU %"),
+    ("threads", "Threads"), ("gc_time_ms", "GC ms / sample"), ("disk_write_mbps", "Disk Write MB/s"),
+    ("net_rx_mbps", "Net RX MB/s"), ("net_tx_mbps", "Net TX MB/s"),
+]
+MAX_POINTS = 600
+
+def load_metrics(run_id):
+    """Read one run's metrics CSV with elapsed time since test start, keeping only plottable columns."""
     csv_file = f"metrics_{run_id}.csv"
-    if not os.path.exists(csv_file): return
+    if not os.path.exists(csv_file): return None
+    wanted = {"timestamp", "node"} | {m for m, _ in PLOT_METRICS}
+    df = pd.read_csv(csv_file, usecols=lambda c: c in wanted)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    df = df.dropna(subset=["timestamp"])
+    df["elapsed"] = df["timestamp"] - df["timestamp"].min()
+    df["run"] = run_id
+    return df
+
+def pick_bucket(span, bucket=None):
+    """Fixed resample bucket: explicit value, else the smallest whole-second width giving <= MAX_POINTS buckets."""
+    if bucket: return pd.Timedelta(bucket)
+    return pd.Timedelta(seconds=max(1, int(-(-span.total_seconds() // MAX_POINTS))))
+
+def aggregate_metrics(df, bucket):
+    """One grouped pass: min/mean/max of every metric per (run, node, time bucket)."""
+    metrics = [m for m, _ in PLOT_METRICS if m in df.columns]
+    agg = df.groupby(["run", "node", pd.Grouper(key="elapsed", freq=bucket)])[metrics].agg(["min", "mean", "max"])
+    return agg, metrics
+
+def generate_plots(run_id, compare=None, bucket=None, fmt="png"):
+    run_ids = [run_id] + list(compare or [])
+    frames = [df for df in (load_metrics(r) for r in run_ids) if df is not None and not df.empty]
+    if not frames:
+        print(f"❌ No metrics found for {run_ids}")
+        return
 
     try:
-        df = pd.read_csv(csv_file)
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        
-        # Generate 3 Plots
-        for metric, label in [('load_1min', 'Load Avg'), ('mem_used_gb', 'Mem GB'), ('cpu_process_percent', 'CPU %')]:
-            plt.figure(figsize=(10, 6))
-            for node in df['node'].unique():
-                plt.plot(df[df['node']==node]['timestamp'], df[df['node']==node][metric], label=node)
-            plt.title(f"{label} ({run_id})"); plt.legend(); plt.grid(True); 
-            plt.savefig(f"plot_{metric.split('_')[0]}_{run_id}.png")
-            
-        print(f"✅ Graphs generated for Run {run_id}")
+        df = pd.concat(frames, ignore_index=True)
+        bucket = pick_bucket(df["elapsed"].max(), bucket)
+        agg, metrics = aggregate_metrics(df, bucket)
+
+        fig, axes = plt.subplots(len(metrics), 1, figsize=(14, 3.2 * len(metrics)), sharex=True, squeeze=False)
+        for (run, node), series in agg.groupby(level=["run", "node"]):
+            series = series.droplevel(["run", "node"])
+            minutes = series.index.total_seconds() / 60
+            label = node if len(run_ids) == 1 else f"{run} / {node}"
+            for ax, metric in zip(axes[:, 0], metrics):
+                line, = ax.plot(minutes, series[(metric, "mean")], label=label, linewidth=1)
+                ax.fill_between(minutes, series[(metric, "min")], series[(metric, "max")], color=line.get_color(), alpha=0.15, linewidth=0)
+        labels = dict(PLOT_METRICS)
+        for ax, metric in zip(axes[:, 0], metrics):
+            ax.set_ylabel(labels[metric]); ax.grid(True)
+        axes[0, 0].legend(loc="upper left", fontsize="small", ncol=4)
+        axes[-1, 0].set_xlabel(f"Minutes since test start (bucket {int(bucket.total_seconds())}s, band = min/max)")
+        fig.suptitle(f"Infrastructure Telemetry ({', '.join(run_ids)})")
+        fig.tight_layout(rect=(0, 0, 1, 0.98))
+
+        png_file = f"dashboard_{run_id}.png"
+        fig.savefig(png_file, dpi=90)
+        plt.close(fig)
+
+        if fmt == "html":
+            summary = df.groupby(["run", "node"])[metrics].quantile(0.95).round(2)
+            with open(png_file, "rb") as f:
+                encoded = base64.b64encode(f.read()).decode("ascii")
+            html_file = f"dashboard_{run_id}.html"
+            with open(html_file, "w") as f:
+                f.write(f"<html><head><title>Telemetry {run_id}</title></head><body>"
+                        f"<h2>Infrastructure Telemetry ({', '.join(run_ids)})</h2>"
+                        f"<img src='data:image/png;base64,{encoded}'/>"
+                        f"<h3>p95 per run / node</h3>{summary.to_html()}</body></html>")
+            print(f"✅ Dashboard written to {html_file}")
+        print(f"✅ Dashboard written to {png_file} ({len(df)} samples -> {len(agg)} buckets)")
     except Exception as e:
         print(f"❌ Graph generation failed: {e}")
 
@@ -93,12 +278,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--run_id", required=True)
     parser.add_argument("--action", choices=["start", "plot"], required=True)
+    parser.add_argument("--env", help="Environment key, selects environments[env].monitor_nodes if present")
+    parser.add_argument("--interval", type=int, help="Sampling interval in seconds (1-5), overrides config.json")
+    parser.add_argument("--compare", nargs="+", help="Extra run IDs to overlay on the plot, aligned on test start")
+    parser.add_argument("--bucket", help="Resample bucket for plots, e.g. 10s or 1min (default: auto)")
+    parser.add_argument("--format", choices=["png", "html"], default="png", help="Dashboard output format")
     args = parser.parse_args()
 
     if args.action == "start":
-        stop_event = threading.Event()
-        def signal_handler(sig, frame): stop_event.set(); sys.exit(0)
+        settings = load_monitor_config(args.env)
+        if args.interval: settings["interval"] = max(1, min(5, args.interval))
+        def signal_handler(sig, frame): stop_event.set()
         signal.signal(signal.SIGINT, signal_handler); signal.signal(signal.SIGTERM, signal_handler)
-        monitor_loop(args.run_id, interval=30)
+        monitor_loop(args.run_id, settings)
     elif args.action == "plot":
-        generate_plots(args.run_id)
+        generate_plots(args.run_id, compare=args.compare, bucket=args.bucket, fmt=args.format)
@@ -1,11 +1,12 @@
 #!/bin/bash
 
-# Usage: ./run_test.sh <env> <profile>
+# Usage: ./run_test.sh <env> <profile> [shape]
 ENV=$1
 PROFILE=$2
+SHAPE=$3
 
 if [ -z "$ENV" ] || [ -z "$PROFILE" ]; then
-  echo "Usage: ./run_test.sh <env> <profile>"
+  echo "Usage: ./run_test.sh <env> <profile> [linear|step|adaptive]"
   exit 1
 fi
 
@@ -19,7 +20,7 @@ echo "---------------------------------------------------"
 # 1. Start Telemetry (Background)
 echo "📡 Starting Infrastructure Monitor..."
 # Ensure the python script knows where the DB is
-python3 monitor.py --run_id "$RUN_ID" --action start > "monitor_${RUN_ID}.log" 2>&1 &
+python3 monitor.py --run_id "$RUN_ID" --env "$ENV" --action start > "monitor_${RUN_ID}.log" 2>&1 &
 MONITOR_PID=$!
 echo "   Monitor PID: $MONITOR_PID"
 
@@ -43,6 +44,7 @@ echo "   HTML Report: $REPORT_FILE"
 export RUN_ID
 export TARGET_ENV=$ENV
 export TEST_PROFILE=$PROFILE
+export LOAD_SHAPE=$SHAPE
 
 # Run locust in background but wait for it
 nohup python3 -m locust -f locustfile.py --headless --html "$REPORT_FILE" > "$LOG_FILE" 2>&1 &
@@ -345,5 +345,12 @@ main() {
     done
 }
 
+# Prefer the single-pass Python implementation (vrli_poc/hourly_analytics.py) when it is available;
+# set HOURLY_LEGACY=1 to force the per-hour grep loop below
+PY_ANALYTICS="$(dirname "$0")/../vrli_poc/hourly_analytics.py"
+if [ "${HOURLY_LEGACY:-0}" != "1" ] && [ -f "$PY_ANALYTICS" ] && python3 -c 'import numpy' >/dev/null 2>&1; then
+    exec python3 "$PY_ANALYTICS" "$@" --jira-log-dir "$JIRA_LOG_DIR" --confluence-log-dir "$CONFLUENCE_LOG_DIR"
+fi
+
 # Run main function
 main "$@"
@@ -0,0 +1,199 @@
+import os
+import subprocess
+import pandas as pd
+from io import StringIO
+from datetime import datetime, date, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# --- Configuration ---
+# Searched in order for past days' saDD files: RHEL/CentOS, then Debian/Ubuntu. Today is read
+# from the host's own default file, as plain `sar` does.
+REMOTE_LOG_DIRS = ["/var/log/sa", "/var/log/sysstat"]
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sar_cache")
+FLAGS = ["-u", "-r", "-q"]   # Text `sar` fallback for hosts without sadf: CPU, memory, load
+SADF_FLAGS = ["-u", "-r", "-q", "-d", "-n DEV", "-B"]  # + disk, network, paging via `sadf -d`
+# Only these decide whether a day is complete (and cacheable). The others depend on how sadc was
+# started (-d needs -S DISK), so a failed optional section just leaves its columns out.
+CORE_FLAGS = {"-u", "-r", "-q"}
+MAX_WORKERS = 8              # Concurrent SSH sessions across all hosts and days
+SSH_TIMEOUT = 120
+
+# Per-device activities are reduced to one row per sample: (prefix, {column: aggregation})
+DEVICE_AGGREGATES = {
+    "-d": ("disk_", {"tps": "sum", "rkB/s": "sum", "wkB/s": "sum", "rd_sec/s": "sum", "wr_sec/s": "sum", "await": "max", "%util": "max"}),
+    "-n DEV": ("net_", {"rxpck/s": "sum", "txpck/s": "sum", "rxkB/s": "sum", "txkB/s": "sum", "%ifutil": "max"}),
+}
+SADF_META = ["# hostname", "hostname", "interval", "timestamp", "DEV", "IFACE", "CPU"]
+
+def remote_script(day=None, flags=FLAGS, sadf_flags=SADF_FLAGS):
+    """
+    Bash run on the host: ##DATE (the host's own date), then one section per flag, in sadf's
+    semicolon format when sadf exists and as plain `sar` text otherwise. day=None reads the host's
+    default (today's) file; a past day is looked up in REMOTE_LOG_DIRS, ##MISSING if it is gone.
+    Exits non-zero if any CORE_FLAGS section failed.
+    """
+    if day is None:
+        locate = "f=''"
+    else:
+        candidates = " ".join(f"{d}/sa{day:%d}" for d in REMOTE_LOG_DIRS)
+        locate = f"f=''; for c in {candidates}; do [ -f $c ] && {{ f=$c; break; }}; done; [ -n \"$f\" ] || {{ echo '##MISSING'; exit 0; }}"
+    fail = lambda flag: " || rc=1" if flag in CORE_FLAGS else ""
+    sadf = "; ".join(f"echo '##SADF {f}'; LC_ALL=C sadf -d -t $f -- {f}{fail(f)}" for f in sadf_flags)
+    sar = "; ".join(f"echo '##SAR {f}'; LC_ALL=C sar {f} ${{f:+-f $f}}{fail(f)}" for f in flags)
+    return (f"rc=0; echo \"##DATE $(date +%F)\"; {locate}; "
+            f"if command -v sadf >/dev/null 2>&1; then {sadf}; else {sar}; fi; exit $rc")
+
+def parse_sadf_section(flag, text, day):
+    """
+    `sadf -d` output for one activity -> typed DataFrame with a Datetime column, or None. Parsed
+    by the C CSV engine; timestamps are converted in one vectorized call and rows from other days
+    (saDD files are reused every month) are dropped. Per-device activities are aggregated per sample.
+    """
+    lines = text.split('\n')
+    header = next((l for l in lines if l.startswith('#')), None)
+    if header is None: return None
+    rows = [l for l in lines if l and not l.startswith('#') and 'RESTART' not in l]
+    if not rows: return None
+    df = pd.read_csv(StringIO(header.lstrip('# ') + '\n' + '\n'.join(rows)), sep=';')
+
+    ts = df['timestamp'].astype(str)
+    if ts.str.fullmatch(r'\d+').all():
+        # sysstat 9.x prints epoch seconds
+        df['Datetime'] = pd.to_datetime(ts.astype('int64'), unit='s')
+    else:
+        df['Datetime'] = pd.to_datetime(ts.str.slice(0, 19), format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    df = df[df['Datetime'].dt.normalize() == pd.Timestamp(day)]
+    if df.empty: return None
+
+    if flag in DEVICE_AGGREGATES:
+        prefix, aggs = DEVICE_AGGREGATES[flag]
+        if flag == "-n DEV" and 'IFACE' in df.columns: df = df[df['IFACE'] != 'lo']
+        aggs = {c: a for c, a in aggs.items() if c in df.columns}
+        if not aggs: return None
+        df = df.groupby('Datetime', as_index=False).agg(aggs)
+        return df.rename(columns={c: prefix + c for c in aggs})
+    return df.drop(columns=[c for c in SADF_META if c in df.columns])
+
+def parse_sar_section(text, day):
+    """Human-formatted `sar` output for one flag -> DataFrame with a Datetime column, or None."""
+    cleaned_lines = []
+    header_found = False
+    for line in text.split('\n'):
+        if not line.strip(): continue
+        if line.startswith("Linux"):
+            # saDD files are reused every month: make sure this one really is `day`
+            file_day = next((d for d in (_parse_header_date(tok) for tok in line.split()) if d), None)
+            if file_day and file_day != day: return None
+            continue
+        # Find header (starts with Time or a digit)
+        if "Time" in line or (line[0].isdigit() and ("AM" in line or "PM" in line or ":" in line)):
+            header_found = True
+        if header_found:
+            cleaned_lines.append(line)
+    if not cleaned_lines: return None
+
+    df = pd.read_csv(StringIO("\n".join(cleaned_lines)), sep=r'\s+', engine='python')
+    # Clean "Average" and "RESTART" lines
+    df = df[~df.iloc[:, 0].astype(str).str.contains('Average|RESTART|LINUX|Time', case=False)]
+    df = df.rename(columns={df.columns[0]: 'Time'})
+
+    def parse_full_datetime(time_str):
+        try:
+            fmt = "%I:%M:%S %p" if ("AM" in time_str or "PM" in time_str) else "%H:%M:%S"
+            return datetime.combine(day, datetime.strptime(time_str, fmt).time())
+        except ValueError:
+            return None
+
+    df['Datetime'] = df['Time'].astype(str).apply(parse_full_datetime)
+    df = df.dropna(subset=['Datetime']).drop(columns=['Time'])
+    for col in df.columns:
+        if col not in ('Datetime', 'CPU'): df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.drop(columns=['CPU'], errors='ignore')
+
+def _parse_header_date(token):
+    for fmt in ("%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(token, fmt).date()
+        except ValueError:
+            pass
+    return None
+
+def fetch_day(hostname, day=None):
+    """
+    Every activity for one (host, day) in a single SSH session, merged into one wide DataFrame keyed by
+    Datetime. day=None means the host's own today. Returns (DataFrame, complete): an empty DataFrame
+    if the host has no sa file for that day, None on SSH or parse failure; complete is False when
+    a core (CPU, memory, load) command failed, so the result must not be cached.
+    """
+    ssh_cmd = ["ssh", "-q", "-o", "BatchMode=yes", hostname, remote_script(day)]
+    try:
+        result = subprocess.run(ssh_cmd, capture_output=True, text=True, timeout=SSH_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return None, False
+    if result.returncode == 255: return None, False  # ssh itself failed
+    complete = result.returncode == 0
+
+    try:
+        merged = None
+        for section in result.stdout.split("##")[1:]:
+            marker, _, body = section.partition("\n")
+            kind, _, flag = marker.partition(" ")
+            if kind == "DATE":
+                day = day or datetime.strptime(flag.strip(), "%Y-%m-%d").date()
+                continue
+            if kind == "MISSING": break
+            df = parse_sadf_section(flag, body, day) if kind == "SADF" else parse_sar_section(body, day)
+            if df is None or df.empty: continue
+            merged = df if merged is None else merged.merge(df, on='Datetime', how='outer')
+    except Exception as e:
+        print(f"\n[!] {hostname} {day or 'today'}: could not parse SAR output: {e}")
+        return None, False
+    if merged is None: return pd.DataFrame({'Datetime': pd.Series(dtype='datetime64[ns]')}), complete
+    merged = merged[['Datetime'] + [c for c in merged.columns if c != 'Datetime']]
+    return merged.sort_values('Datetime').reset_index(drop=True), complete
+
+def cache_path(hostname, day, cache_dir=CACHE_DIR):
+    # "user@host" SSH targets share the host's cache
+    return os.path.join(cache_dir, hostname.split("@")[-1], f"{day:%Y-%m-%d}.parquet")
+
+def load_day(hostname, day, refresh=False, cache_dir=CACHE_DIR):
+    """
+    Cached fetch_day. Finished days are immutable, so they are read from Parquet when present and
+    written after a fetch whose core commands succeeded and returned data; today (day=None,
+    the host's own date) is always fetched and never cached.
+    """
+    if day is None:
+        return fetch_day(hostname)[0], False
+    path = cache_path(hostname, day, cache_dir)
+    if not refresh and os.path.exists(path):
+        return pd.read_parquet(path), True
+    df, complete = fetch_day(hostname, day)
+    if complete and df is not None and not df.empty:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    return df, False
+
+def collect_history(hosts, days, workers=MAX_WORKERS, refresh=False, cache_dir=CACHE_DIR):
+    """
+    SAR history for every host over the last `days` days (today included), fetched concurrently
+    across hosts and days. Returns {host: DataFrame sorted by Datetime, or None if nothing was found}.
+    Today is each host's own today; samples that also appear in a past day's file are kept once.
+    """
+    today = date.today()
+    jobs = [(h, None if i == 0 else today - timedelta(days=i)) for h in hosts for i in range(days)]
+    frames = {h: [] for h in hosts}
+    cached = failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(load_day, h, d, refresh, cache_dir): (h, d) for h, d in jobs}
+        for n, fut in enumerate(as_completed(futures), 1):
+            h, d = futures[fut]
+            df, hit = fut.result()
+            cached += hit
+            if df is None: failed += 1
+            elif not df.empty: frames[h].append(df)
+            print(f"   ... {n}/{len(jobs)} host-days ({cached} cached, {failed} failed)", end="\r")
+    print(f"   ... Done: {len(jobs)} host-days, {cached} from cache, {failed} failed.          ")
+    return {h: (pd.concat(dfs).drop_duplicates('Datetime').sort_values('Datetime').reset_index(drop=True) if dfs else None)
+            for h, dfs in frames.items()}
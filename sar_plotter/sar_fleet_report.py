@@ -0,0 +1,150 @@
+import os
+import sys
+import argparse
+import importlib.util
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
+from datetime import datetime
+from sar_collector import collect_history, MAX_WORKERS
+
+# --- Configuration ---
+INSTANCES_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "gto-ATL-Jira-ops-center", "instances_config.py")
+METRICS = {"cpu": "CPU Usage (%)", "mem": "Memory Used (%)", "load": "1-min Load"}
+DEFAULT_LIMITS = {"cpu": 85, "mem": 90}  # Used when an instance has no system_thresholds yellow_max
+TREND_HORIZON_DAYS = 30                  # Flag hosts whose daily p95 trend reaches the limit within this many days
+
+def load_fleet(config_path, instance_ids=None):
+    """
+    Hosts from the ops-center INSTANCES config: every jira_servers entry (role "app") and the
+    db_server (role "db"). Returns a DataFrame [instance, role, name, host, target, cpu_limit, mem_limit].
+    """
+    spec = importlib.util.spec_from_file_location("instances_config", config_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    rows = []
+    for iid, inst in module.INSTANCES.items():
+        if instance_ids and iid not in instance_ids: continue
+        user = inst.get("ssh", {}).get("user")
+        limits = inst.get("thresholds", {}).get("system_thresholds", {})
+        cpu_limit = limits.get("cpu", {}).get("yellow_max", DEFAULT_LIMITS["cpu"])
+        mem_limit = limits.get("memory", {}).get("yellow_max", DEFAULT_LIMITS["mem"])
+        servers = [("app", s) for s in inst.get("jira_servers", [])]
+        if inst.get("db_server"): servers.append(("db", inst["db_server"]))
+        for role, srv in servers:
+            host = srv["hostname"]
+            rows.append({"instance": iid, "role": role, "name": srv.get("name", host), "host": host,
+                         "target": f"{user}@{host}" if user else host, "cpu_limit": cpu_limit, "mem_limit": mem_limit})
+    return pd.DataFrame(rows)
+
+def daily_stats(history):
+    """{target: wide SAR frame} -> one row per (target, date) with p95 and max of cpu/mem/load."""
+    frames = []
+    for target, df in history.items():
+        if df is None or df.empty: continue
+        cols = pd.DataFrame({"Datetime": df["Datetime"]})
+        if "%idle" in df.columns: cols["cpu"] = 100 - df["%idle"]
+        if "%memused" in df.columns: cols["mem"] = df["%memused"]
+        if "ldavg-1" in df.columns: cols["load"] = df["ldavg-1"]
+        cols["target"] = target
+        frames.append(cols)
+    if not frames: return None
+    samples = pd.concat(frames, ignore_index=True)
+    samples["date"] = samples["Datetime"].dt.normalize()
+    grouped = samples.groupby(["target", "date"])[[m for m in METRICS if m in samples.columns]]
+    p95, mx = grouped.quantile(0.95), grouped.max()
+    daily = p95.add_suffix("_p95").join(mx.add_suffix("_max")).reset_index()
+    return daily
+
+def trend_flags(daily, fleet, horizon=TREND_HORIZON_DAYS):
+    """
+    Per host and metric: least-squares slope of the daily p95 (per day) from closed-form sums over
+    all hosts at once, the latest p95 and a status: SATURATED (latest p95 at/over the limit),
+    TRENDING (the slope reaches the limit within `horizon` days) or OK. Load has no fleet-wide
+    limit, so it only reports its slope.
+    """
+    d = daily.copy()
+    d["x"] = (d["date"] - d["date"].min()).dt.days.astype(float)
+    out = []
+    for m in METRICS:
+        col = f"{m}_p95"
+        if col not in d.columns: continue
+        v = d.dropna(subset=[col])
+        g = v.assign(xy=v["x"] * v[col], xx=v["x"] ** 2).groupby("target")
+        s = g.agg(n=("x", "size"), sx=("x", "sum"), sy=(col, "sum"), sxy=("xy", "sum"), sxx=("xx", "sum"))
+        denom = s["n"] * s["sxx"] - s["sx"] ** 2
+        s["slope"] = np.where(denom > 0, (s["n"] * s["sxy"] - s["sx"] * s["sy"]) / denom.where(denom > 0, 1), 0.0)
+        s["latest"] = v.sort_values("date").groupby("target")[col].last()
+        s["peak"] = v.groupby("target")[f"{m}_max"].max()
+        s["metric"] = m
+        out.append(s.reset_index()[["target", "metric", "latest", "peak", "slope"]])
+    if not out: return None
+    flags = pd.concat(out, ignore_index=True).merge(fleet, on="target")
+    limit = np.select([flags["metric"] == "cpu", flags["metric"] == "mem"], [flags["cpu_limit"], flags["mem_limit"]], np.nan)
+    flags["limit"] = limit
+    flags["days_to_limit"] = np.where((flags["slope"] > 0) & (flags["latest"] < limit), (limit - flags["latest"]) / flags["slope"].where(flags["slope"] > 0, 1), np.nan)
+    flags["status"] = np.select([flags["latest"] >= limit, flags["days_to_limit"] <= horizon], ["SATURATED", "TRENDING"], "OK")
+    return flags
+
+def plot_fleet(daily, fleet, days, output):
+    present = [m for m in METRICS if f"{m}_p95" in daily.columns]
+    fig, axes = plt.subplots(len(present), 1, figsize=(16, 4.5 * len(present)), sharex=True, squeeze=False)
+    fig.suptitle(f"Fleet SAR Capacity: daily p95 (last {days} days)", fontsize=16)
+    # One line per host, even when it is listed under several instances
+    labels = fleet.drop_duplicates("target").set_index("target")
+    for ax, m in zip(axes[:, 0], present):
+        for target, g in daily.groupby("target"):
+            info = labels.loc[target]
+            ax.plot(g["date"], g[f"{m}_p95"], marker=".", linewidth=1,
+                    linestyle="--" if info["role"] == "db" else "-", label=f"{info['host']} ({info['role']})")
+        ax.set_title(METRICS[m])
+        ax.grid(True, linestyle="--", alpha=0.6)
+        if m in ("cpu", "mem"): ax.set_ylim(0, 100)
+    axes[0, 0].legend(loc="upper left", fontsize=8, ncol=2)
+    axes[-1, 0].xaxis.set_major_formatter(mdates.DateFormatter("%b %d"))
+    plt.xticks(rotation=45)
+    plt.tight_layout(rect=[0, 0.03, 1, 0.95])
+    plt.savefig(output)
+    plt.close(fig)
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet-wide SAR capacity report for all Jira app and DB nodes.")
+    parser.add_argument("days", nargs="?", type=int, default=30, help="Number of days (default: 30)")
+    parser.add_argument("--instances-config", default=INSTANCES_CONFIG, help="Path to the ops-center instances_config.py")
+    parser.add_argument("--instance", action="append", help="Instance id from INSTANCES (repeatable, default: all)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help=f"Concurrent SSH sessions (default: {MAX_WORKERS})")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the local cache and re-fetch past days")
+    parser.add_argument("--horizon", type=int, default=TREND_HORIZON_DAYS, help="Trend lookahead in days for TRENDING flags")
+    args = parser.parse_args()
+
+    fleet = load_fleet(args.instances_config, args.instance)
+    if fleet.empty: sys.exit("[-] No hosts found in the instances config.")
+    targets = list(dict.fromkeys(fleet["target"]))
+    print(f"Fetching SAR history for {len(targets)} hosts ({', '.join(sorted(fleet['instance'].unique()))}), last {args.days} days...")
+    history = collect_history(targets, args.days, args.workers, args.refresh)
+
+    daily = daily_stats(history)
+    if daily is None: sys.exit("[-] No SAR data collected from any host.")
+    flags = trend_flags(daily, fleet, args.horizon)
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M")
+    csv_file, png_file = f"sar_fleet_{stamp}.csv", f"sar_fleet_{stamp}.png"
+    report = daily.merge(fleet[["target", "instance", "role", "host"]], on="target")
+    report = report[["instance", "role", "host", "date"] + [c for c in daily.columns if c not in ("target", "date")]]
+    report.sort_values(["instance", "role", "host", "date"]).to_csv(csv_file, index=False, float_format="%.2f")
+    plot_fleet(daily, fleet, args.days, png_file)
+
+    print(f"\n{'Host':<32} | {'Role':<4} | {'Metric':<6} | {'p95 (last)':<10} | {'Max':<8} | {'Slope/day':<9} | Status")
+    print("-" * 100)
+    for _, r in flags.sort_values(["instance", "role", "host", "metric"]).iterrows():
+        note = f" (~{r['days_to_limit']:.0f}d to {r['limit']:.0f})" if r["status"] == "TRENDING" else ""
+        print(f"{r['host'][:32]:<32} | {r['role']:<4} | {r['metric']:<6} | {r['latest']:<10.1f} | {r['peak']:<8.1f} | {r['slope']:<+9.2f} | {r['status']}{note}")
+    missing = [t for t in targets if history.get(t) is None]
+    if missing: print(f"\n[!] No data for: {', '.join(missing)}")
+    print(f"\n✔ Daily stats: {csv_file}\n✔ Graph saved: {png_file}")
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,34 @@ import argparse
 import datetime
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+FETCH_SIZE = 5000     # Rows pulled per round trip from the streamed cursors
+THRESHOLD_DAYS = 90   # No login for this long = inactive
+MAX_WORKERS = 8       # Instances audited at once in "all" mode
+APP_PREFIXES = {'jira': 'JIRA_DB', 'confluence': 'CONFLUENCE_DB'}  # config.ini sections per app: JIRA_DB, JIRA_DB_EU, ...
+
+APP_QUERIES = {
+    'jira': ('jira-users', """
+            SELECT DISTINCT u.lower_user_name as userid, u.email_address, u.display_name, ua.attribute_value as last_login
+            FROM cwd_user u
+            JOIN cwd_membership m ON u.id = m.child_id
+            JOIN cwd_group g ON m.parent_id = g.id
+            LEFT JOIN cwd_user_attributes ua ON u.id = ua.user_id AND ua.attribute_name = 'login.lastLoginMillis'
+            WHERE u.active = 1 AND g.group_name = %s
+            """),
+    # Modern Confluence 9.x Join: u -> user_mapping -> logininfo
+    'confluence': ('confluence-users', """
+            SELECT DISTINCT u.lower_user_name as userid, u.email_address, u.display_name, li.SUCCESSDATE as last_login
+            FROM cwd_user u
+            JOIN cwd_membership m ON u.id = m.child_user_id
+            JOIN cwd_group g ON m.parent_id = g.id
+            JOIN user_mapping um ON u.lower_user_name = um.lower_username
+            LEFT JOIN logininfo li ON um.user_key = li.USERNAME
+            WHERE (u.active = 'T' OR u.active = '1' OR u.active = 'active')
+              AND g.group_name = %s
+            """),
+}
 
 def get_config():
     config = configparser.ConfigParser()
@@ -26,106 +54,211 @@ def format_jira_date(ms_timestamp):
     except:
         return None
 
+def stream_rows(cursor, size=FETCH_SIZE):
+    """Rows of an executed (unbuffered) cursor, FETCH_SIZE per round trip instead of one fetchall()."""
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows: return
+        yield from rows
+
+def load_hr_divisions(hr_conn):
+    """
+    {userid: division} of every corp employee in one streamed query. Keys are lowercased because
+    the per-user lookup it replaces compared with MySQL's case-insensitive collation; the first
+    division seen wins, like its LIMIT 1.
+    """
+    divisions = {}
+    hr_cursor = hr_conn.cursor()
+    hr_cursor.execute("SELECT userid, division FROM tb_hr_employees_all WHERE source = 'corp'")
+    for userid, division in stream_rows(hr_cursor):
+        if userid is not None:
+            divisions.setdefault(userid.rstrip().lower(), division)
+    hr_cursor.close()
+    return divisions
+
+def login_date(app, raw_login):
+    if app == 'jira':
+        return format_jira_date(raw_login)
+    if isinstance(raw_login, datetime.datetime):
+        return raw_login.date()
+    if isinstance(raw_login, datetime.date):
+        return raw_login
+    return None
+
+def audit_users(app, db_section, hr_divisions):
+    """
+    Streams the active licensed users of one instance joined with the HR map:
+    dicts of userid, email_address, display_name, dept ("NOT FOUND" if not in HR) and last_login (date or None).
+    """
+    app_conn = get_db_connection(db_section)
+    try:
+        app_cursor = app_conn.cursor(dictionary=True, buffered=False)  # Unbuffered: rows stream as they are read
+        group_name, query = APP_QUERIES[app]
+        app_cursor.execute(query, (group_name,))
+        for user in stream_rows(app_cursor):
+            yield {'userid': user['userid'], 'email_address': user['email_address'], 'display_name': user['display_name'],
+                   'dept': hr_divisions.get((user['userid'] or '').rstrip().lower(), "NOT FOUND"),
+                   'last_login': login_date(app, user['last_login'])}
+    finally:
+        if app_conn.is_connected(): app_conn.close()
+
+def app_sections(config):
+    """[(instance name, app, section)] for every JIRA_DB* / CONFLUENCE_DB* section; a section may set its own `name`."""
+    instances = []
+    for section_name in config.sections():
+        for app, prefix in APP_PREFIXES.items():
+            if section_name.startswith(prefix):
+                instances.append((config[section_name].get('name', section_name), app, config[section_name]))
+    return instances
+
+def audit_single(app, config, hr_divisions, inactivity_limit):
+    """One application, its JIRA_DB / CONFLUENCE_DB section: <app>_user_audit_<timestamp>.csv, rows written as they stream."""
+    group_name = APP_QUERIES[app][0]
+    print(f"[*] Connecting to {app.upper()} database...")
+    if app == 'confluence':
+        print(f"[*] Using Confluence Join: user_mapping link for SUCCESSDATE")
+
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_file = f"{app}_user_audit_{timestamp}.csv"
+
+    total_users = 0
+    not_found_in_hr = 0
+    reclaimable_licenses = 0
+
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['User ID', 'Email Address', 'Display Name', 'Department', 'Last Login Date'])
+
+        for user in audit_users(app, config[APP_PREFIXES[app]], hr_divisions):
+            total_users += 1
+            if user['dept'] == "NOT FOUND": not_found_in_hr += 1
+
+            login_date_obj = user['last_login']
+            is_inactive = (login_date_obj is None) or (login_date_obj < inactivity_limit)
+            if user['dept'] == "NOT FOUND" and is_inactive:
+                reclaimable_licenses += 1
+
+            display_date = login_date_obj.strftime('%Y-%m-%d') if login_date_obj else "Never"
+            writer.writerow([user['userid'], user['email_address'], user['display_name'], user['dept'], display_date])
+
+    if not total_users:
+        os.remove(output_file)
+        print(f"[!] No active users found in {app.upper()} for group {group_name}.")
+        return
+
+    print("-" * 50)
+    print(f"AUDIT SUMMARY FOR {app.upper()}")
+    print("-" * 50)
+    print(f"Total Licensed Users:      {total_users}")
+    print(f"Users NOT in HR DB:        {not_found_in_hr}")
+    print(f"Potential Ghost Licenses:   {reclaimable_licenses}")
+    print("-" * 50)
+    print(f"[SUCCESS] File saved: {output_file}")
+
+def audit_all(config, hr_divisions, inactivity_limit, workers=MAX_WORKERS):
+    """
+    Every configured instance at once, each on its own connection, sharing the HR map. Writes one
+    all_user_audit_<timestamp>.csv with a row per person: the instances they hold a license on,
+    their last login on each, and whether they are inactive everywhere.
+    """
+    instances = app_sections(config)
+    if not instances:
+        print("[!] No JIRA_DB* or CONFLUENCE_DB* sections in config.ini.")
+        return
+    print(f"[*] Auditing {len(instances)} instances: {', '.join(name for name, _, _ in instances)}")
+
+    def fetch(app, section):
+        return list(audit_users(app, section, hr_divisions))
+
+    results, failed = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(instances)))) as pool:
+        futures = {pool.submit(fetch, app, section): name for name, app, section in instances}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+                print(f"[+] {name}: {len(results[name])} active licensed users.")
+            except Exception as e:
+                failed[name] = e
+                print(f"[ERROR] {name}: {e}")
+
+    names = [name for name, _, _ in instances if name in results]
+    people = {}
+    for name in names:
+        for user in results[name]:
+            key = (user['userid'] or '').rstrip().lower()
+            person = people.setdefault(key, {**user, 'logins': {}})
+            person['logins'][name] = user['last_login']
+
+    def is_inactive(d): return d is None or d < inactivity_limit
+    def fmt(d): return d.strftime('%Y-%m-%d') if d else "Never"
+
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    output_file = f"all_user_audit_{timestamp}.csv"
+    multi_instance = inactive_everywhere = not_found_in_hr = reclaimable_licenses = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['User ID', 'Email Address', 'Display Name', 'Department', 'Instances', 'Instance Count',
+                         'Last Login Date', 'Inactive Everywhere', 'Potential Ghost'] + [f"{n} Last Login" for n in names])
+        for key in sorted(people):
+            person = people[key]
+            logins = person['logins']
+            latest = max((d for d in logins.values() if d), default=None)
+            inactive = all(is_inactive(d) for d in logins.values())
+            ghost = inactive and person['dept'] == "NOT FOUND"
+            multi_instance += len(logins) > 1
+            inactive_everywhere += inactive
+            not_found_in_hr += person['dept'] == "NOT FOUND"
+            reclaimable_licenses += ghost
+            writer.writerow([person['userid'], person['email_address'], person['display_name'], person['dept'],
+                             ';'.join(n for n in names if n in logins), len(logins), fmt(latest),
+                             'Y' if inactive else 'N', 'Y' if ghost else 'N']
+                            + [fmt(logins[n]) if n in logins else '' for n in names])
+
+    print("-" * 50)
+    print("AUDIT SUMMARY FOR ALL INSTANCES")
+    print("-" * 50)
+    for name in names:
+        users = results[name]
+        print(f"{name:<26} {len(users):>6} users, {sum(u['dept'] == 'NOT FOUND' for u in users):>5} not in HR, "
+              f"{sum(is_inactive(u['last_login']) for u in users):>5} inactive")
+    for name, e in failed.items():
+        print(f"{name:<26} FAILED: {e}")
+    print("-" * 50)
+    print(f"Unique Licensed Users:     {len(people)}")
+    print(f"Licensed on 2+ Instances:  {multi_instance}")
+    print(f"Inactive Everywhere:       {inactive_everywhere}")
+    print(f"Users NOT in HR DB:        {not_found_in_hr}")
+    print(f"Potential Ghost Licenses:   {reclaimable_licenses}")
+    print("-" * 50)
+    print(f"[SUCCESS] File saved: {output_file}")
+
 def main():
     parser = argparse.ArgumentParser(description='Export Active Licensed Users with HR Dept and Last Login.')
-    parser.add_argument('app', choices=['jira', 'confluence'], help='Target application (jira or confluence)')
+    parser.add_argument('app', choices=['jira', 'confluence', 'all'],
+                        help='Target application (jira or confluence), or all to audit every JIRA_DB*/CONFLUENCE_DB* section into one report')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help=f'Instances audited at once with "all" (default: {MAX_WORKERS})')
     args = parser.parse_args()
 
     config = get_config()
-    app_conn = None
     hr_conn = None
-    
-    threshold_days = 90
-    inactivity_limit = datetime.date.today() - datetime.timedelta(days=threshold_days)
+    inactivity_limit = datetime.date.today() - datetime.timedelta(days=THRESHOLD_DAYS)
 
     try:
-        app_section = 'JIRA_DB' if args.app == 'jira' else 'CONFLUENCE_DB'
-        print(f"[*] Connecting to {args.app.upper()} database...")
-        app_conn = get_db_connection(config[app_section])
-        app_cursor = app_conn.cursor(dictionary=True)
-
-        if args.app == 'jira':
-            group_name = 'jira-users'
-            query = """
-            SELECT DISTINCT u.lower_user_name as userid, u.email_address, u.display_name, ua.attribute_value as last_login
-            FROM cwd_user u
-            JOIN cwd_membership m ON u.id = m.child_id
-            JOIN cwd_group g ON m.parent_id = g.id
-            LEFT JOIN cwd_user_attributes ua ON u.id = ua.user_id AND ua.attribute_name = 'login.lastLoginMillis'
-            WHERE u.active = 1 AND g.group_name = %s
-            """
-        else:
-            group_name = 'confluence-users'
-            # Modern Confluence 9.x Join: u -> user_mapping -> logininfo
-            print(f"[*] Using Confluence Join: user_mapping link for SUCCESSDATE")
-            query = """
-            SELECT DISTINCT u.lower_user_name as userid, u.email_address, u.display_name, li.SUCCESSDATE as last_login
-            FROM cwd_user u
-            JOIN cwd_membership m ON u.id = m.child_user_id
-            JOIN cwd_group g ON m.parent_id = g.id
-            JOIN user_mapping um ON u.lower_user_name = um.lower_username
-            LEFT JOIN logininfo li ON um.user_key = li.USERNAME
-            WHERE (u.active = 'T' OR u.active = '1' OR u.active = 'active')
-              AND g.group_name = %s
-            """
-
-        app_cursor.execute(query, (group_name,))
-        users = app_cursor.fetchall()
-        
-        if not users:
-            print(f"[!] No active users found in {args.app.upper()} for group {group_name}.")
-            return
-
-        print(f"[+] Found {len(users)} active licensed users.")
         print("[*] Connecting to HR database...")
         hr_conn = get_db_connection(config['HR_DB'])
-        hr_cursor = hr_conn.cursor()
-
-        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_file = f"{args.app}_user_audit_{timestamp}.csv"
-        
-        not_found_in_hr = 0
-        reclaimable_licenses = 0
-
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(['User ID', 'Email Address', 'Display Name', 'Department', 'Last Login Date'])
-
-            for user in users:
-                hr_cursor.execute("SELECT division FROM tb_hr_employees_all WHERE userid = %s AND source = 'corp' LIMIT 1", (user['userid'],))
-                result = hr_cursor.fetchone()
-                dept = result[0] if result else "NOT FOUND"
-                if dept == "NOT FOUND": not_found_in_hr += 1
-
-                raw_login = user['last_login']
-                login_date_obj = None
-                
-                if args.app == 'jira':
-                    login_date_obj = format_jira_date(raw_login)
-                elif raw_login:
-                    if isinstance(raw_login, (datetime.datetime, datetime.date)):
-                        login_date_obj = raw_login.date() if isinstance(raw_login, datetime.datetime) else raw_login
-
-                is_inactive = (login_date_obj is None) or (login_date_obj < inactivity_limit)
-                if dept == "NOT FOUND" and is_inactive:
-                    reclaimable_licenses += 1
-
-                display_date = login_date_obj.strftime('%Y-%m-%d') if login_date_obj else "Never"
-                writer.writerow([user['userid'], user['email_address'], user['display_name'], dept, display_date])
-
-        print("-" * 50)
-        print(f"AUDIT SUMMARY FOR {args.app.upper()}")
-        print("-" * 50)
-        print(f"Total Licensed Users:      {len(users)}")
-        print(f"Users NOT in HR DB:        {not_found_in_hr}")
-        print(f"Potential Ghost Licenses:   {reclaimable_licenses}")
-        print("-" * 50)
-        print(f"[SUCCESS] File saved: {output_file}")
+        hr_divisions = load_hr_divisions(hr_conn)
+        print(f"[+] Loaded {len(hr_divisions)} HR records.")
+        hr_conn.close()
+
+        if args.app == 'all':
+            audit_all(config, hr_divisions, inactivity_limit, args.workers)
+        else:
+            audit_single(args.app, config, hr_divisions, inactivity_limit)
 
     except Exception as e:
         print(f"[ERROR] {e}")
     finally:
-        if app_conn and app_conn.is_connected(): app_conn.close()
         if hr_conn and hr_conn.is_connected(): hr_conn.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,89 @@
+# client.py
+import sys
+import requests
+import urllib3
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import VRLI_HOST, BASE_URL, MAX_ROWS_PER_QUERY, MAX_PARALLEL_QUERIES, QUERY_TIMEOUT_MS, HTTP_RETRIES, MIN_SLICE_MS
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+class VrliClient:
+    """Pooled, retrying vRLI API session. One instance per run; safe to share across query threads."""
+
+    def __init__(self, token, workers=MAX_PARALLEL_QUERIES):
+        self.workers = max(1, min(workers, MAX_PARALLEL_QUERIES))
+        retry = Retry(total=HTTP_RETRIES, backoff_factor=1.0, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=None, respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers + 1, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.verify = False
+        self.session.headers.update({"Authorization": f"Bearer {token}", "Accept": "application/json"})
+
+    def get_fields(self):
+        r = self.session.get(f"{BASE_URL}/fields", timeout=60)
+        r.raise_for_status()
+        return r.json()
+
+    def run_query(self, piql, limit):
+        """Single /api/v2/queries call. Returns the raw msgIds list; limit is clamped to the server maximum."""
+        resp = self.session.post(f"https://{VRLI_HOST}:9543/api/v2/queries",
+            json={"query": piql, "limit": min(limit, MAX_ROWS_PER_QUERY), "timeout": QUERY_TIMEOUT_MS},
+            timeout=QUERY_TIMEOUT_MS / 1000 + 30)
+        if resp.status_code == 400 and "errorMessage" in resp.text:
+            raise RuntimeError(resp.json()["errorMessage"])  # Bad PIQL: keep vRLI's explanation
+        # Retries end with the last response (raise_on_status=False), so 401s and exhausted 5xx surface here
+        resp.raise_for_status()
+        data = resp.json()
+        if "errorMessage" in data: raise RuntimeError(data["errorMessage"])
+        return data.get("messageResults", {}).get("msgIds", [])
+
+    def iter_sliced(self, build_query, start_ms, end_ms, limit, slices):
+        """
+        Splits [start_ms, end_ms] into `slices` windows queried concurrently and yields pages of
+        messages newest first (the order of ORDER BY timestamp DESC), up to `limit` messages in total.
+        A page is yielded as soon as its window and every newer window have completed, so output can
+        start before the oldest windows return. A window that comes back full at the server row cap
+        is split in half and re-queried, so the per-query limit never silently truncates the result.
+        """
+        slices = max(1, slices)
+        per_slice = min(limit, MAX_ROWS_PER_QUERY)
+        step = max(1, (end_ms - start_ms) // slices)
+        bounds = [(start_ms + i * step, end_ms if i == slices - 1 else start_ms + (i + 1) * step - 1) for i in range(slices)]
+        results = {}
+        remaining = limit
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {pool.submit(self.run_query, build_query(s, e), per_slice): (s, e) for s, e in bounds}
+            try:
+                while pending and remaining > 0:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        s, e = pending.pop(fut)
+                        msgs = fut.result()
+                        capped = len(msgs) >= per_slice and per_slice < limit
+                        if capped and e - s > MIN_SLICE_MS:
+                            mid = s + (e - s) // 2
+                            sys.stderr.write(f"[*] Slice {s}-{e} hit the server row cap, splitting\n")
+                            for half in ((s, mid), (mid + 1, e)):
+                                pending[pool.submit(self.run_query, build_query(*half), per_slice)] = half
+                            continue
+                        if capped: sys.stderr.write(f"[!] Slice {s}-{e} still capped at {per_slice} rows, results may have gaps\n")
+                        results[s] = msgs
+
+                    # Windows are disjoint: the newest outstanding window decides what can be emitted
+                    newest_pending = max((s for s, _ in pending.values()), default=None)
+                    for s in sorted(results, reverse=True):
+                        if newest_pending is not None and s < newest_pending: break
+                        page = sorted(results.pop(s), key=lambda m: m.get("msgContent", {}).get("timestamp", 0), reverse=True)[:remaining]
+                        remaining -= len(page)
+                        if page: yield page
+                        if remaining <= 0: break
+            finally:
+                for fut in pending: fut.cancel()
+
+    def query_sliced(self, build_query, start_ms, end_ms, limit, slices):
+        """List form of iter_sliced: the newest `limit` messages across all windows, newest first."""
+        return [msg for page in self.iter_sliced(build_query, start_ms, end_ms, limit, slices) for msg in page]
@@ -1,9 +1,27 @@
 # config.py
 import re
+import os
 
 VRLI_HOST = "lvn-rnd-unix-logs.lvn.broadcom.net"
 BASE_URL = f"https://{VRLI_HOST}:9543/api/v1"
 
+# --- QUERY LIMITS ---
+MAX_ROWS_PER_QUERY = 20000      # Server-side row cap for a single /api/v2/queries call
+MAX_PARALLEL_QUERIES = 4        # Concurrent time-slice queries (keep low, vRLI queues heavy queries)
+QUERY_TIMEOUT_MS = 60000
+HTTP_RETRIES = 3                # Retries with backoff on 429/5xx and connection errors
+MIN_SLICE_MS = 60 * 1000        # Never split a saturated time slice below this width
+
+# --- FIELD SCHEMA CACHE ---
+FIELD_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".vrli_fields_cache.json")
+FIELD_CACHE_TTL = 6 * 3600      # Seconds before /fields is re-downloaded (use --refresh-fields to force)
+
+# --- DERIVED FIELDS ---
+# Computed client-side from another extracted field: the endpoint template of the query-stripped
+# URI (e.g. /rest/api/{ver}/issue/{key}, see ../vrli_poc/uri_templates.py) so per-endpoint
+# grouping stays bounded
+DERIVED_FIELDS = {"Jira_Access_URI_Template": "Jira_Access_URI_MinusQP"}
+
 PRESETS = {
     "ANYTHING_BUT_SPACE": r"\S+", "INTEGER": r"-?\d+", 
     "IP4": r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}",
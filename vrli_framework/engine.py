@@ -1,17 +1,45 @@
 # engine.py
-import requests
 import re
+import os
+import json
+import time
 import datetime
 import sys
-# --- FIX: Added VRLI_HOST to imports ---
-from config import BASE_URL, KNOWN_DEFINITIONS, PRESETS, VRLI_HOST
+import importlib.util
+from config import KNOWN_DEFINITIONS, DERIVED_FIELDS, PRESETS, MAX_PARALLEL_QUERIES, VRLI_HOST, FIELD_CACHE_FILE, FIELD_CACHE_TTL
+from client import VrliClient
+
+# Endpoint templates come from the one engine in ../vrli_poc, shared with the access log tools
+URI_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "vrli_poc", "uri_templates.py")
+_spec = importlib.util.spec_from_file_location("uri_templates", URI_TEMPLATES_PATH)
+uri_templates = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(uri_templates)
+uri_template = uri_templates.uri_template
+
+def load_field_schema(client, refresh=False):
+    """Raw /fields list, served from the on-disk cache while it is younger than FIELD_CACHE_TTL."""
+    if not refresh:
+        try:
+            with open(FIELD_CACHE_FILE, "r") as f:
+                cached = json.load(f)
+            if cached.get("host") == VRLI_HOST and time.time() - cached.get("fetched_at", 0) < FIELD_CACHE_TTL:
+                return cached["fields"]
+        except (OSError, ValueError, KeyError): pass
 
-def discover_fields(token):
     sys.stderr.write("[*] Auto-Discovering Schema...\n")
+    fields = client.get_fields()
+    try:
+        tmp = f"{FIELD_CACHE_FILE}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"host": VRLI_HOST, "fetched_at": time.time(), "fields": fields}, f)
+        os.replace(tmp, FIELD_CACHE_FILE)
+    except OSError as e: sys.stderr.write(f"[!] Could not write field cache: {e}\n")
+    return fields
+
+def discover_fields(client, refresh=False):
     try:
-        r = requests.get(f"{BASE_URL}/fields", headers={"Authorization":f"Bearer {token}", "Accept":"application/json"}, verify=False)
         field_map = {}
-        for f in r.json():
+        for f in load_field_schema(client, refresh):
             d_name = f.get("displayName")
             i_name = f.get("internalName")
             is_static = f.get("isStatic", False)
@@ -58,45 +86,56 @@ def build_piql(start, end, filters, field_map):
             else: query_parts.append(f'text:"{val}"')
     return f"SELECT item0 FROM {' AND '.join(query_parts)} as item0 ORDER BY item0.timestamp DESC"
 
-def fetch_and_extract(token, filters, start_ms, end_ms, limit, fields_arg):
-    field_map = discover_fields(token)
-    piql = build_piql(start_ms, end_ms, filters, field_map)
-    sys.stderr.write(f"[*] Generated PIQL: {piql}\n")
-    
-    try:
-        # --- FIX: Uses imported VRLI_HOST correctly now ---
-        resp = requests.post(f"https://{VRLI_HOST}:9543/api/v2/queries", 
-            headers={"Authorization":f"Bearer {token}", "Content-Type":"application/json"},
-            json={"query": piql, "limit": limit, "timeout": 60000}, verify=False)
-        
-        data = resp.json()
-        if "errorMessage" in data: return []
+def build_extraction_plan(field_map, fields_arg):
+    """
+    Resolves, once per query, which fields arrive server-side (by internal id) and which need the
+    client-side pyRegex fallback, and returns a function that turns one vRLI message into a row.
+    """
+    id_to_name = {v["id"]: v["original_name"] for v in field_map.values()}
+    wanted = [x.strip() for x in fields_arg.split(',')] if fields_arg else list(KNOWN_DEFINITIONS) + list(DERIVED_FIELDS)
+    derived = [(name, DERIVED_FIELDS[name]) for name in wanted if name in DERIVED_FIELDS]
+    sources = wanted + [src for _, src in derived if src not in wanted]
+    client_side = [(name, field_map[name]["py_pattern"]) for name in sources
+                   if name in field_map and field_map[name].get("py_pattern") and "val" in field_map[name]["py_pattern"].groupindex]
+    fromtimestamp = datetime.datetime.fromtimestamp
 
-        events = []
-        id_to_def = {v["id"]: v for k,v in field_map.items()} 
+    def extract(item):
+        content = item.get("msgContent", {})
+        orig = content.get("originalText", "")
+        ts = content.get("timestamp")
+        row = { "timestamp": ts, "datetime": fromtimestamp(ts/1000).strftime('%Y-%m-%d %H:%M:%S'), "host": content.get("fields", {}).get("hostname", {}).get("value"), "message": orig }
 
-        for item in data.get("messageResults", {}).get("msgIds", []):
-            content = item.get("msgContent", {})
-            orig = content.get("originalText", "")
-            row = { "timestamp": content.get("timestamp"), "datetime": datetime.datetime.fromtimestamp(content.get("timestamp")/1000).strftime('%Y-%m-%d %H:%M:%S'), "host": content.get("fields", {}).get("hostname", {}).get("value"), "message": orig }
-            
-            extracted = content.get("regexFields", []) + content.get("additionalExtractedFields", [])
-            found_keys = set()
-            for f in extracted:
-                definition = id_to_def.get(f.get("name"))
-                if definition:
-                    row[definition["original_name"]] = f.get("content") or f.get("value")
-                    found_keys.add(definition["original_name"])
+        for extracted in (content.get("regexFields"), content.get("additionalExtractedFields")):
+            for f in extracted or ():
+                name = id_to_name.get(f.get("name"))
+                if name: row[name] = f.get("content") or f.get("value")
+
+        for name, pattern in client_side:
+            if row.get(name) is None:
+                match = pattern.search(orig)
+                if match: row[name] = match.group("val")
+
+        for name, src in derived:
+            # Source values may carry the request method ('"GET /path'); the path is the last token
+            value = row.get(src)
+            if value: row[name] = uri_template(value.split()[-1].lstrip('"'))
+        return row
+
+    return extract
+
+def iter_extract(token, filters, start_ms, end_ms, limit, fields_arg, slices=1, workers=MAX_PARALLEL_QUERIES, refresh_fields=False):
+    """Yields extracted rows page by page, newest first, without holding the full result in memory."""
+    client = VrliClient(token, workers=workers)
+    field_map = discover_fields(client, refresh_fields)
+    build_query = lambda s, e: build_piql(s, e, filters, field_map)
+    sys.stderr.write(f"[*] Generated PIQL: {build_query(start_ms, end_ms)}\n")
+    if slices > 1: sys.stderr.write(f"[*] Querying {slices} time slices ({client.workers} in parallel)\n")
+
+    extract = build_extraction_plan(field_map, fields_arg)
+    try:
+        for page in client.iter_sliced(build_query, start_ms, end_ms, limit, slices):
+            yield [extract(item) for item in page]
+    except Exception as e: sys.stderr.write(f"[-] Fetch Error: {e}\n")
 
-            fields_to_check = [x.strip() for x in fields_arg.split(',')] if fields_arg else [k for k in KNOWN_DEFINITIONS if k not in found_keys]
-            for fname in fields_to_check:
-                if fname not in row or row[fname] is None:
-                     finfo = field_map.get(fname)
-                     if finfo and finfo.get("py_pattern"):
-                         match = finfo["py_pattern"].search(orig)
-                         if match:
-                             try: row[fname] = match.group("val")
-                             except: pass
-            events.append(row)
-        return events
-    except Exception as e: sys.stderr.write(f"[-] Fetch Error: {e}\n"); return []
+def fetch_and_extract(token, filters, start_ms, end_ms, limit, fields_arg, slices=1, workers=MAX_PARALLEL_QUERIES, refresh_fields=False):
+    return [row for page in iter_extract(token, filters, start_ms, end_ms, limit, fields_arg, slices, workers, refresh_fields) for row in page]
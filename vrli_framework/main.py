@@ -3,11 +3,10 @@ import argparse
 import os
 import sys
 import getpass
-import csv
-import json
 import datetime
 from auth import get_token
-from engine import fetch_and_extract
+from engine import iter_extract
+from writer import StreamWriter
 
 def parse_time(t_str):
     try: return int(datetime.datetime.strptime(t_str, "%Y-%m-%d %H:%M:%S").timestamp() * 1000)
@@ -17,13 +16,17 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="vRLI Hybrid Framework")
     parser.add_argument("--filter", action='append', required=True)
     parser.add_argument("--fields")
-    parser.add_argument("--format", choices=['csv', 'json'], default='csv')
+    parser.add_argument("--format", choices=['csv', 'json', 'ndjson'], default='csv')
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output (implied by an --output ending in .gz)")
     parser.add_argument("--hours", type=int, default=2)
     parser.add_argument("--minutes", type=int)
     parser.add_argument("--start")
     parser.add_argument("--end")
     parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--slices", type=int, default=1, help="Split the time range into N slices queried concurrently")
+    parser.add_argument("--workers", type=int, default=4, help="Max concurrent slice queries (capped by MAX_PARALLEL_QUERIES)")
     parser.add_argument("--output")
+    parser.add_argument("--refresh-fields", action="store_true", help="Ignore the cached field schema and re-download it")
     parser.add_argument("--auth-user")
     parser.add_argument("--password")
     
@@ -45,26 +48,12 @@ if __name__ == "__main__":
     if u and p:
         t = get_token(u, p)
         if t:
-            data = fetch_and_extract(t, args.filter, start_ms, end_ms, args.limit, args.fields)
-            
-            if args.fields:
-                wanted = [x.strip() for x in args.fields.split(',')]
-                data = [{k: row.get(k, None) for k in wanted} for row in data]
-                keys = wanted
-            else:
-                keys = ['timestamp','datetime','host','message']
-                if data: keys += [k for k in set().union(*(d.keys() for d in data)) if k not in keys]
-
-            if data:
-                f = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
-                try:
-                    if args.format == 'csv':
-                        w = csv.DictWriter(f, fieldnames=keys, extrasaction='ignore')
-                        w.writeheader()
-                        w.writerows(data)
-                    elif args.format == 'json':
-                        json.dump(data, f, indent=2, default=str)
-                finally:
-                    if args.output: f.close()
-            else:
-                print("[-] No results.")
+            wanted = [x.strip() for x in args.fields.split(',')] if args.fields else None
+            out = StreamWriter(args.output, args.format, wanted, args.gzip)
+            try:
+                for page in iter_extract(t, args.filter, start_ms, end_ms, args.limit, args.fields, args.slices, args.workers, args.refresh_fields):
+                    out.write_page(page)
+            finally:
+                count = out.close()
+            if count: sys.stderr.write(f"[+] Wrote {count} rows\n")
+            else: print("[-] No results.")
@@ -0,0 +1,86 @@
+# writer.py
+import csv
+import gzip
+import json
+import os
+import sys
+
+BASE_KEYS = ['timestamp', 'datetime', 'host', 'message']
+
+class StreamWriter:
+    """
+    Writes result pages as they arrive (csv, json or ndjson, optionally gzip) so exports run in
+    constant memory. Without --fields the CSV header comes from the first page; columns that only
+    appear later widen the header at close by re-streaming the file through a spill copy
+    (stdout cannot be rewritten, so late columns are dropped there with a warning).
+    """
+
+    def __init__(self, path=None, fmt='csv', fields=None, compress=False):
+        self.path = path
+        self.fmt = fmt
+        self.fields = fields
+        self.compress = compress or bool(path and path.endswith('.gz'))
+        self.keys = list(fields) if fields else None
+        self.late_keys = []
+        self.count = 0
+        self.f = None
+        self.writer = None
+
+    def _open(self):
+        if self.path:
+            self.f = gzip.open(self.path, 'wt', newline='', encoding='utf-8') if self.compress else open(self.path, 'w', newline='', encoding='utf-8')
+        else:
+            self.f = gzip.open(sys.stdout.buffer, 'wt', encoding='utf-8') if self.compress else sys.stdout
+        if self.fmt == 'json': self.f.write('[')
+
+    def write_page(self, rows):
+        if not rows: return
+        if self.fields: rows = [{k: row.get(k, None) for k in self.fields} for row in rows]
+        if self.f is None: self._open()
+
+        if self.fmt == 'csv':
+            if self.writer is None:
+                if self.keys is None:
+                    extra = sorted({k for row in rows for k in row} - set(BASE_KEYS))
+                    self.keys = BASE_KEYS + extra
+                self.writer = csv.DictWriter(self.f, fieldnames=self.keys, extrasaction='ignore')
+                self.writer.writeheader()
+            elif not self.fields:
+                new = sorted({k for row in rows for k in row} - set(self.keys))
+                if new:
+                    self.late_keys += new
+                    # Rows grow to the widened header; the header itself is fixed up in close()
+                    if self.path: self.keys += new
+            self.writer.writerows(rows)
+        elif self.fmt == 'json':
+            for row in rows:
+                self.f.write(('\n  ' if self.count == 0 else ',\n  ') + json.dumps(row, default=str))
+                self.count += 1
+            self.f.flush()
+            return
+        else:
+            self.f.writelines(json.dumps(row, default=str) + '\n' for row in rows)
+        self.count += len(rows)
+        self.f.flush()
+
+    def close(self):
+        if self.f is None: return 0
+        if self.fmt == 'json': self.f.write('\n]\n')
+        if self.path or self.compress: self.f.close()
+        if self.late_keys:
+            if self.path: self._widen_header()
+            else: sys.stderr.write(f"[!] Columns first seen after the first page were dropped from stdout: {self.late_keys}\n")
+        return self.count
+
+    def _widen_header(self):
+        opener = (lambda p, m: gzip.open(p, m + 't', newline='', encoding='utf-8')) if self.compress else (lambda p, m: open(p, m, newline='', encoding='utf-8'))
+        spill = f"{self.path}.spill"
+        with opener(self.path, 'r') as src, opener(spill, 'w') as dst:
+            reader, out = csv.reader(src), csv.writer(dst)
+            next(reader, None)
+            out.writerow(self.keys)
+            width = len(self.keys)
+            for row in reader:
+                out.writerow(row + [''] * (width - len(row)))
+        os.replace(spill, self.path)
+        sys.stderr.write(f"[*] Header widened with late columns: {self.late_keys}\n")
@@ -2,8 +2,8 @@ import json
 import re
 import sys
 import argparse
-import math
-from collections import defaultdict
+from log_ingest import ingest_logs
+from stats_engine import RequestTable, parse_line, summarize, grouped_summaries, top_groups, slow_users, select, run_benchmark
 
 # --- CONFIGURATION ---
 HUMAN_USER_REGEX = re.compile(r'^[a-zA-Z]{2}\d{6}$')
@@ -11,97 +11,22 @@ HUMAN_USER_REGEX = re.compile(r'^[a-zA-Z]{2}\d{6}$')
 # --- PARSERS ---
 def parse_confluence(line):
     # Format: [Date] User Thread IP Method URL Protocol Status Duration(ms) ...
-    # We specifically look for the Method + URL pattern to be robust
-    try:
-        # Extract basic parts
-        match = re.search(r'^\[(.*?)\]\s+(\S+)\s+.*?\s+(\d+)ms', line)
-        if not match: return None
-        
-        timestamp = match.group(1)
-        user = match.group(2)
-        duration = int(match.group(3))
-        
-        # Extract URL: Look for "GET /path" or "POST /path"
-        # Simple split approach for the middle section
-        # The URL is usually after the IP address
-        url = "Unknown"
-        # Find standard HTTP methods
-        method_match = re.search(r'(GET|POST|PUT|DELETE|HEAD)\s+(\S+)', line)
-        if method_match:
-            url = method_match.group(2)
-            # Clean URL: Remove query params for better grouping (optional)
-            if '?' in url: url = url.split('?')[0]
-
-        return {
-            "time": timestamp, 
-            "user": user, 
-            "duration": duration,
-            "url": url
-        }
-    except: return None
+    return _as_dict(parse_line('confluence', line))
 
 def parse_jira(line):
     # Format: 10.x.x.x ... User [Date] "GET /url HTTP/1.1" Status Bytes Duration
-    try:
-        pre = line.split('[', 1)
-        if len(pre) < 2: return None
-        
-        user = pre[0].strip().split()[-1]
-        ts = pre[1].split(']')[0]
-        
-        q_parts = line.split('"')
-        if len(q_parts) < 3: return None
-        
-        # Request is q_parts[1]: "GET /rest/api/2/issue/123 HTTP/1.1"
-        req_tokens = q_parts[1].split()
-        url = "Unknown"
-        if len(req_tokens) > 1:
-            url = req_tokens[1]
-            # Clean URL: Remove query params
-            if '?' in url: url = url.split('?')[0]
-
-        metrics = q_parts[2].strip().split()
-        if len(metrics) < 3: return None
-        dur = metrics[2]
-        
-        if not dur.isdigit(): return None
-        return {
-            "time": ts, 
-            "user": user, 
-            "duration": int(dur),
-            "url": url
-        }
-    except: return None
-
-# --- STATISTICS ENGINE ---
-def get_percentile(data, p):
-    if not data: return 0
-    k = (len(data)-1) * (p/100.0)
-    f = math.floor(k); c = math.ceil(k)
-    if f == c: return data[int(k)]
-    return data[int(f)] * (c-k) + data[int(c)] * (k-f)
-
-def print_analysis_block(title, durations, T):
-    count = len(durations)
-    if count == 0: return
+    return _as_dict(parse_line('jira', line))
 
-    buckets = {"0-1s": 0, "1-5s": 0, "5-10s": 0, "10-30s": 0, "30-60s": 0, ">60s": 0}
-    sat, tol, frust = 0, 0, 0
-    
-    for d in durations:
-        if d < 1000: buckets["0-1s"]+=1
-        elif d < 5000: buckets["1-5s"]+=1
-        elif d < 10000: buckets["5-10s"]+=1
-        elif d < 30000: buckets["10-30s"]+=1
-        elif d < 60000: buckets["30-60s"]+=1
-        else: buckets[">60s"]+=1
-        
-        if d <= T: sat += 1
-        elif d <= 4*T: tol += 1
-        else: frust += 1
-
-    apdex = (sat + (tol/2)) / count
-    avg = sum(durations) / count
+def _as_dict(parsed):
+    if not parsed: return None
+    ts, user, dur, url = parsed
+    return {"time": ts, "user": user, "duration": dur, "url": url}
+
+# --- REPORT ---
+def print_analysis_block(title, stats):
+    count = stats["count"]
+    if count == 0: return
+    b, pct = stats["buckets"], stats["percentiles"]
     
     print(f"\n>>> {title} (Sample: {count} requests)")
     print("-" * 65)
@@ -109,70 +34,35 @@ def print_analysis_block(title, durations, T):
     print("="*65)
     row_fmt = "{:<12} | {:<6} | {:<6} || {:<15} | {}"
     
-    print(row_fmt.format("0-1s", buckets['0-1s'], f"{(buckets['0-1s']/count)*100:.1f}%", "Apdex Score", f"{apdex:.2f}"))
-    print(row_fmt.format("1-5s", buckets['1-5s'], f"{(buckets['1-5s']/count)*100:.1f}%", "Average", f"{avg:.0f} ms"))
-    print(row_fmt.format("5-10s", buckets['5-10s'], f"{(buckets['5-10s']/count)*100:.1f}%", "99th %", f"{get_percentile(durations, 99):.0f} ms"))
-    print(row_fmt.format("10-30s", buckets['10-30s'], f"{(buckets['10-30s']/count)*100:.1f}%", "98th %", f"{get_percentile(durations, 98):.0f} ms"))
-    print(row_fmt.format("30-60s", buckets['30-60s'], f"{(buckets['30-60s']/count)*100:.1f}%", "95th %", f"{get_percentile(durations, 95):.0f} ms"))
-    print(row_fmt.format(">60s", buckets['>60s'], f"{(buckets['>60s']/count)*100:.1f}%", "90th %", f"{get_percentile(durations, 90):.0f} ms"))
-    print(row_fmt.format("", "", "", "80th %", f"{get_percentile(durations, 80):.0f} ms"))
-    print(row_fmt.format("", "", "", "Max Time", f"{durations[-1]} ms"))
-
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--file", required=True); parser.add_argument("--app", required=True)
-    parser.add_argument("--type", required=True); parser.add_argument("--include", action='append')
-    parser.add_argument("--threshold", type=int, default=1000)
-    args = parser.parse_args()
-
-    try:
-        with open(args.file, 'r') as f:
-            events = json.load(f)
-    except Exception as e:
-        print(f"Error reading file: {e}")
-        sys.exit(1)
-
-    all_durations = []
-    node_durations = defaultdict(list)
-    url_stats = defaultdict(list) # Store durations per URL
-    slow_users = defaultdict(lambda: {"count": 0, "max": 0, "last": None, "host": ""})
-
+    print(row_fmt.format("0-1s", b['0-1s'], f"{(b['0-1s']/count)*100:.1f}%", "Apdex Score", f"{stats['apdex']:.2f}"))
+    print(row_fmt.format("1-5s", b['1-5s'], f"{(b['1-5s']/count)*100:.1f}%", "Average", f"{stats['avg']:.0f} ms"))
+    print(row_fmt.format("5-10s", b['5-10s'], f"{(b['5-10s']/count)*100:.1f}%", "99th %", f"{pct[99]:.0f} ms"))
+    print(row_fmt.format("10-30s", b['10-30s'], f"{(b['10-30s']/count)*100:.1f}%", "98th %", f"{pct[98]:.0f} ms"))
+    print(row_fmt.format("30-60s", b['30-60s'], f"{(b['30-60s']/count)*100:.1f}%", "95th %", f"{pct[95]:.0f} ms"))
+    print(row_fmt.format(">60s", b['>60s'], f"{(b['>60s']/count)*100:.1f}%", "90th %", f"{pct[90]:.0f} ms"))
+    print(row_fmt.format("", "", "", "80th %", f"{pct[80]:.0f} ms"))
+    print(row_fmt.format("", "", "", "Max Time", f"{stats['max']} ms"))
+
+def load_events(table, events, app, include):
     for e in events:
         line = e.get('message', '')
-        host = e.get('host', 'Unknown-Host') 
-        
-        if args.include and not all(term in line for term in args.include): continue
-
-        parsed = parse_confluence(line) if args.app == 'confluence' else parse_jira(line)
-        if not parsed: continue
-        
-        is_human = bool(HUMAN_USER_REGEX.match(parsed['user']))
-        if args.type == 'human' and (not is_human or parsed['user'] == '-'): continue
-        if args.type == 'service' and is_human: continue
-        
-        d = parsed['duration']
-        all_durations.append(d)
-        node_durations[host].append(d)
-        url_stats[parsed['url']].append(d)
-        
-        if d > (args.threshold * 4):
-            u = parsed['user']
-            slow_users[u]["count"] += 1
-            if d > slow_users[u]["max"]: 
-                slow_users[u]["max"] = d
-                slow_users[u]["host"] = host
-            slow_users[u]["last"] = parsed['time']
-
-    if not all_durations:
+        if include and not all(term in line for term in include): continue
+        parsed = parse_line(app, line)
+        if parsed: table.add(e.get('host', 'Unknown-Host'), *parsed)
+
+def print_report(table, app, user_type, threshold):
+    cols = table.columns()
+    if user_type in ('human', 'service'):
+        cols = select(cols, table.user_mask(HUMAN_USER_REGEX, user_type == 'human'))
+    durations = cols["duration"]
+    if not len(durations):
         print("No matching requests found."); sys.exit(0)
 
-    all_durations.sort()
-    
     # 1. OVERALL SUMMARY
     print("="*65)
-    print(f"  PERFORMANCE REPORT: {args.app.upper()} ({args.type.upper()})")
+    print(f"  PERFORMANCE REPORT: {app.upper()} ({user_type.upper()})")
     print("="*65)
-    print_analysis_block("OVERALL SYSTEM", all_durations, args.threshold)
+    print_analysis_block("OVERALL SYSTEM", summarize(durations, threshold))
 
     # 2. TOP 5 URIs
     print("\n" + "="*65)
@@ -180,34 +70,57 @@ def main():
     print("="*65)
     print(f"{'Count':<6} | {'Avg(ms)':<7} | {'99th%':<7} | {'URI':<40}")
     print("-" * 65)
-    
-    # Sort by Count (Frequency) descending
-    sorted_urls = sorted(url_stats.items(), key=lambda x: len(x[1]), reverse=True)
-    
-    for url, durs in sorted_urls[:5]:
-        durs.sort()
-        cnt = len(durs)
-        avg = sum(durs) / cnt
-        p99 = get_percentile(durs, 99)
+    for code, cnt, avg, p99 in top_groups(cols["url"], durations, len(table.urls.values)):
+        url = table.urls.values[code]
         # Truncate URL for display
         disp_url = (url[:37] + '..') if len(url) > 39 else url
         print(f"{cnt:<6} | {avg:<7.0f} | {p99:<7.0f} | {disp_url}")
 
-
-    # 3. CLUSTER BREAKDOWN
+    # 3. CLUSTER BREAKDOWN (grouped percentiles for every node in one pass)
     print("\n" + "="*65); print("  CLUSTER NODE BREAKDOWN"); print("="*65)
-    for node in sorted(node_durations.keys()):
-        durs = sorted(node_durations[node])
-        print_analysis_block(f"NODE: {node}", durs, args.threshold)
+    node_stats = grouped_summaries(cols["node"], durations, threshold, len(table.nodes.values))
+    for code in sorted(range(len(table.nodes.values)), key=lambda c: table.nodes.values[c]):
+        if node_stats[code]: print_analysis_block(f"NODE: {table.nodes.values[code]}", node_stats[code])
 
     # 4. FRUSTRATED USERS
-    if slow_users:
-        print("\n" + "="*65); print(f"  FRUSTRATED USERS (> {args.threshold * 4}ms)"); print("="*65)
+    slow = slow_users(cols, threshold * 4, user_names=table.users.values)
+    if slow:
+        print("\n" + "="*65); print(f"  FRUSTRATED USERS (> {threshold * 4}ms)"); print("="*65)
         print(f"{'UserID':<15} | {'Count':<5} | {'Max(ms)':<9} | {'Node (Max)':<20} | {'Last Seen'}")
         print("-" * 75)
-        sorted_slow = sorted(slow_users.items(), key=lambda x: x[1]['max'], reverse=True)
-        for user, stats in sorted_slow[:20]:
-            h_short = (stats['host'][:18] + '..') if len(stats['host']) > 20 else stats['host']
-            print(f"{user:<15} | {stats['count']:<5} | {stats['max']:<9} | {h_short:<20} | {stats['last']}")
+        for user_code, cnt, max_ms, node_code, time_code in slow:
+            user, host = table.users.values[user_code], table.nodes.values[node_code]
+            h_short = (host[:18] + '..') if len(host) > 20 else host
+            print(f"{user:<15} | {cnt:<5} | {max_ms:<9} | {h_short:<20} | {table.times.values[time_code]}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file"); parser.add_argument("--app", required=True)
+    parser.add_argument("--type", required=True); parser.add_argument("--include", action='append')
+    parser.add_argument("--threshold", type=int, default=1000)
+    parser.add_argument("--log", action='append', metavar="[NODE=]PATH", help="Raw Tomcat access log (plain or .gz); repeatable")
+    parser.add_argument("--workers", type=int, help="Parser processes for --log (default: all CPUs)")
+    parser.add_argument("--raw-uris", action="store_true", help="Group by raw path instead of endpoint template (/rest/api/{ver}/issue/{key})")
+    parser.add_argument("--benchmark", type=int, metavar="LINES", help="Time the stats engine on N synthetic lines and exit")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark('confluence' if args.app == 'confluence' else 'jira', args.benchmark, args.threshold); return
+    if not args.file and not args.log: parser.error("--file or --log is required")
+    app = 'confluence' if args.app == 'confluence' else 'jira'
+    table = RequestTable(url_templates=not args.raw_uris)
+
+    if args.file:
+        try:
+            with open(args.file, 'r') as f:
+                events = json.load(f)
+        except Exception as e:
+            print(f"Error reading file: {e}")
+            sys.exit(1)
+        load_events(table, events, app, args.include)
+    if args.log:
+        ingest_logs(args.log, app, args.include, args.workers, table)
+
+    print_report(table, args.app, args.type, args.threshold)
 
 if __name__ == "__main__": main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import socket
+import argparse
+from datetime import datetime, date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from log_ingest import LOG_DIRS, iter_text_blocks, log_file_date, find_logs
+from stats_engine import CHUNK_PATTERNS, PERCENTILES, DurationHistogram
+
+# --- CONFIGURATION ---
+HEADER = ("datetime,hostname,app,request_count,min_response_time_ms,max_response_time_ms,avg_response_time_ms,"
+          + ",".join(f"p{p}_response_time_ms" for p in PERCENTILES))
+
+def _bucket_of(minute_key, interval, cache):
+    """'20/Dec/2025:10:07' -> datetime floored to the interval (parsed once per distinct minute)."""
+    b = cache.get(minute_key)
+    if b is None:
+        try:
+            t = datetime.strptime(minute_key, "%d/%b/%Y:%H:%M")
+        except ValueError:
+            b = cache[minute_key] = False
+            return b
+        minute = (t.hour * 60 + t.minute) // interval * interval
+        b = cache[minute_key] = datetime(t.year, t.month, t.day) + timedelta(minutes=minute)
+    return b
+
+def scan_file(args):
+    """One streaming pass over a plain or .gz log: {bucket_start: DurationHistogram}."""
+    path, app, interval = args
+    pattern = CHUNK_PATTERNS[app]
+    hists, cache = {}, {}
+    for block in iter_text_blocks(path):
+        per_bucket = {}
+        for m in pattern.finditer(block.decode("utf-8", "replace")):
+            ts, dur = m.group('time', 'dur')
+            b = _bucket_of(ts[:17], interval, cache)
+            if not b: continue
+            d = int(dur)
+            # The shell report drops 0 ms Confluence requests (its "response_time > 0" check); keep parity
+            if app == "confluence" and d == 0: continue
+            per_bucket.setdefault(b, []).append(d)
+        for b, durs in per_bucket.items():
+            hists.setdefault(b, DurationHistogram()).add_many(durs)
+    return app, hists
+
+def format_row(bucket, hostname, app, h):
+    if not h or not h.count:
+        return f"{bucket:%Y-%m-%d %H:%M},{hostname},{app},0,0,0,0.00," + ",".join("0" for _ in PERCENTILES)
+    pct = h.rank_percentiles(PERCENTILES)
+    return f"{bucket:%Y-%m-%d %H:%M},{hostname},{app},{h.count},{h.min},{h.max},{h.total / h.count:.2f}," + ",".join(str(v) for v in pct)
+
+def hourly_rows(jobs, interval, hostname, start=None, end=None, workers=None):
+    """
+    Scans every (app, path) job once in a process pool, merges the per-file histograms per (app, bucket)
+    and returns CSV rows ordered by day, app, bucket. Days that have a log file get every slot,
+    with zero rows for quiet intervals, like the shell report.
+    """
+    apps = []
+    merged, days = {}, {}
+    for app, path, file_date in jobs:
+        if app not in apps: apps.append(app)
+        if file_date: days.setdefault(app, set()).add(file_date)
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for app, hists in pool.map(scan_file, [(path, app, interval) for app, path, _ in jobs]):
+            for b, h in hists.items():
+                if start and b.date() < start: continue
+                if end and b.date() > end: continue
+                merged.setdefault((app, b), DurationHistogram()).merge(h)
+
+    slots = set(merged)
+    per_day = 24 * 60 // interval + (1 if 24 * 60 % interval else 0)
+    for app, ds in days.items():
+        for d in ds:
+            if (start and d < start) or (end and d > end): continue
+            base = datetime(d.year, d.month, d.day)
+            slots.update((app, base + timedelta(minutes=i * interval)) for i in range(per_day))
+    order = sorted(slots, key=lambda s: (s[1].date(), apps.index(s[0]), s[1]))
+    return [format_row(b, hostname, app, merged.get((app, b))) for app, b in order]
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-pass hourly (or any interval) system analytics for Jira/Confluence access logs.")
+    parser.add_argument("app", nargs="?", default="both", choices=["jira", "confluence", "both"])
+    parser.add_argument("start_date", nargs="?", help="YYYY-MM-DD (alone: that single day)")
+    parser.add_argument("end_date", nargs="?", help="YYYY-MM-DD")
+    parser.add_argument("--interval", type=int, default=60, help="Bucket size in minutes (default: 60)")
+    parser.add_argument("--jira-log-dir", default=LOG_DIRS["jira"])
+    parser.add_argument("--confluence-log-dir", default=LOG_DIRS["confluence"])
+    parser.add_argument("--file", action="append", help="Explicit log file (plain or .gz); repeatable, needs a single app")
+    parser.add_argument("--hostname", default=socket.gethostname().split(".")[0])
+    parser.add_argument("--workers", type=int, help="Parallel file scanners (default: all CPUs)")
+    parser.add_argument("--output", help="CSV file (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        start = date.fromisoformat(args.start_date) if args.start_date else None
+        end = date.fromisoformat(args.end_date) if args.end_date else start
+    except ValueError:
+        sys.exit("[-] Invalid date format. Use YYYY-MM-DD")
+    if start and end and start > end: sys.exit("[-] Start date cannot be after end date")
+    if args.interval < 1: sys.exit("[-] --interval must be at least 1 minute")
+
+    apps = ["jira", "confluence"] if args.app == "both" else [args.app]
+    jobs = []
+    if args.file:
+        if len(apps) != 1: sys.exit("[-] --file needs app 'jira' or 'confluence'")
+        jobs = [(apps[0], p, log_file_date(apps[0], os.path.basename(p))) for p in args.file]
+    else:
+        dirs = {"jira": args.jira_log_dir, "confluence": args.confluence_log_dir}
+        for app in apps:
+            found = find_logs(app, dirs[app], start, end)
+            if not found: sys.stderr.write(f"[-] No {app} log files found in {dirs[app]}\n")
+            jobs += [(app, path, d) for d, path in found]
+
+    rows = hourly_rows(jobs, args.interval, args.hostname, start, end, args.workers) if jobs else []
+    out = open(args.output, "w") if args.output else sys.stdout
+    out.write(HEADER + "\n")
+    out.writelines(row + "\n" for row in rows)
+    if args.output:
+        out.close()
+        print(f"[*] {len(rows)} rows written to {args.output}")
+
+if __name__ == "__main__":
+    main()
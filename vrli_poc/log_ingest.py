@@ -0,0 +1,120 @@
+import os
+import re
+import glob
+import gzip
+import mmap
+import socket
+from datetime import date, timedelta
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from stats_engine import RequestTable
+
+CHUNK_BYTES = 64 * 1024 * 1024
+GZIP_READ_BYTES = 32 * 1024 * 1024
+LOG_DIRS = {"jira": "/export/jira/logs", "confluence": "/export/confluence/logs"}
+LOG_PREFIXES = {"jira": "access_log", "confluence": "conf_access_log"}
+
+def parse_log_spec(spec):
+    """'node=/path/to/access_log' or just a path (node defaults to this host's short name)."""
+    if "=" in spec and not os.path.exists(spec):
+        node, path = spec.split("=", 1)
+        return node, path
+    return socket.gethostname().split(".")[0], spec
+
+def log_file_date(app, name):
+    """Date from a rotated log name (access_log.2025-09-15[.log][.gz]), or None."""
+    m = re.match(re.escape(LOG_PREFIXES[app]) + r'\.(\d{4}-\d{2}-\d{2})(?:\.log)?(?:\.gz)?$', name)
+    return date.fromisoformat(m.group(1)) if m else None
+
+def find_logs(app, log_dir, start=None, end=None):
+    """(file_date, path) for rotated logs dated start..end+1 (the next file can hold the last minutes before rotation)."""
+    found = []
+    for path in glob.glob(os.path.join(log_dir, LOG_PREFIXES[app] + ".*")):
+        d = log_file_date(app, os.path.basename(path))
+        if d is None: continue
+        if start and d < start: continue
+        if end and d > end + timedelta(days=1): continue
+        found.append((d, path))
+    return sorted(found)
+
+def line_aligned_ranges(path, chunk_bytes=CHUNK_BYTES):
+    """Byte ranges covering the file, each ending just after a newline (or at EOF)."""
+    size = os.path.getsize(path)
+    if size == 0: return []
+    ranges = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = min(size, start + chunk_bytes)
+            if end < size:
+                nl = mm.find(b"\n", end)
+                end = size if nl == -1 else nl + 1
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def _parse_range(args):
+    path, start, end, node, app, include, url_templates = args
+    table = RequestTable(url_templates)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        table.add_text(node, app, mm[start:end].decode("utf-8", "replace"), include)
+    return table
+
+def _parse_bytes(args):
+    data, node, app, include, url_templates = args
+    table = RequestTable(url_templates)
+    table.add_text(node, app, data.decode("utf-8", "replace"), include)
+    return table
+
+def iter_text_blocks(path, block_bytes=GZIP_READ_BYTES, offset=0, partial_tail=True):
+    """
+    Sequential newline-aligned byte blocks of a plain or .gz file, starting at (uncompressed) byte
+    `offset`. With partial_tail=False an unterminated last line is held back, so a
+    live log can be resumed from offset + bytes yielded.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        if offset: f.seek(offset)
+        tail = b""
+        while True:
+            block = f.read(block_bytes)
+            if not block: break
+            block = tail + block
+            cut = block.rfind(b"\n") + 1
+            if cut == 0:
+                tail = block; continue
+            tail = block[cut:]
+            yield block[:cut]
+        if tail and partial_tail: yield tail
+
+def _gzip_blocks(path, node, app, include, url_templates):
+    """Decompresses sequentially (gzip cannot be split) and hands out newline-aligned blocks."""
+    for block in iter_text_blocks(path):
+        yield (block, node, app, include, url_templates)
+
+def _bounded_map(pool, fn, items, depth):
+    """Ordered pool.map that keeps at most `depth` chunks in flight, so gzip input is not buffered whole."""
+    in_flight = deque()
+    for item in items:
+        in_flight.append(pool.submit(fn, item))
+        if len(in_flight) >= depth: yield in_flight.popleft().result()
+    while in_flight: yield in_flight.popleft().result()
+
+def ingest_logs(specs, app, include=None, workers=None, table=None):
+    """
+    Parses raw Tomcat access logs (plain files are memory-mapped and split on line boundaries,
+    .gz files are decompressed in the parent and streamed as blocks) in a process pool and merges
+    every chunk into one RequestTable. Chunk tables inherit the target table's url_templates setting.
+    """
+    if table is None: table = RequestTable()
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for spec in specs:
+            node, path = parse_log_spec(spec)
+            if path.endswith(".gz"):
+                results = _bounded_map(pool, _parse_bytes, _gzip_blocks(path, node, app, include, table.url_templates), workers * 2)
+            else:
+                results = _bounded_map(pool, _parse_range, [(path, s, e, node, app, include, table.url_templates) for s, e in line_aligned_ranges(path)], workers * 2)
+            for chunk_table in results:
+                table.merge(chunk_table)
+    return table
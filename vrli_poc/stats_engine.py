@@ -0,0 +1,292 @@
+import re
+import json
+import time
+import random
+from array import array
+import numpy as np
+from uri_templates import uri_template
+
+# --- LINE FORMATS ---
+# Jira:       10.x.x.x 123x456x1 user [20/Dec/2025:10:00:00 -0800] "GET /url?q HTTP/1.1" 200 1234 56 "ref" "agent"
+# Confluence: [20/Dec/2025:10:00:00 -0800] user thread 10.x.x.x GET /url?q HTTP/1.1 200 56ms ...
+# Patterns never cross a newline, so the MULTILINE variants can scan a whole chunk with finditer.
+# Fields may be separated by several blanks (Tomcat pads empty fields), but never by a newline
+JIRA_LINE = re.compile(r'^[ \t]*(?:[^\[\s]+[ \t]+)*(?P<user>[^\s\[]+)[ \t]+\[(?P<time>[^\]\n]*)\][ \t]+"(?:\S+[ \t]+(?P<url>[^\s?"]*))?[^"\n]*"[ \t]+\S+[ \t]+\S+[ \t]+(?P<dur>\d+)(?!\S)')
+CONFLUENCE_LINE = re.compile(r'^\[(?P<time>.*?)\][ \t]+(?P<user>\S+)[ \t](?:.*?(?:GET|POST|PUT|DELETE|HEAD)[ \t]+(?P<url>[^\s?]+))?.*?[ \t](?P<dur>\d+)ms')
+LINE_PATTERNS = {"jira": JIRA_LINE, "confluence": CONFLUENCE_LINE}
+CHUNK_PATTERNS = {app: re.compile(p.pattern, re.MULTILINE) for app, p in LINE_PATTERNS.items()}
+
+BUCKET_EDGES = np.array([1000, 5000, 10000, 30000, 60000])
+BUCKET_LABELS = ["0-1s", "1-5s", "5-10s", "10-30s", "30-60s", ">60s"]
+PERCENTILES = [99, 98, 95, 90, 80]
+
+def parse_line(app, line):
+    """(time, user, duration_ms, url) for one access log line, or None if it does not parse."""
+    m = LINE_PATTERNS[app].match(line)
+    if not m: return None
+    return m.group('time'), m.group('user'), int(m.group('dur')), m.group('url') or "Unknown"
+
+class Categories:
+    """String <-> int32 code table, so per-request columns stay numeric."""
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def code(self, value):
+        c = self.index.get(value)
+        if c is None:
+            c = self.index[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+class RequestTable:
+    """
+    Columnar accumulator for parsed requests: durations as int32 and node/url/user/time as
+    categorical codes. Appends go to compact `array` buffers; `columns()` snapshots them as NumPy
+    int32 arrays. With url_templates, URLs are stored as endpoint templates (uri_templates), which
+    keeps the URL category table bounded.
+    """
+    def __init__(self, url_templates=False):
+        self.url_templates = url_templates
+        self.nodes, self.urls, self.users, self.times = Categories(), Categories(), Categories(), Categories()
+        self.durations = array('i')
+        self.node_codes, self.url_codes, self.user_codes, self.time_codes = array('i'), array('i'), array('i'), array('i')
+
+    def __len__(self):
+        return len(self.durations)
+
+    def add(self, node, ts, user, duration, url):
+        self.durations.append(duration)
+        self.node_codes.append(self.nodes.code(node))
+        self.url_codes.append(self.urls.code(uri_template(url) if self.url_templates else url))
+        self.user_codes.append(self.users.code(user))
+        self.time_codes.append(self.times.code(ts))
+
+    def add_text(self, node, app, text, include=None):
+        """Parses every matching line of a multi-line text block (one regex scan unless include terms are given)."""
+        if include:
+            for line in text.splitlines():
+                if all(term in line for term in include):
+                    p = parse_line(app, line)
+                    if p: self.add(node, *p)
+            return
+        node_code = self.nodes.code(node)
+        durations, node_codes, url_codes, user_codes, time_codes = self.durations, self.node_codes, self.url_codes, self.user_codes, self.time_codes
+        url_code, user_code, time_code = self.urls.code, self.users.code, self.times.code
+        if self.url_templates: url_code = lambda u, code=url_code: code(uri_template(u))
+        for m in CHUNK_PATTERNS[app].finditer(text):
+            ts, user, dur, url = m.group('time', 'user', 'dur', 'url')
+            durations.append(int(dur))
+            node_codes.append(node_code)
+            url_codes.append(url_code(url or "Unknown"))
+            user_codes.append(user_code(user))
+            time_codes.append(time_code(ts))
+
+    def merge(self, other):
+        """Appends another table's rows, remapping its category codes onto this table's."""
+        if not len(other): return
+        for name, cats in (("node", "nodes"), ("url", "urls"), ("user", "users"), ("time", "times")):
+            mine, theirs = getattr(self, cats), getattr(other, cats)
+            mapping = np.array([mine.code(v) for v in theirs.values], dtype=np.int32)
+            target = getattr(self, f"{name}_codes")
+            target.frombytes(mapping[np.frombuffer(getattr(other, f"{name}_codes"), dtype=np.int32)].tobytes())
+        self.durations.frombytes(other.durations.tobytes())
+
+    def columns(self):
+        view = lambda a: np.frombuffer(a, dtype=np.int32).copy() if len(a) else np.zeros(0, dtype=np.int32)
+        return {"duration": view(self.durations), "node": view(self.node_codes), "url": view(self.url_codes),
+                "user": view(self.user_codes), "time": view(self.time_codes)}
+
+    def user_mask(self, regex, want_match):
+        """Boolean row mask from a per-user predicate, evaluated once per distinct user."""
+        per_user = np.array([bool(regex.match(u)) == want_match and (u != '-' or not want_match) for u in self.users.values], dtype=bool)
+        return per_user[self.columns()["user"]] if len(per_user) else np.zeros(0, dtype=bool)
+
+# --- STATISTICS ---
+def summarize(durations, T):
+    """Buckets, Apdex, average, percentiles and max for one group of durations."""
+    count = len(durations)
+    buckets = np.bincount(np.searchsorted(BUCKET_EDGES, durations, side='right'), minlength=len(BUCKET_LABELS))
+    sat = np.count_nonzero(durations <= T)
+    tol = np.count_nonzero(durations <= 4 * T) - sat
+    pct = np.percentile(durations, PERCENTILES) if count else np.zeros(len(PERCENTILES))
+    return {
+        "count": count,
+        "buckets": dict(zip(BUCKET_LABELS, buckets.tolist())),
+        "apdex": (sat + tol / 2) / count if count else 0.0,
+        "avg": float(durations.mean()) if count else 0.0,
+        "percentiles": dict(zip(PERCENTILES, pct.tolist())),
+        "max": int(durations.max()) if count else 0,
+    }
+
+def grouped_percentiles(codes, durations, percentiles, n_groups):
+    """
+    Linear-interpolated percentiles for every group at once: one sort of a packed (code, duration)
+    int64 key, then index arithmetic on each group's contiguous slice. Durations must be >= 0.
+    Returns an array [n_groups, len(percentiles)].
+    """
+    packed = np.sort((codes.astype(np.int64) << 31) | durations.astype(np.int64))
+    sorted_d = (packed & 0x7FFFFFFF).astype(np.float64)
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    out = np.zeros((n_groups, len(percentiles)))
+    has = counts > 0
+    for j, p in enumerate(percentiles):
+        k = (counts[has] - 1) * (p / 100.0)
+        f, c = np.floor(k).astype(np.int64), np.ceil(k).astype(np.int64)
+        lo, hi = sorted_d[starts[has] + f], sorted_d[starts[has] + c]
+        out[has, j] = np.where(f == c, lo, lo * (c - k) + hi * (k - f))
+    return out
+
+def grouped_summaries(codes, durations, T, n_groups):
+    """summarize() for every group code at once using bincount/ufunc.at; groups without rows map to None."""
+    nb = len(BUCKET_LABELS)
+    counts = np.bincount(codes, minlength=n_groups)
+    buckets = np.bincount(codes * nb + np.searchsorted(BUCKET_EDGES, durations, side='right'), minlength=n_groups * nb).reshape(n_groups, nb)
+    sat = np.bincount(codes, weights=durations <= T, minlength=n_groups)
+    tol = np.bincount(codes, weights=durations <= 4 * T, minlength=n_groups) - sat
+    sums = np.bincount(codes, weights=durations, minlength=n_groups)
+    maxes = np.zeros(n_groups, dtype=np.int64)
+    np.maximum.at(maxes, codes, durations)
+    pct = grouped_percentiles(codes, durations, PERCENTILES, n_groups)
+    out = []
+    for g in range(n_groups):
+        n = int(counts[g])
+        out.append(None if n == 0 else {
+            "count": n,
+            "buckets": dict(zip(BUCKET_LABELS, buckets[g].tolist())),
+            "apdex": (sat[g] + tol[g] / 2) / n,
+            "avg": sums[g] / n,
+            "percentiles": dict(zip(PERCENTILES, pct[g].tolist())),
+            "max": int(maxes[g]),
+        })
+    return out
+
+class DurationHistogram:
+    """
+    Mergeable log-linear histogram of integer durations (ms): exact below 2048 ms, then 11 significant
+    bits (< 0.05% relative error). Count, sum, min and max are exact, so histograms from different
+    chunks, files or hosts combine with merge() without keeping raw samples.
+    """
+    EXACT_BITS = 11
+
+    def __init__(self):
+        self.counts = {}
+        self.count, self.total, self.min, self.max = 0, 0, None, None
+
+    @classmethod
+    def quantize(cls, durations):
+        d = np.asarray(durations, dtype=np.int64)
+        shift = np.maximum(np.frexp(d.astype(np.float64))[1] - cls.EXACT_BITS, 0)
+        return (d >> shift) << shift
+
+    def add_many(self, durations):
+        d = np.asarray(durations, dtype=np.int64)
+        if not len(d): return
+        keys, n = np.unique(self.quantize(d), return_counts=True)
+        counts = self.counts
+        for k, c in zip(keys.tolist(), n.tolist()): counts[k] = counts.get(k, 0) + c
+        lo, hi = int(d.min()), int(d.max())
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+        self.count += len(d)
+        self.total += int(d.sum())
+
+    def merge(self, other):
+        if not other.count: return
+        for k, c in other.counts.items(): self.counts[k] = self.counts.get(k, 0) + c
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def count_above(self, limit_ms):
+        """Requests slower than limit_ms (exact when limit_ms < 2048, bucket resolution above)."""
+        q = int(self.quantize([limit_ms])[0])
+        return sum(c for k, c in self.counts.items() if k > q)
+
+    def dumps(self):
+        return json.dumps([self.count, self.total, self.min, self.max, sorted(self.counts.items())], separators=(",", ":"))
+
+    @classmethod
+    def loads(cls, text):
+        h = cls()
+        h.count, h.total, h.min, h.max, items = json.loads(text)
+        h.counts = dict(items)
+        return h
+
+    def rank_percentiles(self, percentiles):
+        """Nearest-rank values sorted[max(1, int(count * p / 100))] (1-based), as the awk reports compute them."""
+        if not self.count: return [0] * len(percentiles)
+        keys = sorted(self.counts)
+        cum = np.cumsum([self.counts[k] for k in keys])
+        ranks = [max(1, int(self.count * (p / 100))) for p in percentiles]
+        return [keys[int(np.searchsorted(cum, r))] for r in ranks]
+
+def top_groups(codes, durations, n_groups, top=5, percentile=99):
+    """(code, count, avg, pXX) for the `top` most frequent groups."""
+    counts = np.bincount(codes, minlength=n_groups)
+    sums = np.bincount(codes, weights=durations, minlength=n_groups)
+    # Ties keep first-seen order within the selected rows
+    first_seen = np.full(n_groups, len(codes), dtype=np.int64)
+    np.minimum.at(first_seen, codes, np.arange(len(codes)))
+    top_codes = np.lexsort((first_seen, -counts))[:top]
+    top_codes = top_codes[counts[top_codes] > 0]
+    pct = grouped_percentiles(codes, durations, [percentile], n_groups)[:, 0]
+    return [(int(c), int(counts[c]), sums[c] / counts[c], pct[c]) for c in top_codes]
+
+def select(cols, mask):
+    """Row subset of a column dict."""
+    return {k: v[mask] for k, v in cols.items()}
+
+def slow_users(cols, limit_ms, top=20, user_names=None):
+    """
+    Per-user count, max, node at first max and last-seen time code for requests above limit_ms,
+    largest max first; ties are ordered by user ID (user_names[code], else the code itself).
+    """
+    rows = np.flatnonzero(cols["duration"] > limit_ms)
+    if not len(rows): return []
+    users, durs = cols["user"][rows], cols["duration"][rows]
+    # Per user: largest duration first, earliest row among ties (matches a running "d > max" scan)
+    order = np.lexsort((rows, -durs, users))
+    first = np.concatenate(([True], users[order][1:] != users[order][:-1]))
+    max_rows = rows[order][first]
+    counts = np.bincount(users)
+    last_row = np.zeros(users.max() + 1, dtype=np.int64)
+    np.maximum.at(last_row, users, rows)
+    result = []
+    for r in max_rows:
+        u = cols["user"][r]
+        result.append((int(u), int(counts[u]), int(cols["duration"][r]), int(cols["node"][r]), int(cols["time"][last_row[u]])))
+    result.sort(key=lambda x: (-x[2], user_names[x[0]] if user_names is not None else x[0]))
+    return result[:top]
+
+# --- BENCHMARK ---
+def synthetic_lines(app, n, seed=42):
+    """n fake access log lines in the given app's format, for benchmarking the engine."""
+    rnd = random.Random(seed)
+    urls = ["/rest/api/2/issue/ABC-%d" % i for i in range(2000)] + ["/secure/Dashboard.jspa", "/rest/api/2/search", "/browse/XYZ-1"]
+    users = ["ab%06d" % i for i in range(3000)] + ["svc-bot", "-"]
+    for i in range(n):
+        d = int(rnd.expovariate(1 / 400.0))
+        ts = "20/Dec/2025:%02d:%02d:%02d -0800" % (i // 3600 % 24, i // 60 % 60, i % 60)
+        if app == "jira":
+            yield f'10.0.0.{i % 255} {i}x{i}x1 {rnd.choice(users)} [{ts}] "GET {rnd.choice(urls)}?x=1 HTTP/1.1" 200 1234 {d} "-" "agent"'
+        else:
+            yield f'[{ts}] {rnd.choice(users)} http-nio-{i % 50} 10.0.0.{i % 255} GET {rnd.choice(urls)}?x=1 HTTP/1.1 200 {d}ms 1234'
+
+def run_benchmark(app, n, T=1000):
+    lines = list(synthetic_lines(app, n))
+    table = RequestTable()
+    t0 = time.perf_counter()
+    for line in lines:
+        p = parse_line(app, line)
+        if p: table.add("node-%d" % (len(table) % 4), *p)
+    t1 = time.perf_counter()
+    cols = table.columns()
+    summarize(cols["duration"], T)
+    grouped_summaries(cols["node"], cols["duration"], T, len(table.nodes.values))
+    top_groups(cols["url"], cols["duration"], len(table.urls.values))
+    slow_users(cols, 4 * T)
+    t2 = time.perf_counter()
+    print(f"[*] Benchmark ({app}, {n} lines): parse {t1 - t0:.2f}s ({n / max(t1 - t0, 1e-9):,.0f} lines/s), stats {t2 - t1:.3f}s")
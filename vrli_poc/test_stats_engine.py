@@ -0,0 +1,21 @@
+from stats_engine import RequestTable, parse_line, slow_users
+
+def test_slow_users_ties_are_ordered_by_user_id():
+    table = RequestTable()
+    for node, user, duration in (("n1", "zz001", 9000), ("n1", "mm002", 5000), ("n2", "aa003", 9000),
+                                 ("n2", "mm002", 9000), ("n1", "bb004", 7000), ("n1", "fast", 100)):
+        table.add(node, "t", user, duration, "/x")
+    slow = slow_users(table.columns(), 4000, user_names=table.users.values)
+    assert [table.users.values[s[0]] for s in slow] == ["aa003", "mm002", "zz001", "bb004"]
+    # mm002: two slow requests, max on its second one (node n2)
+    assert slow[1][1:4] == (2, 9000, table.nodes.code("n2"))
+
+def test_jira_lines_with_padded_fields_parse():
+    single = '10.1.1.1 123x456x1 jdoe [12/Dec/2025:10:00:00 +0000] "GET /browse/ABC-1?x=1 HTTP/1.1" 200 512 45 "-"'
+    padded = '10.1.1.1 123x456x1 jdoe  [12/Dec/2025:10:00:00 +0000] "GET /browse/ABC-1?x=1 HTTP/1.1" 200 -  45 "-"'
+    expected = ("12/Dec/2025:10:00:00 +0000", "jdoe", 45, "/browse/ABC-1")
+    assert parse_line("jira", single) == expected
+    assert parse_line("jira", padded) == expected
+    table = RequestTable()
+    table.add_text("n1", "jira", single + "\n" + padded + "\n")
+    assert len(table) == 2
@@ -0,0 +1,18 @@
+from uri_templates import uri_template
+
+def test_sub_resources_get_their_own_templates():
+    assert uri_template("/rest/api/2/issue/ABC-1/transitions") == "/rest/api/{ver}/issue/{key}/transitions"
+    assert uri_template("/rest/api/2/issue/ABC-1/comment") == "/rest/api/{ver}/issue/{key}/comment"
+    assert uri_template("/rest/agile/1.0/board/3/sprint") != uri_template("/rest/agile/1.0/board/3/backlog")
+    assert uri_template("/rest/api/content/55/child/page") != uri_template("/rest/api/content/55/history")
+
+def test_resources_are_not_merged():
+    templates = {uri_template(p) for p in ("/rest/api/2/issue/10001", "/rest/api/2/project/10000",
+                                           "/rest/api/2/filter/123", "/rest/api/2/version/55")}
+    assert len(templates) == 4
+    assert "/rest/api/{ver}/filter/{id}" in templates
+
+def test_ids_keys_and_query_strings_collapse():
+    assert uri_template("/rest/api/2/issue/ABC-1?expand=names") == uri_template("/rest/api/latest/issue/XYZ-99")
+    assert uri_template("/rest/api/2/project/ABC/roles") == "/rest/api/{ver}/project/{project}/roles"
+    assert uri_template("/rest/agile/1.0/board/3/epic") == uri_template("/rest/agile/1.0/board/42/epic")
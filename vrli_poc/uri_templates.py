@@ -0,0 +1,117 @@
+import re
+from functools import lru_cache
+
+# --- TEMPLATES ---
+# Checked in order (first match wins), so specific templates go before general ones.
+# Placeholders: {key} issue key, {project} project/space key, {id} number, {ver} API version,
+# {*} the rest of the path. Resource and sub-resource names always stay literal so different
+# endpoints never share a template; paths not listed here go to generic_template.
+TEMPLATES = [
+    # Jira REST
+    "/rest/api/{ver}/issue/{key}/comment/{id}",
+    "/rest/api/{ver}/issue/{key}/comment",
+    "/rest/api/{ver}/issue/{key}/transitions",
+    "/rest/api/{ver}/issue/{key}/worklog",
+    "/rest/api/{ver}/issue/{key}/editmeta",
+    "/rest/api/{ver}/issue/{key}/remotelink",
+    "/rest/api/{ver}/issue/{key}/watchers",
+    "/rest/api/{ver}/issue/{key}",
+    "/rest/api/{ver}/project/{project}/versions",
+    "/rest/api/{ver}/project/{project}/components",
+    "/rest/api/{ver}/project/{project}/statuses",
+    "/rest/api/{ver}/project/{project}",
+    "/rest/api/{ver}/avatar/{*}",
+    "/rest/agile/{ver}/board/{id}/sprint",
+    "/rest/agile/{ver}/board/{id}/backlog",
+    "/rest/agile/{ver}/board/{id}/issue",
+    "/rest/agile/{ver}/board/{id}/configuration",
+    "/rest/agile/{ver}/board/{id}",
+    "/rest/agile/{ver}/sprint/{id}/issue",
+    "/rest/agile/{ver}/sprint/{id}",
+    # Jira UI
+    "/browse/{key}",
+    "/browse/{project}",
+    "/secure/attachment/{id}/{*}",
+    "/secure/thumbnail/{id}/{*}",
+    "/secure/projectavatar",
+    "/secure/useravatar",
+    # Confluence REST and UI
+    "/rest/api/content/{id}/child/page",
+    "/rest/api/content/{id}/child/attachment",
+    "/rest/api/content/{id}/child/comment",
+    "/rest/api/content/{id}/history",
+    "/rest/api/content/{id}/label",
+    "/rest/api/content/{id}",
+    "/rest/api/space/{project}/content",
+    "/rest/api/space/{project}",
+    "/display/{project}/{*}",
+    "/display/{project}",
+    "/spaces/{project}/pages/{id}/{*}",
+    "/download/attachments/{id}/{*}",
+    "/download/thumbnails/{id}/{*}",
+    # Static resources (hashed, build-numbered paths)
+    "/s/{*}",
+    "/download/resources/{*}",
+    "/download/batch/{*}",
+    "/download/contextbatch/{*}",
+    "/images/{*}",
+]
+
+PLACEHOLDERS = {
+    "key": r"[A-Z][A-Z0-9_]+-\d+",
+    "project": r"[A-Za-z~][A-Za-z0-9_~]*",
+    "id": r"\d+",
+    "ver": r"(?:\d+(?:\.\d+)?|latest)",
+    "*": r".*",
+}
+
+# Fallback for paths no template covers: ID-like segments are collapsed, depth is capped
+GENERIC_SEGMENTS = [
+    ("{key}", re.compile(r"^[A-Z][A-Z0-9_]+-\d+$")),
+    ("{id}", re.compile(r"^\d+$")),
+    ("{uuid}", re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")),
+    ("{hash}", re.compile(r"^[0-9a-fA-F]{16,}$")),
+]
+# Project/space keys are only recognisable by the segment before them
+PROJECT_PARENTS = {"project", "space", "spaces", "browse", "display"}
+PROJECT_SEGMENT = re.compile(r"^(?:[A-Z][A-Z0-9_]*|~[^/]+)$")
+VERSION_SEGMENT = re.compile(PLACEHOLDERS["ver"] + r"\Z")
+MAX_DEPTH = 6
+CACHE_SIZE = 65536
+
+def _compile(templates):
+    """One alternation with a named group per template; `lastgroup` tells which template matched."""
+    alts = []
+    for i, t in enumerate(templates):
+        body = re.sub(r"\\\{\\?([a-z*]+)\\\}", lambda m: PLACEHOLDERS[m.group(1)], re.escape(t))
+        alts.append(f"(?P<t{i}>{body}/?)")
+    return re.compile("(?:" + "|".join(alts) + r")\Z")
+
+TEMPLATE_REGEX = _compile(TEMPLATES)
+
+def generic_template(path):
+    parts = path.strip("/").split("/")
+    out = []
+    for i, seg in enumerate(parts[:MAX_DEPTH]):
+        # REST paths are /rest/<plugin>/<version>/...
+        if i == 2 and parts[0] == "rest" and VERSION_SEGMENT.match(seg):
+            out.append("{ver}")
+            continue
+        if i and parts[i - 1] in PROJECT_PARENTS and PROJECT_SEGMENT.match(seg) and not GENERIC_SEGMENTS[0][1].match(seg):
+            out.append("{project}")
+            continue
+        for label, pattern in GENERIC_SEGMENTS:
+            if pattern.match(seg):
+                seg = label
+                break
+        out.append(seg)
+    return "/" + "/".join(out) + ("/{*}" if len(parts) > MAX_DEPTH else "")
+
+@lru_cache(maxsize=CACHE_SIZE)
+def uri_template(url):
+    """'/rest/api/2/issue/ABC-123?expand=x' -> '/rest/api/{ver}/issue/{key}'. Cached per distinct raw path."""
+    if not url or url == "Unknown": return "Unknown"
+    path = url.split("?", 1)[0]
+    m = TEMPLATE_REGEX.match(path)
+    if m: return TEMPLATES[int(m.lastgroup[1:])]
+    return generic_template(path)
@@ -0,0 +1,232 @@
+import os
+import re
+import sys
+import gzip
+import time
+import hashlib
+import sqlite3
+import argparse
+from datetime import datetime, date, timedelta
+from log_ingest import LOG_DIRS, iter_text_blocks, find_logs, parse_log_spec
+from stats_engine import CHUNK_PATTERNS, DurationHistogram
+from uri_templates import uri_template
+
+# --- CONFIGURATION ---
+DB_FILE = "user_rollups.db"
+SLOW_MS = 10000
+HEAD_BYTES = 4096
+HUMAN_USER_REGEX = re.compile(r'^[a-zA-Z]{2}\d{6}$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    day TEXT, user TEXT, app TEXT, host TEXT, hour INTEGER, uri_class TEXT,
+    requests INTEGER, total_ms INTEGER, min_ms INTEGER, max_ms INTEGER, slow INTEGER, hist TEXT,
+    PRIMARY KEY (day, user, app, host, hour, uri_class)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rollups_user ON rollups (user, day);
+CREATE TABLE IF NOT EXISTS watermarks (
+    app TEXT, host TEXT, log_name TEXT, path TEXT, offset INTEGER,
+    head_bytes INTEGER, head_sha1 TEXT, updated_at TEXT,
+    PRIMARY KEY (app, host, log_name)
+);
+"""
+
+UPSERT = """
+INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (day, user, app, host, hour, uri_class) DO UPDATE SET
+    requests = requests + excluded.requests, total_ms = total_ms + excluded.total_ms,
+    min_ms = MIN(min_ms, excluded.min_ms), max_ms = MAX(max_ms, excluded.max_ms),
+    slow = slow + excluded.slow, hist = hist_merge(hist, excluded.hist)
+"""
+
+def _hist_merge(a, b):
+    h = DurationHistogram.loads(a)
+    h.merge(DurationHistogram.loads(b))
+    return h.dumps()
+
+def connect(path):
+    conn = sqlite3.connect(path)
+    conn.create_function("hist_merge", 2, _hist_merge, deterministic=True)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+# --- INGESTION ---
+def _head_sha1(path, n):
+    with gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb") as f:
+        return hashlib.sha1(f.read(n)).hexdigest()
+
+def _log_name(path):
+    """Watermark identity: the rotated name without .gz, so a log compressed after ingestion resumes where it stopped."""
+    name = os.path.basename(path)
+    return name[:-3] if name.endswith(".gz") else name
+
+def aggregate_block(app, text, cache):
+    """{(day, hour, user, uri_class): [durations]} for one newline-aligned block."""
+    groups = {}
+    for m in CHUNK_PATTERNS[app].finditer(text):
+        ts, user, dur, url = m.group('time', 'user', 'dur', 'url')
+        dh = cache.get(ts[:14])
+        if dh is None:
+            try:
+                t = datetime.strptime(ts[:14], "%d/%b/%Y:%H")
+                dh = cache[ts[:14]] = (t.strftime("%Y-%m-%d"), t.hour)
+            except ValueError:
+                dh = cache[ts[:14]] = False
+        if not dh: continue
+        groups.setdefault((dh[0], dh[1], user, uri_template(url)), []).append(int(dur))
+    return groups
+
+def ingest_file(conn, app, host, path):
+    """
+    Ingests new lines of one log into the rollups. Each block's upserts and the advanced byte
+    watermark commit in one transaction, so an interrupted run resumes without double counting.
+    Returns the number of requests added.
+    """
+    name = _log_name(path)
+    row = conn.execute("SELECT offset, head_bytes, head_sha1 FROM watermarks WHERE app=? AND host=? AND log_name=?", (app, host, name)).fetchone()
+    offset = 0
+    if row:
+        offset, head_bytes, head_sha1 = row
+        if head_bytes and _head_sha1(path, head_bytes) != head_sha1:
+            sys.stderr.write(f"[-] {path} no longer matches its watermark (replaced or truncated), skipping\n")
+            return 0
+
+    cache, added = {}, 0
+    for block in iter_text_blocks(path, offset=offset, partial_tail=False):
+        rows = []
+        for (day, hour, user, uc), durs in aggregate_block(app, block.decode("utf-8", "replace"), cache).items():
+            h = DurationHistogram()
+            h.add_many(durs)
+            rows.append((day, user, app, host, hour, uc, h.count, h.total, h.min, h.max, sum(d > SLOW_MS for d in durs), h.dumps()))
+            added += h.count
+        offset += len(block)
+        head = min(offset, HEAD_BYTES)
+        with conn:
+            conn.executemany(UPSERT, rows)
+            conn.execute("INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (app, host, name, path, offset, head, _head_sha1(path, head), datetime.now().isoformat(timespec="seconds")))
+    return added
+
+# --- QUERIES ---
+def _merge_hists(rows):
+    h = DurationHistogram()
+    for (text,) in rows: h.merge(DurationHistogram.loads(text))
+    return h
+
+def user_activity(conn, user, start, end, by="hour"):
+    """Per-(day, hour) or per-(day, uri_class) activity for one user: key, requests, avg, p90, max, slow."""
+    key = "day, hour" if by == "hour" else "day, uri_class" if by == "uri" else "day"
+    rows = conn.execute(f"""SELECT {key}, SUM(requests), SUM(total_ms), MAX(max_ms), SUM(slow) FROM rollups
+                            WHERE user=? AND day BETWEEN ? AND ? GROUP BY {key} ORDER BY {key}""", (user, start, end)).fetchall()
+    n_key = key.count(",") + 1
+    out = []
+    for r in rows:
+        k = r[:n_key]
+        where = " AND ".join(f"{c.strip()}=?" for c in key.split(","))
+        h = _merge_hists(conn.execute(f"SELECT hist FROM rollups WHERE user=? AND {where}", (user, *k)))
+        out.append((k, r[n_key], r[n_key + 1] / r[n_key], h.rank_percentiles([90])[0], r[n_key + 2], r[n_key + 3]))
+    return out
+
+def daily_rows(conn, user, start, end, hostname):
+    """daily_user_analytics.sh rows (date,hostname,userid,count,min,max,avg,p90,p80) from the rollups."""
+    out = []
+    d = date.fromisoformat(start)
+    while d <= date.fromisoformat(end):
+        h = _merge_hists(conn.execute("SELECT hist FROM rollups WHERE day=? AND user=?", (d.isoformat(), user)))
+        if h.count:
+            p90, p80 = h.rank_percentiles([90, 80])
+            out.append(f"{d},{hostname},{user},{h.count},{h.min},{h.max},{h.total / h.count:.2f},{p90},{p80}")
+        else:
+            out.append(f"{d},{hostname},{user},0,0,0,0.00,0,0")
+        d += timedelta(days=1)
+    return out
+
+def top_slow_users(conn, start, end, limit=20, user_type="all"):
+    """Users ranked by requests over SLOW_MS, then max time; only the top rows merge histograms."""
+    rows = conn.execute("""SELECT user, SUM(requests), SUM(total_ms), MAX(max_ms), SUM(slow) FROM rollups
+                           WHERE day BETWEEN ? AND ? GROUP BY user HAVING SUM(slow) > 0
+                           ORDER BY SUM(slow) DESC, MAX(max_ms) DESC""", (start, end))
+    out = []
+    for user, n, total, mx, slow in rows:
+        if user_type != "all" and bool(HUMAN_USER_REGEX.match(user)) != (user_type == "human"): continue
+        h = _merge_hists(conn.execute("SELECT hist FROM rollups WHERE user=? AND day BETWEEN ? AND ?", (user, start, end)))
+        out.append((user, n, total / n, h.rank_percentiles([95])[0], mx, slow))
+        if len(out) >= limit: break
+    return out
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental per-(day, hour, user, URI class) access log rollups with fast queries.")
+    parser.add_argument("--db", default=DB_FILE, help=f"SQLite rollup store (default: {DB_FILE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("ingest", help="Add new log lines to the rollups (resumes from per-file watermarks)")
+    p.add_argument("--app", default="both", choices=["jira", "confluence", "both"])
+    p.add_argument("--log", action="append", help="node=path (plain or .gz); repeatable, needs a single app")
+    p.add_argument("--jira-log-dir", default=LOG_DIRS["jira"])
+    p.add_argument("--confluence-log-dir", default=LOG_DIRS["confluence"])
+    p.add_argument("--since", help="Only rotated logs dated on/after YYYY-MM-DD")
+
+    p = sub.add_parser("user", help="What did a user do on a day / range")
+    p.add_argument("user")
+    p.add_argument("start_date")
+    p.add_argument("end_date", nargs="?")
+    p.add_argument("--by", default="hour", choices=["hour", "uri", "day"])
+
+    p = sub.add_parser("daily", help="daily_user_analytics.sh CSV from the rollups")
+    p.add_argument("user")
+    p.add_argument("start_date")
+    p.add_argument("end_date", nargs="?")
+    p.add_argument("--hostname", default=os.uname().nodename.split(".")[0])
+
+    p = sub.add_parser("top-slow", help=f"Users with the most requests over {SLOW_MS} ms")
+    p.add_argument("--start", default=(date.today() - timedelta(days=6)).isoformat(), help="YYYY-MM-DD (default: 7 days ago)")
+    p.add_argument("--end", default=date.today().isoformat())
+    p.add_argument("--limit", type=int, default=20)
+    p.add_argument("--type", default="all", choices=["human", "service", "all"])
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    if args.command == "ingest":
+        apps = ["jira", "confluence"] if args.app == "both" else [args.app]
+        if args.log:
+            if len(apps) != 1: sys.exit("[-] --log needs --app jira or confluence")
+            jobs = [(apps[0], *parse_log_spec(spec)) for spec in args.log]
+        else:
+            since = date.fromisoformat(args.since) if args.since else None
+            dirs = {"jira": args.jira_log_dir, "confluence": args.confluence_log_dir}
+            host = os.uname().nodename.split(".")[0]
+            jobs = [(app, host, path) for app in apps for _, path in find_logs(app, dirs[app], since)]
+        t0 = time.perf_counter()
+        total = 0
+        for app, host, path in jobs:
+            added = ingest_file(conn, app, host, path)
+            if added: print(f"[*] {app} {host} {path}: +{added} requests")
+            total += added
+        print(f"[*] Ingested {total} requests from {len(jobs)} files in {time.perf_counter() - t0:.1f}s")
+        return
+
+    if args.command == "top-slow":
+        print(f"{'User':<20} | {'Requests':<8} | {'Avg(ms)':<8} | {'95th%':<7} | {'Max(ms)':<8} | {'>' + str(SLOW_MS // 1000) + 's'}")
+        print("-" * 72)
+        for user, n, avg, p95, mx, slow in top_slow_users(conn, args.start, args.end, args.limit, args.type):
+            print(f"{user:<20} | {n:<8} | {avg:<8.0f} | {p95:<7} | {mx:<8} | {slow}")
+        return
+
+    end = args.end_date or args.start_date
+    if args.command == "daily":
+        print("date,hostname,userid,request_count,min_response_time_ms,max_response_time_ms,avg_response_time_ms,p90_response_time_ms,p80_response_time_ms")
+        for row in daily_rows(conn, args.user, args.start_date, end, args.hostname): print(row)
+        return
+
+    rows = user_activity(conn, args.user, args.start_date, end, args.by)
+    if not rows:
+        print(f"No activity for {args.user} between {args.start_date} and {end}."); return
+    print(f"{'Key':<45} | {'Requests':<8} | {'Avg(ms)':<8} | {'90th%':<7} | {'Max(ms)':<8} | Slow")
+    print("-" * 95)
+    for k, n, avg, p90, mx, slow in rows:
+        label = " ".join(f"{v:02d}:00" if isinstance(v, int) else str(v) for v in k)
+        print(f"{label[:45]:<45} | {n:<8} | {avg:<8.0f} | {p90:<7} | {mx:<8} | {slow}")
+
+if __name__ == "__main__":
+    main()
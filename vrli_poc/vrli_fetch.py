@@ -13,7 +13,13 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 VRLI_HOST = "lvn-rnd-unix-logs.lvn.broadcom.net" 
 BASE_URL = f"https://{VRLI_HOST}:9543/api/v2"
 PROVIDER = "ActiveDirectory"
-API_BATCH_SIZE = 2500
+API_BATCH_SIZE = 2500        # First page size, before the keep ratio is known
+MIN_BATCH_SIZE = 200
+MAX_BATCH_SIZE = 10000
+# vRLI fields the --host / --file filters are pushed down to (as <field>/CONTAINS <value>).
+# Opt-in (--pushdown): CONTAINS matches whole tokens, so a partial value such as "jira-prd" or
+# "Exception" would make vRLI drop events the client-side substring check keeps.
+PUSHDOWN_FIELDS = {"host": "hostname", "file": "filepath"}
 
 def get_session_token(username, password):
     auth_url = f"{BASE_URL}/sessions"
@@ -30,34 +36,59 @@ def get_session_token(username, password):
         sys.stderr.write(f"[-] Auth Error: {e}\n")
         return None
 
-def fetch_until_satisfied(token, primary_query, host_filter, file_filter, include_list, days, target_count):
+def build_constraints(primary_query, host_filter, file_filter, include_list, pushdown):
+    """Path constraints for /events. Host/file/include filters are only pushed to vRLI when listed in pushdown."""
+    pairs = [("text", primary_query)]
+    if "host" in pushdown and host_filter: pairs.append((PUSHDOWN_FIELDS["host"], host_filter))
+    if "file" in pushdown and file_filter: pairs.append((PUSHDOWN_FIELDS["file"], file_filter))
+    if "include" in pushdown: pairs += [("text", term) for term in include_list or [] if term != primary_query]
+    return [f"{field}/CONTAINS {urllib.parse.quote(value, safe='')}" for field, value in pairs]
+
+def next_batch_size(needed, keep_ratio):
+    """Sizes the next page so it is expected to cover what is still needed, within server limits."""
+    if keep_ratio is None: return API_BATCH_SIZE
+    wanted = int(needed / max(keep_ratio, 0.001) * 1.2)
+    return max(MIN_BATCH_SIZE, min(MAX_BATCH_SIZE, wanted))
+
+def iter_until_satisfied(token, primary_query, host_filter, file_filter, include_list, days, target_count, pushdown=()):
+    """Yields kept events batch by batch (newest first) until target_count is reached or the window is exhausted."""
     current_time_ms = int(time.time() * 1000)
     start_time_ms = current_time_ms - (days * 24 * 3600 * 1000)
     search_window_end = current_time_ms 
-    collected_events = []
+    collected = 0
+    latest = earliest = None
+    pushdown = set(pushdown)
+    session = requests.Session()
+    session.headers.update({"Authorization": f"Bearer {token}", "Accept": "application/json"})
+    session.verify = False
+    # bytes_scanned / bytes_kept: JSON size of every fetched / kept event, so the kept share compares like with like
+    stats = {"scanned": 0, "bytes_fetched": 0, "bytes_scanned": 0, "bytes_kept": 0}
+    keep_ratio = None
     
     sys.stderr.write(f"[*] Goal: Collect {target_count} relevant events.\n")
+    if pushdown: sys.stderr.write(f"[*] Server-side filters: {', '.join(sorted(pushdown))}\n")
 
-    while len(collected_events) < target_count:
+    while collected < target_count:
         constraints = [
             f"timestamp/GT {start_time_ms}",
             f"timestamp/LT {search_window_end}",
-            f"text/CONTAINS {urllib.parse.quote(primary_query, safe='')}"
-        ]
+        ] + build_constraints(primary_query, host_filter, file_filter, include_list, pushdown)
         url = f"{BASE_URL}/events/{'/'.join(constraints).replace(' ', '%20')}"
+        batch_size = next_batch_size(target_count - collected, keep_ratio)
         
         try:
-            resp = requests.get(
-                url, 
-                headers={"Authorization": f"Bearer {token}", "Accept": "application/json"}, 
-                params={"limit": API_BATCH_SIZE}, 
-                verify=False
-            )
+            resp = session.get(url, params={"limit": batch_size})
+            if resp.status_code == 400 and pushdown:
+                # Server rejected a pushed-down constraint: fall back to client-side filtering only
+                sys.stderr.write(f"[!] vRLI rejected server-side filters ({resp.status_code}), filtering client-side\n")
+                pushdown = set()
+                continue
+            stats["bytes_fetched"] += len(resp.content)
             data = resp.json()
             events = data.get("events", [])
             if not events: break
                 
-            batch_matches = []
+            batch_matches, batch_sizes = [], []
             oldest_in_batch = search_window_end 
             
             for e in events:
@@ -65,6 +96,8 @@ def fetch_until_satisfied(token, primary_query, host_filter, file_filter, includ
                 if ts < oldest_in_batch: oldest_in_batch = ts
                 
                 txt = e.get('text', '')
+                size = len(json.dumps(e))
+                stats["bytes_scanned"] += size
                 
                 # --- NEW: Capture All Extracted Fields ---
                 # vRLI sends fields as a list of dicts: [{'name': 'appname', 'content': 'jira'}]
@@ -75,6 +108,7 @@ def fetch_until_satisfied(token, primary_query, host_filter, file_filter, includ
                 host = fields_map.get('hostname', e.get('source', 'Unknown-Host'))
                 fpath = fields_map.get('filepath', '')
 
+                # Still checked client-side: CONTAINS is token-based, these are exact substring checks
                 if host_filter and host_filter not in host: continue
                 if file_filter and file_filter not in fpath: continue
                 if include_list and not all(term in txt for term in include_list): continue
@@ -85,14 +119,20 @@ def fetch_until_satisfied(token, primary_query, host_filter, file_filter, includ
                     "host": host,
                     "extracted_fields": fields_map  # Saving the rich data!
                 })
+                batch_sizes.append(size)
 
-            needed = target_count - len(collected_events)
-            if len(batch_matches) > needed:
-                collected_events.extend(batch_matches[:needed])
-            else:
-                collected_events.extend(batch_matches)
+            stats["scanned"] += len(events)
+            ratio = len(batch_matches) / len(events)
+            keep_ratio = ratio if keep_ratio is None else 0.5 * keep_ratio + 0.5 * ratio
+            batch_matches = batch_matches[:target_count - collected]
+            collected += len(batch_matches)
+            if batch_matches:
+                if latest is None: latest = batch_matches[0]['timestamp']
+                earliest = batch_matches[-1]['timestamp']
+                stats["bytes_kept"] += sum(batch_sizes[:len(batch_matches)])
             
-            sys.stderr.write(f"    Batch: scanned {len(events)} raw -> kept {len(batch_matches)} valid. Total: {len(collected_events)}/{target_count}\n")
+            sys.stderr.write(f"    Batch: scanned {len(events)} raw (limit {batch_size}) -> kept {len(batch_matches)} valid. Total: {collected}/{target_count}\n")
+            if batch_matches: yield batch_matches
             
             if oldest_in_batch >= search_window_end: break
             search_window_end = oldest_in_batch - 1
@@ -101,12 +141,32 @@ def fetch_until_satisfied(token, primary_query, host_filter, file_filter, includ
             sys.stderr.write(f"[-] API Error: {e}\n")
             break
             
-    if collected_events:
-        latest = datetime.datetime.fromtimestamp(collected_events[0]['timestamp']/1000).strftime('%Y-%m-%d %H:%M:%S')
-        earliest = datetime.datetime.fromtimestamp(collected_events[-1]['timestamp']/1000).strftime('%Y-%m-%d %H:%M:%S')
+    if collected:
+        latest = datetime.datetime.fromtimestamp(latest/1000).strftime('%Y-%m-%d %H:%M:%S')
+        earliest = datetime.datetime.fromtimestamp(earliest/1000).strftime('%Y-%m-%d %H:%M:%S')
         sys.stderr.write(f"[*] Analysis Timeframe: {earliest} to {latest}\n")
+    mb = 1024 * 1024
+    kept_pct = (stats["bytes_kept"] / stats["bytes_scanned"] * 100) if stats["bytes_scanned"] else 0
+    sys.stderr.write(f"[*] Transfer: {stats['bytes_fetched']/mb:.2f} MB over the wire, scanned {stats['scanned']} events / {stats['bytes_scanned']/mb:.2f} MB, "
+                     f"kept {collected} events / {stats['bytes_kept']/mb:.2f} MB ({kept_pct:.1f}% of event bytes kept)\n")
+
+def fetch_until_satisfied(token, primary_query, host_filter, file_filter, include_list, days, target_count, pushdown=()):
+    return [e for batch in iter_until_satisfied(token, primary_query, host_filter, file_filter, include_list, days, target_count, pushdown) for e in batch]
 
-    return collected_events
+def stream_events(batches, fmt="json", out=sys.stdout):
+    """Writes batches as they arrive: a JSON array (one event per line) or NDJSON."""
+    count = 0
+    if fmt == "json": out.write("[")
+    for batch in batches:
+        for e in batch:
+            line = json.dumps(e)
+            if fmt == "json": line = ("\n  " if count == 0 else ",\n  ") + line
+            else: line += "\n"
+            out.write(line)
+            count += 1
+        out.flush()
+    if fmt == "json": out.write("\n]\n" if count else "]\n")
+    return count
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -115,6 +175,10 @@ if __name__ == "__main__":
     parser.add_argument("--include", action='append')
     parser.add_argument("--days", type=int, default=7)
     parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--format", choices=["json", "ndjson"], default="json")
+    parser.add_argument("--pushdown", action="append", choices=["host", "file", "include"], default=[],
+                        help="Also send this filter to vRLI as a CONTAINS constraint (repeatable). Only for whole-token values: "
+                             "CONTAINS matches tokens, so partial values would silently drop events")
     parser.add_argument("--auth-user"); parser.add_argument("--password")
     args = parser.parse_args()
     
@@ -124,8 +188,9 @@ if __name__ == "__main__":
     if u and p:
         token = get_session_token(u, p)
         if token: 
-            results = fetch_until_satisfied(
+            batches = iter_until_satisfied(
                 token, args.query, args.host, args.file, 
-                args.include, args.days, args.limit
+                args.include, args.days, args.limit,
+                pushdown=args.pushdown
             )
-            print(json.dumps(results, indent=2))
+            stream_events(batches, args.format)